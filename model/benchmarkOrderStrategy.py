@@ -0,0 +1,59 @@
+from dataLoader import dataLoader
+from branchAndPrice import branchAndPrice
+import numpy as np
+import pickle
+import math
+import sys
+
+'''Benchmark of SP ordering strategies in partial column generation. The root
+node is solved for each instance and strategy, and the number of SPs solved
+per improving column found is reported along with the time spent ordering
+and solving SPs.
+
+If employeesLimit is given, instances are reduced to their first
+employeesLimit employees, with demand scaled down by the same share (rounded
+down), e.g. to fit the limits of a community solver license.'''
+
+sys.setrecursionlimit(10000)
+
+instances = ['inrc_sprint_late01', 'inrc_sprint_late02', 'inrc_sprint_late03',
+             'inrc_sprint_late04', 'inrc_sprint_late05']
+orderStrategies = ['random', 'noResourcesSP', 'history']
+employeesLimit = None # Number of employees kept in each instance (None keeps all)
+seed = 0 # Seed of the random SP order
+
+for instance in instances:
+    data = dataLoader(filename='../instances/'+instance+'.xlsx')
+
+    # Reduce instance to employeesLimit employees, scaling demand accordingly
+    if employeesLimit != None and employeesLimit < len(data['Employees']):
+        share = employeesLimit / len(data['Employees'])
+        data['Employees'] = data['Employees'][:employeesLimit]
+        data['Demand'] = {key: math.floor(demand * share) for key, demand in data['Demand'].items()}
+
+    for orderStrategy in orderStrategies:
+        outputTreePickle = 'benchmark_' + instance + '_' + orderStrategy + '.pickle'
+
+        # Solve the root node by partial column generation
+        np.random.seed(seed)
+        branchAndPrice(data=data,
+                       outputTreePickle=outputTreePickle,
+                       printStatus=False,
+                       partialCG = True,
+                       orderStrategy = orderStrategy,
+                       sizeLimit = 1, # Root node only
+                       # timeLimit = None, # Time limit in seconds
+                       )
+
+        # Load tree and report SPs solved per improving column
+        with open(outputTreePickle, 'rb') as f:
+            tree = pickle.load(f)
+        calls = sum(statistics['Calls'] for statistics in tree.times['Pricers'].values())
+        hits = sum(statistics['Hits'] for statistics in tree.times['Pricers'].values())
+        print(instance, orderStrategy,
+              'SPs solved:', calls,
+              'Improving:', hits,
+              'SPs per improving:', round(calls / hits, 2) if hits else None,
+              'SP order selection time:', round(tree.times['Column generation']['SP order selection'], 2),
+              'Solve SP time:', round(tree.times['Column generation']['Solve SP'], 2),
+              'Total time:', round(tree.times['Total'], 2))
@@ -4,6 +4,9 @@ from problem import Problem
 from tree import Tree
 from columns import Columns
 from graph import Graph
+from resources import Resources
+from controller import Controller
+from parallelPricing import PricingPool
 from helpers import *
 import inspect
 import time
@@ -18,7 +21,7 @@ def branchAndPrice(data,
                    removeIllegalColumns = False, # Remove all illegal columns before solving a problem
                    coverConstraint = '=', # Cover constraint. = or >=.
                    partialCG = False, # Only solve SPs until one with neg red cost is found
-                   orderStrategy = 'random', # Strategy for choosing order of solving SP's
+                   orderStrategy = 'random', # Strategy for choosing order of solving SP's. random, noResourcesSP or history
                    partialCG_constructionHeuristic = False, # Only solve SPs until one with neg red cost is found in construction heuristic
                    constructionHeuristic = 'CGartificialVariables', # Specify what construction heuristic to use
                    labelExtensionLimits = [], # Increments in SP label extension limit
@@ -28,7 +31,20 @@ def branchAndPrice(data,
                    CGImprovementStepSize=1, # CG improvement criterion step size
                    CGImprovementThreshold=1e-9, # CG improvement criterion threshold
                    branchOnUpperBound=False, # Branch once CG finds objective value below tree upper bound
-                   branchingStrategy = 'xVars'
+                   branchingStrategy = 'xVars',
+                   SPMethod = 'labelling', # Algorithm solving the sub problem. labelling, labelling_vectorized, labelling_bidirectional, stateSpaceDP or pulse
+                   earlyExitSP = False, # Stop labelling once SPSolutionsCount neg red cost solutions are found, unless LBD is calculated
+                   resourceStages = None, # Resource lists used in SPs before resourceVec, activated in stages as CG tails off (e.g. [[], ['TWMin']])
+                   pricers = ['exact'], # Chain of SP pricers tried in order: pool, localSearch, truncated or exact (exact is always tried last)
+                   truncatedExtensionLimits = [5], # Label extension limits of the truncated pricer
+                   localSearchIterations = 5, # Iterations of the local search pricer (tabu search)
+                   localSearchTenure = 2, # Iterations changes are tabu in the local search pricer
+                   localSearchBlockLength = 4, # Maximum number of consecutive days changed at once in the local search pricer
+                   SPProcesses = 1, # Number of processes solving SPs in parallel. 1 solves SPs one at a time by the pricers
+                   adaptivePricing = False, # Adapt label extension limits and SPSolutionsCount during CG by a pricing controller
+                   pricingReplay = None, # Decisions of a pricing controller to replay (e.g. tree.pricingController.log of an earlier run)
+                   pricingSeed = None, # Seed of random numbers with a pricing controller (default seed of pricingReplay, else random)
+                   arcFixing = False # Remove arcs that cannot be in columns improving the tree upper bound (reduced cost fixing)
                    ):
     '''Branch-and-Price algorithm for solving the roster problem. If a tree
     pickle filename is given, branch-and-price continues on the given tree.
@@ -57,13 +73,26 @@ def branchAndPrice(data,
     k = 0
     # Initialize branch-and-bound tree
     tree = Tree(configuration, refTime)
-    # Initialize columns and graphs
+    # Initialize pricing controller if required (replaying decisions if given)
+    if adaptivePricing or pricingReplay != None:
+        tree.pricingController = Controller(labelExtensionLimits = labelExtensionLimits,
+                                            SPSolutionsCount = SPSolutionsCount,
+                                            replay = pricingReplay,
+                                            seed = pricingSeed)
+    # Initialize columns and graphs (graphs of the same topology share nodes,
+    # and nodes and arcs not on any resource feasible path are removed)
     graphs = dict.fromkeys(employee for employee in data['Employees'])
+    graphTemplates = {}
     for employee in data['Employees']:
-        graphs[employee] = Graph(data=data, employee=employee)
+        graphs[employee] = Graph(data=data, employee=employee, templates=graphTemplates,
+                                 resources=Resources(resourceVec))
     stop = time.time()
     tree.times['Branch and price']['Initializations'] += stop - start
     start = time.time()
+    # Deadline of the construction heuristic, given the time limit
+    deadline = None
+    if timeLimit != None:
+        deadline = refTime + timeLimit
     # Generate initial columns
     columns = Columns(data=data, graphs = graphs,
                       constructionHeuristic = constructionHeuristic,
@@ -72,149 +101,185 @@ def branchAndPrice(data,
                       partialCG_constructionHeuristic = partialCG_constructionHeuristic,
                       coverConstraint = coverConstraint,
                       removeIllegalColumns = removeIllegalColumns,
-                      resourceVec = resourceVec)
+                      resourceVec = resourceVec,
+                      deadline = deadline)
     stop = time.time()
     tree.times['Branch and price']['Construction heuristic'] += stop - start
+    # Stop if the construction heuristic was interrupted by the time limit, as
+    # the initial columns are then incomplete
+    if columns.interrupted:
+        tree.times['Total'] += time.time() - tree.times['refTime']
+        tree.times['refTime'] = time.time()
+        if printStatus:
+            print('Time limit {:.0f} s reached. Process terminated.'.format(timeLimit))
+        savePickle(tree, outputTreePickle)
+        # Terminate function
+        return
     start = time.time()
     # Define root problem
     rootProblem = Problem(ID=k, columns=columns, graphs=graphs, data=data,
                           coverConstraint=coverConstraint)
+    # Report nodes and arcs removed from the graphs when created
+    for employee in data['Employees']:
+        rootProblem.graphReduction['Nodes'] += graphs[employee].reduction[0]
+        rootProblem.graphReduction['Arcs'] += graphs[employee].reduction[1]
     # Add root problem to tree
     tree.addProblem(problem=rootProblem)
+    # Start pool of processes solving SPs in parallel if required. The pool is
+    # kept for the whole tree, and gets the graph changes of each problem
+    pricingPool = None
+    if SPProcesses > 1:
+        pricingPool = PricingPool(data, graphs, SPProcesses)
     stop = time.time()
     tree.times['Branch and price']['Initializations'] += stop - start
     tree.times['Total'] += time.time() - tree.times['refTime']
     tree.times['refTime'] = time.time()
 
     '''Main Loop'''
-    while not terminate:
-        # Select problem k from unprocessedProblems
-        Pk = tree.unprocessedProblems[k]
-        # If required and not root problem, remove illegal columns from Pk
-        if k > 0 and removeIllegalColumns:
-            # Remove from columns object
-            removedColumnNumbers = Pk.columns.removeIllegalColumns(data = data)
-            # Delete all removed columns from master problem object
-            Pk.masterProblem.delVariable(['lambda({},{})'.format(e, k) for e in removedColumnNumbers for k in removedColumnNumbers[e]])
-        # Prepare timing for solving problem k
-        tree.times['Total'] += time.time() - tree.times['refTime']
-        tree.times['refTime'] = time.time()
-        # Check if time limit is reached while not already terminated
-        if timeLimit != None and tree.times['Total'] > timeLimit:
-            if printStatus:
-                print('Time limit {:.0f} s reached. Process terminated.'.format(timeLimit))
-            savePickle(tree, outputTreePickle)
-            # Terminate function
-            return
-        # Solve problem k
-        Pk.solve(data = data, epsilon = epsilon, partialCG = partialCG,
-                 orderStrategy = orderStrategy,
-                 partialCG_constructionHeuristic = partialCG_constructionHeuristic,
-                 labelExtensionLimits=labelExtensionLimits,
-                 SPSolutionsCount=SPSolutionsCount,
-                 removeIllegalColumns = removeIllegalColumns,
-                 CGOptimalityGapLimit=CGOptimalityGapLimit,
-                 CGImprovementStepSize=CGImprovementStepSize,
-                 CGImprovementThreshold=CGImprovementThreshold,
-                 branchOnUpperBound=branchOnUpperBound,
-                 treeUpperBound=tree.upperBoundProblem.upperBound,
-                 times = tree.times,
-                 resourceVec = resourceVec,
-                 timeLimit=timeLimit)
-        stop = time.time()
-
-        tree.times['Total'] += time.time() - tree.times['refTime']
-        tree.times['refTime'] = time.time()
-        # Check if time limit is reached while not already terminated
-        if timeLimit != None and tree.times['Total'] > timeLimit:
-            if Pk.processed:
-                # Remove master problem and reduce size
-                Pk.masterProblem = None
-                Pk.reduceSize(data = data)
-                # Move problem k from unprocessedProblems to processedProblems
-                tree.processedProblems[k] = tree.unprocessedProblems.pop(k)
-            if printStatus:
-                print('Time limit {:.0f} s reached. Process terminated.'.format(timeLimit))
-            savePickle(tree, outputTreePickle)
-            # Terminate function
-            return
-
-        # Move problem k from unprocessedProblems to processedProblems
-        tree.processedProblems[k] = tree.unprocessedProblems.pop(k)
-
-        # If Pk infeasible, or without potential of improvement
-        if not Pk.feasible or Pk.lowerBound > tree.upperBoundProblem.upperBound:
-            # Prune node
-            Pk.pruned = True
-            # Delete master problem in node
-            Pk.masterProblem = None
-
-        # Else if the final solution is integer
-        elif Pk.integer:
-            # Update upper bound if better solution found
-            if Pk.upperBound < tree.upperBoundProblem.upperBound:
-                tree.upperBoundProblem = Pk
-                # Prune all unprocessed problem with lower bound above new upper bound
-                tree.pruneOnUpperBound()
-            # Prune node (integer)
-            Pk.pruned = True
-            # Delete master problem in node
-            Pk.masterProblem = None
-
-        # Otherwise, update upper bound if Pk had a better integer solution than
-        # the current upper bound problem and branch problem
-        else:
-            if Pk.upperBound and Pk.upperBound < tree.upperBoundProblem.upperBound:
-                tree.upperBoundProblem = Pk
-                # Prune all unprocessed problem with lower bound above new upper bound
-                tree.pruneOnUpperBound()
-            start = time.time()
-            # Branch the problem
-            tree.branch(problem = Pk, branchingStrategy = branchingStrategy, data = data)
+    try:
+        while not terminate:
+            # Select problem k from unprocessedProblems
+            Pk = tree.unprocessedProblems[k]
+            # If required and not root problem, remove illegal columns from Pk
+            if k > 0 and removeIllegalColumns:
+                # Remove from columns object
+                removedColumnNumbers = Pk.columns.removeIllegalColumns(data = data)
+                # Delete all removed columns from master problem object
+                Pk.masterProblem.delVariable(['lambda({},{})'.format(e, k) for e in removedColumnNumbers for k in removedColumnNumbers[e]])
+            # Prepare timing for solving problem k
+            tree.times['Total'] += time.time() - tree.times['refTime']
+            tree.times['refTime'] = time.time()
+            # Check if time limit is reached while not already terminated
+            if timeLimit != None and tree.times['Total'] > timeLimit:
+                if printStatus:
+                    print('Time limit {:.0f} s reached. Process terminated.'.format(timeLimit))
+                savePickle(tree, outputTreePickle)
+                # Terminate function
+                return
+            # Solve problem k
+            Pk.solve(data = data, epsilon = epsilon, partialCG = partialCG,
+                     orderStrategy = orderStrategy,
+                     partialCG_constructionHeuristic = partialCG_constructionHeuristic,
+                     labelExtensionLimits=labelExtensionLimits,
+                     SPSolutionsCount=SPSolutionsCount,
+                     removeIllegalColumns = removeIllegalColumns,
+                     CGOptimalityGapLimit=CGOptimalityGapLimit,
+                     CGImprovementStepSize=CGImprovementStepSize,
+                     CGImprovementThreshold=CGImprovementThreshold,
+                     branchOnUpperBound=branchOnUpperBound,
+                     treeUpperBound=tree.upperBoundProblem.upperBound,
+                     times = tree.times,
+                     resourceVec = resourceVec,
+                     timeLimit=timeLimit,
+                     SPMethod=SPMethod,
+                     earlyExitSP=earlyExitSP,
+                     resourceStages=resourceStages,
+                     pricers=pricers,
+                     truncatedExtensionLimits=truncatedExtensionLimits,
+                     localSearchIterations=localSearchIterations,
+                     localSearchTenure=localSearchTenure,
+                     localSearchBlockLength=localSearchBlockLength,
+                     pricingPool=pricingPool,
+                     pricingController=tree.pricingController,
+                     arcFixing=arcFixing)
             stop = time.time()
-            tree.times['Branch and price']['Branch'] += stop - start
+
             tree.times['Total'] += time.time() - tree.times['refTime']
             tree.times['refTime'] = time.time()
+            # Check if time limit is reached while not already terminated
+            if timeLimit != None and tree.times['Total'] > timeLimit:
+                if Pk.processed:
+                    # Remove master problem and reduce size
+                    Pk.masterProblem = None
+                    Pk.reduceSize(data = data)
+                    # Move problem k from unprocessedProblems to processedProblems
+                    tree.processedProblems[k] = tree.unprocessedProblems.pop(k)
+                if printStatus:
+                    print('Time limit {:.0f} s reached. Process terminated.'.format(timeLimit))
+                savePickle(tree, outputTreePickle)
+                # Terminate function
+                return
 
-        # Reduce size of problem by removing unnecessary attributes
-        Pk.reduceSize(data)
+            # Move problem k from unprocessedProblems to processedProblems
+            tree.processedProblems[k] = tree.unprocessedProblems.pop(k)
 
-        # Update lower bound and optimality gap
-        tree.calculateLowerBound()
-        tree.calculateOptimalityGap()
+            # If Pk infeasible, or without potential of improvement
+            if not Pk.feasible or Pk.lowerBound > tree.upperBoundProblem.upperBound:
+                # Prune node
+                Pk.pruned = True
+                # Delete master problem in node
+                Pk.masterProblem = None
 
-        tree.times['Total'] += time.time() - tree.times['refTime']
-        tree.times['refTime'] = time.time()
-        # Check termination criterion
-        if tree.terminationCriterion(sizeLimit=sizeLimit, gapLimit = gapLimit):
-            terminate = True
-            tree.complete = True
-            savePickle(tree, outputTreePickle)
-            # Terminate function
-            return
+            # Else if the final solution is integer
+            elif Pk.integer:
+                # Update upper bound if better solution found
+                if Pk.upperBound < tree.upperBoundProblem.upperBound:
+                    tree.upperBoundProblem = Pk
+                    # Prune all unprocessed problem with lower bound above new upper bound
+                    tree.pruneOnUpperBound()
+                # Prune node (integer)
+                Pk.pruned = True
+                # Delete master problem in node
+                Pk.masterProblem = None
 
-        # Else: update k according to search strategy
-        else:
-            # If no integer solution found (no UBD): use depth first search
-            if tree.upperBoundProblem.upperBound == float('inf'):
-                searchStrategy = 'DepthFirst_Up'
-            # Else: use best first search
+            # Otherwise, update upper bound if Pk had a better integer solution than
+            # the current upper bound problem and branch problem
             else:
-                searchStrategy = 'BestFirst'
-            # Search and store time
-            start = time.time()
-            k = tree.search(searchStrategy)
-            stop = time.time()
-            tree.times['Branch and price']['Search'] += stop - start
+                if Pk.upperBound and Pk.upperBound < tree.upperBoundProblem.upperBound:
+                    tree.upperBoundProblem = Pk
+                    # Prune all unprocessed problem with lower bound above new upper bound
+                    tree.pruneOnUpperBound()
+                start = time.time()
+                # Branch the problem
+                tree.branch(problem = Pk, branchingStrategy = branchingStrategy, data = data)
+                stop = time.time()
+                tree.times['Branch and price']['Branch'] += stop - start
+                tree.times['Total'] += time.time() - tree.times['refTime']
+                tree.times['refTime'] = time.time()
+
+            # Reduce size of problem by removing unnecessary attributes
+            Pk.reduceSize(data)
+
+            # Update lower bound and optimality gap
+            tree.calculateLowerBound()
+            tree.calculateOptimalityGap()
+
             tree.times['Total'] += time.time() - tree.times['refTime']
             tree.times['refTime'] = time.time()
+            # Check termination criterion
+            if tree.terminationCriterion(sizeLimit=sizeLimit, gapLimit = gapLimit):
+                terminate = True
+                tree.complete = True
+                savePickle(tree, outputTreePickle)
+                # Terminate function
+                return
+
+            # Else: update k according to search strategy
+            else:
+                # If no integer solution found (no UBD): use depth first search
+                if tree.upperBoundProblem.upperBound == float('inf'):
+                    searchStrategy = 'DepthFirst_Up'
+                # Else: use best first search
+                else:
+                    searchStrategy = 'BestFirst'
+                # Search and store time
+                start = time.time()
+                k = tree.search(searchStrategy)
+                stop = time.time()
+                tree.times['Branch and price']['Search'] += stop - start
+                tree.times['Total'] += time.time() - tree.times['refTime']
+                tree.times['refTime'] = time.time()
 
-            if printStatus:
-                nProcessedProblems = len(tree.processedProblems)
-                if tree.upperBoundProblem == Pk:
-                    print('New upper bound found')
-                if tree.upperBoundProblem == Pk or (nProcessedProblems<=10 or
-                   (nProcessedProblems<=50 and nProcessedProblems%2 == 0) or
-                   nProcessedProblems%10 == 0):
-                    printMessage(nProcessedProblems, tree.upperBoundProblem.upperBound,
-                                 tree.lowerBound, tree.gap, tree.times['Total'])
+                if printStatus:
+                    nProcessedProblems = len(tree.processedProblems)
+                    if tree.upperBoundProblem == Pk:
+                        print('New upper bound found')
+                    if tree.upperBoundProblem == Pk or (nProcessedProblems<=10 or
+                       (nProcessedProblems<=50 and nProcessedProblems%2 == 0) or
+                       nProcessedProblems%10 == 0):
+                        printMessage(nProcessedProblems, tree.upperBoundProblem.upperBound,
+                                     tree.lowerBound, tree.gap, tree.times['Total'])
+    finally:
+        # Stop pool of processes solving SPs
+        if pricingPool != None:
+            pricingPool.close()
@@ -51,60 +51,10 @@ class Column:
                     A[(self.employee, self.rosterlineNumber, d, s)] = 1
                     # ...add the cost of assignment
                     cost += C[(self.employee,d,s)]
-                    # ...add costs associated with two-day rewarded patterns
-                    # Ensure shift types are working shifts and may be in pattern
-                    if (self.employee in data['PatternsRewarded'] and
-                        prev_s in data['ShiftTypesWorking'] and
-                        s in data['ShiftTypesWorking']):
-                        prevGroup = None # Group of previos shift type
-                        curGroup = None # Group of current shift type
-                        # Iterate over all employee relevant two-day rewarded patterns
-                        for pat in data['PatternsRewarded'][self.employee]:
-                            if (data['PatternDuration'][(self.employee,pat)] == 2 and
-                                d in data['PatternDays'][(self.employee, pat)]):
-                                # If not already done, identify the shift groups
-                                if prevGroup == None:
-                                    for shiftGroup in data['ShiftTypesGroup']:
-                                        if (prev_s in
-                                            data['ShiftTypesGroup'][shiftGroup]):
-                                            prevGroup = shiftGroup
-                                        if (s in
-                                            data['ShiftTypesGroup'][shiftGroup]):
-                                            curGroup = shiftGroup
-                                # Check if the rewarded pattern is assigned
-                                if (data['M'][(self.employee, pat, 1, prevGroup)] == 1 and
-                                    data['M'][(self.employee, pat, 2, curGroup)] == 1):
-                                    # If so, update the cost of the roster line
-                                    cost -= data['R'][(self.employee, pat)]
-                                    # Unique rewarded patterns are assumed
-                                    break
-                    # ...add costs associated with two-day penalized patterns
-                    # Ensure shift types are working shifts and may be in pattern
-                    if (self.employee in data['PatternsPenalized'] and
-                          prev_s in data['ShiftTypesWorking'] and
-                          s in data['ShiftTypesWorking']):
-                        prevGroup = None # Group of previos shift type
-                        curGroup = None # Group of current shift type
-                        # Iterate over all employee relevant two-day penalized patterns
-                        for pat in data['PatternsPenalized'][self.employee]:
-                            if (data['PatternDuration'][(self.employee,pat)] == 2 and
-                                d in data['PatternDays'][(self.employee, pat)]):
-                                # If not already done, identify the shift groups
-                                if prevGroup == None:
-                                    for shiftGroup in data['ShiftTypesGroup']:
-                                        if (prev_s in
-                                            data['ShiftTypesGroup'][shiftGroup]):
-                                            prevGroup = shiftGroup
-                                        if (s in
-                                            data['ShiftTypesGroup'][shiftGroup]):
-                                            curGroup = shiftGroup
-                                # Check if the rewarded pattern is assigned
-                                if (data['M'][(self.employee, pat, 1, prevGroup)] == 1 and
-                                    data['M'][(self.employee, pat, 2, curGroup)] == 1):
-                                    # If so, update the cost of the rosterline
-                                    cost += data['P'][(self.employee, pat)]
-                                    # Unique penalized patterns are assumed
-                                    break
+                    # ...add costs associated with two-day rewarded and
+                    # penalized patterns (see patternArrays)
+                    cost -= PatternArrays[self.employee]['Rewarded'][d, prev_s, s]
+                    cost += PatternArrays[self.employee]['Penalized'][d, prev_s, s]
                     # One shift type assigned per day is assumed
                     break
             # Update the previos shift type worked
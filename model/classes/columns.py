@@ -8,36 +8,113 @@ import copy as copy
 import numpy as np
 import time
 
+class ColumnStore:
+    '''Append-only store of the columns of all problems in the branch-and-bound
+    tree. Columns are never changed or removed once added, and rosterline
+    numbers are given per employee across the tree, so a rosterline number
+    identifies the same column in every problem (see Columns).
+    '''
+
+    def __init__(self):
+        # Columns in order of addition, and index of each column
+        self.columns = []
+        self.index = {}
+        # Last rosterline number given to each employee (None until the
+        # initial columns are added)
+        self.rosterlineNumbers = None
+
+    def __repr__(self):
+        return 'Columns: ' + str(len(self.columns))
+
+    def append(self, column: Column):
+        '''Appends the column to the store and returns its index'''
+        self.index[column] = len(self.columns)
+        self.columns.append(column)
+        return self.index[column]
+
 class Columns:
     '''Representation of all restricted master problem columns in the rostering
     problem of Pedersen and Coates (2019) along with associated functions to
     change the set of columns.
+
+    Columns are kept in a store (see ColumnStore) shared by copies of the
+    columns, as the columns of the problems in the branch-and-bound tree.
+    Each copy only holds a bitset of the columns in the store that are active
+    (not removed) in it, packed in bytes (bit i of byte j for the column with
+    index 8j + i), so removing columns from a copy or adding columns to it
+    does not affect the other copies. A copy takes one byte per eight columns
+    in the store.
     '''
 
     def __init__(self, data, graphs = None, constructionHeuristic = 'CGartificialVariables',
                  printStatus = False, orderStrategy = 'noResourcesSP',
                  partialCG_constructionHeuristic = True,
                  coverConstraint = '=', removeIllegalColumns = False,
-                 resourceVec = ['TWMin', 'TWMin_g', 'TV']):
-        # Initialize empty list of columns and no rosterline numbers
-        self.columns = []
-        self.rosterlineNumbers = None
-
-        # Run construction heuristic to generate initial columns
-        getattr(self, 'constructionHeuristic_%s' % constructionHeuristic)(data = data,
+                 resourceVec = ['TWMin', 'TWMin_g', 'TV'], deadline = None):
+        # Initialize empty store of columns, with no active columns and no
+        # rosterline numbers
+        self.store = ColumnStore()
+        self.active = np.zeros(0, dtype=np.uint8)
+        # List of active columns (see columns), None when it must be rebuilt
+        self.activeColumns = None
+
+        # Run construction heuristic to generate initial columns. Interrupted
+        # indicates whether it was interrupted by the deadline, leaving the
+        # columns incomplete
+        _, _, self.interrupted = getattr(self, 'constructionHeuristic_%s' % constructionHeuristic)(data = data,
                       graphs = graphs, printStatus = printStatus, trimColumns = False,
                       orderStrategy = orderStrategy,
                       partialCG_constructionHeuristic = partialCG_constructionHeuristic,
                       coverConstraint = coverConstraint, removeIllegalColumns = removeIllegalColumns,
-                      resourceVec = resourceVec)
+                      resourceVec = resourceVec, deadline = deadline)
 
     def __repr__(self):
         return str(self.columns)
 
-    def addColumn(self, column: Column):
-        '''Adds the column to the list of columns'''
+    def __deepcopy__(self, memo):
+        '''Copy of the columns, sharing the store and with its own copy of the
+        active columns. The list of active columns is rebuilt by the copy
+        when needed, so the copy only holds the bitset.'''
+        columns = Columns.__new__(Columns)
+        memo[id(self)] = columns
+        columns.store = self.store
+        columns.active = self.active.copy()
+        columns.interrupted = self.interrupted
+        columns.activeColumns = None
+        return columns
+
+    @property
+    def columns(self):
+        '''List of active columns, in order of addition. The list is kept until
+        columns are added or removed, and must not be changed.'''
+        if self.activeColumns == None:
+            self.activeColumns = [self.store.columns[index] for index in
+                                  np.flatnonzero(np.unpackbits(self.active, bitorder='little'))]
+        return self.activeColumns
+
+    @property
+    def rosterlineNumbers(self):
+        '''Last rosterline number given to each employee (see ColumnStore)'''
+        return self.store.rosterlineNumbers
+
+    @rosterlineNumbers.setter
+    def rosterlineNumbers(self, rosterlineNumbers):
+        self.store.rosterlineNumbers = rosterlineNumbers
 
-        self.columns.append(column)
+    def addColumn(self, column: Column):
+        '''Adds the column to the store and marks it active'''
+
+        index = self.store.append(column)
+        # Extend the bitset to the columns added to the store since (possibly
+        # by other copies), doubling its size to extend rarely
+        if index >> 3 >= len(self.active):
+            active = np.zeros(max((index >> 3) + 1, 2 * len(self.active)), dtype=np.uint8)
+            active[:len(self.active)] = self.active
+            self.active = active
+        self.active[index >> 3] |= 1 << (index & 7)
+        # Append to the list of active columns if it is kept
+        if self.activeColumns != None:
+            self.activeColumns.append(column)
 
     def addColumns(self, employee, rosterlines, data):
         '''Adds columns corresponding to the rosterlines for the given employee
@@ -57,12 +134,16 @@ class Columns:
         return newRosterlineNumbers
 
     def removeColumn(self, column: Column):
-        '''Removes the given column from the list of columns'''
+        '''Removes the given column from the active columns (it is kept in the
+        store)'''
 
-        # If the column is among the columns...
-        if column in self.columns:
+        # If the column is among the active columns...
+        index = self.store.index.get(column)
+        if (index != None and index >> 3 < len(self.active) and
+            self.active[index >> 3] & (1 << (index & 7))):
             # ...remove it
-            self.columns.remove(column)
+            self.active[index >> 3] &= 0xFF ^ (1 << (index & 7))
+            self.activeColumns = None
 
     def removeColumnsWithNode(self, node, employee):
         '''Removes all columns associated with the graph node for an employee'''
@@ -110,6 +191,29 @@ class Columns:
 
         return removedColumnNumbers
 
+    def removeColumnsNotInGraph(self, graph, employee, data):
+        '''Removes all columns for an employee whose rosterline is not a path of
+        the graph, as after nodes or arcs are removed from it (see
+        Graph.fixArcs)'''
+
+        # Initialize list of column numbers that are removed
+        removedColumnNumbers = []
+        # Iterate over all columns of the employee...
+        for column in self.columns:
+            if column.employee == employee:
+                # ...and find the nodes of the rosterline in the graph
+                path = ([graph.node(0, 0)]
+                        + [graph.node(day, column.rosterline[day - 1]) for day in data['Days']]
+                        + [graph.node(data['Days'][-1] + 1, 0)])
+                # Remove the column if a node or arc is not in the graph
+                if (None in path or
+                    any((origin, destination) not in graph.costs
+                        for origin, destination in zip(path[:-1], path[1:]))):
+                    self.removeColumn(column = column)
+                    removedColumnNumbers.append(column.rosterlineNumber)
+
+        return removedColumnNumbers
+
     def removeIllegalColumns(self, data):
         '''Removes illegal columns by checking master problem constraints'''
         # Initialize list of columns to be removed
@@ -200,10 +304,15 @@ class Columns:
                                                     partialCG_constructionHeuristic = True,
                                                     coverConstraint = '=',
                                                     removeIllegalColumns = False,
-                                                    resourceVec = ['TWMin', 'TWMin_g', 'TV']):
+                                                    resourceVec = ['TWMin', 'TWMin_g', 'TV'],
+                                                    deadline = None):
         '''Column generation with artificial variables to create initial columns.
         If trimColumns is set to True, keep only the columns that are in the
-        solution of the artificial problem'''
+        solution of the artificial problem. Returns whether the columns make the
+        artificial objective zero (success), the new rosterline numbers, and
+        whether the heuristic was interrupted because the deadline (in seconds
+        since the epoch, see time.time) passed, which is not a proof of
+        infeasibility'''
 
         # Assume construction heuristic is not able to construct columns to
         # ensure feasibility of original problem (artificial objective > 0)
@@ -265,12 +374,14 @@ class Columns:
                      SPsolutions[employee]] = solveSP_initialColumns(data=data, employee=employee,
                                                                      graph=graphs_constructionHeuristic[employee],
                                                                      extensionLimits = extensionLimits[employee],
-                                                                     resourceVec = resourceVec)
+                                                                     resourceVec = resourceVec,
+                                                                     deadline = deadline)
 
                     # Check feasibility of problem. If no solutions returned...
                     if SPobjectives[employee] == None:
-                        # ...problem is infeasible
-                        return success, newRosterlineNumbers
+                        # ...problem is infeasible, unless interrupted
+                        interrupted = deadline != None and time.time() > deadline
+                        return success, newRosterlineNumbers, interrupted
 
 
             # Add columns to self
@@ -300,6 +411,10 @@ class Columns:
             # Update iteration count
             iteration += 1
 
+            # Interrupt the heuristic if the deadline has passed
+            if deadline != None and time.time() > deadline:
+                return success, newRosterlineNumbers, True
+
             # Solve RMP with artificial variables
             feasible, MPObjective, MPSolution, MPDuals = solveMP_artificialVariables(masterProblem_artVars = masterProblem_artVars,
                                                                                      data=data,
@@ -327,7 +442,7 @@ class Columns:
                 # If no order was found, at least one employee has infeasible
                 # SP and hence the problem is infeasible
                 if order == None:
-                    return success, newRosterlineNumbers
+                    return success, newRosterlineNumbers, False
 
                 # Solve sub problems in order until a neg. red. cost solution found
                 improvingColumnFound = False
@@ -339,11 +454,12 @@ class Columns:
                                                       graph=graphs_constructionHeuristic[employee],
                                                       duals=MPDuals, extensionLimits = extensionLimits[employee],
                                                       constructionHeuristic = True, resourceVec = resourceVec,
-                                                      solutions_count = None)
+                                                      solutions_count = None, deadline = deadline)
                     # If no solution was found, one of the SPs is infeasible and
-                    # thus the original problem
+                    # thus the original problem, unless interrupted
                     if SPobjective[employee] == None:
-                        return success, newRosterlineNumbers
+                        interrupted = deadline != None and time.time() > deadline
+                        return success, newRosterlineNumbers, interrupted
                     # Indicate whether a potentially improving column is found
                     elif SPobjective[employee][1] < -epsilon:
                         improvingColumnFound = True
@@ -389,7 +505,7 @@ class Columns:
 
         # Return boolean indicating whether solution implies original problem
         # is feasible or not
-        return success, newRosterlineNumbers
+        return success, newRosterlineNumbers, False
 
     def constructionHeuristic_MIPheuristic(self, data, graphs,
                                                     trimColumns=False,
@@ -399,22 +515,33 @@ class Columns:
                                                     partialCG_constructionHeuristic = True,
                                                     coverConstraint = '=',
                                                     removeIllegalColumns = False,
-                                                    resourceVec = ['TWMin', 'TWMin_g', 'TV']):
+                                                    resourceVec = ['TWMin', 'TWMin_g', 'TV'],
+                                                    deadline = None):
         '''Returns the best feasible solution found with the MIP heuristic solver in
-        xpress'''
+        xpress. The solver is given the time left until the deadline (in seconds
+        since the epoch, see time.time) as time limit. Returns as
+        constructionHeuristic_CGartificialVariables, interrupted if no feasible
+        solution was found before the deadline'''
         # Print status
         if printStatus:
             print('Construction heuristic started (MIP heuristic)')
         # Save start time in construction heuristic
         startTime = time.time()
 
+        # Time limit of the MIP heuristic given the deadline (at least a second)
+        timeLimit = None
+        if deadline != None:
+            timeLimit = max(deadline - time.time(), 1)
+
         # Solve MIP heuristic
         completed, feasible, objective, lowerBound, solution, computationTime = solveMIP(data = data, outputPrint = False,
                                                  problemName = 'MIP_heuristic',
                                                  heuristicOnly = True,
-                                                 coverConstraint = coverConstraint)
+                                                 coverConstraint = coverConstraint,
+                                                 timeLimit = timeLimit)
         # Rosterline numbers (0 for each employee, is updated when columns are added)
         self.rosterlineNumbers = dict.fromkeys((e for e in data['Employees']),0)
+        newRosterlineNumbers = {}
         # Transform solution to columns if feasible
         if feasible:
             for employee in data['Employees']:
@@ -429,7 +556,9 @@ class Columns:
                             break
                 # Create rosterline dictionary for the employee
                 rosterlines = {1: rosterline}
-                self.addColumns(employee = employee, rosterlines = rosterlines, data = data)
+                newRosterlineNumbers[employee] = self.addColumns(employee = employee,
+                                                                 rosterlines = rosterlines,
+                                                                 data = data)
 
         # Store time spent in construction heuristic
         timeConstructionHeuristic = time.time() - startTime
@@ -437,3 +566,8 @@ class Columns:
         if printStatus:
             print('Construction heuristic complete')
             print('Time spent in construciton heuristic:', timeConstructionHeuristic)
+
+        # Interrupted if no feasible solution was found before the deadline
+        success = feasible == 'True'
+        interrupted = not success and deadline != None and time.time() > deadline
+        return success, newRosterlineNumbers, interrupted
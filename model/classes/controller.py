@@ -0,0 +1,129 @@
+import numpy as np
+
+class Controller:
+    '''Pricing controller adapting the label extension limit and the number of
+    SP solutions returned per SP (columns per SP) during column generation.
+
+    After each CG iteration, the controller observes the time spent solving
+    the RMP and the SPs, the number of improving columns found and the number
+    of SPs whose extension limit had to be relaxed. The two settings are
+    changed one at a time, alternating, by one step on the ladders
+    extensionLimitSteps and solutionsCountSteps. A setting keeps being changed
+    in the same direction while the time per improving column decreases, and
+    the direction is reversed when it increases. The extension limit is always
+    increased when SPs needed their limit relaxed, as the limited labelling was
+    then wasted.
+
+    All decisions are logged (see log), and a run is replayed by giving the
+    log of an earlier run as replay. Decisions are then taken from the log
+    instead of the observations, which depend on timing. The controller has
+    its own random numbers (randomState), seeded with seed, for the random
+    choices of column generation (e.g. the random SP order, see
+    selectOrderSP). The seed is logged with each decision, so a replayed run
+    makes the same random choices. If no seed is given, the seed of the
+    replayed log is used, or else a random one.
+    '''
+
+    def __init__(self, labelExtensionLimits = [], SPSolutionsCount = 1,
+                 extensionLimitSteps = [1, 2, 5, 10, 20, 50, None],
+                 solutionsCountSteps = [1, 2, 3, 5, 10],
+                 replay = None, seed = None):
+        # Ladders of settings (None extension limit is no limit)
+        self.extensionLimitSteps = extensionLimitSteps
+        self.solutionsCountSteps = solutionsCountSteps
+        # Current settings, starting on the closest steps
+        extensionLimit = labelExtensionLimits[0] if labelExtensionLimits else None
+        self.extensionLimitStep = self.closestStep(extensionLimitSteps, extensionLimit)
+        self.solutionsCountStep = self.closestStep(solutionsCountSteps, SPSolutionsCount)
+        # Direction of change of each setting, starting with cheaper SPs and
+        # more columns per SP
+        self.directions = {'extensionLimit': -1, 'solutionsCount': 1}
+        # Setting changed in the last decision
+        self.changed = None
+        # Time per improving column in the last decision
+        self.previousCost = None
+        # Log of decisions, and decisions to replay
+        self.log = []
+        self.replay = replay
+        # Random numbers, with the seed of the replayed run if replaying (a
+        # random seed is drawn from the operating system, not numpy)
+        if seed == None and replay and 'seed' in replay[0]:
+            seed = replay[0]['seed']
+        if seed == None:
+            seed = int(np.random.SeedSequence().generate_state(1)[0])
+        self.seed = seed
+        self.randomState = np.random.RandomState(seed)
+
+    def __repr__(self):
+        return ('Extension limit: ' + str(self.extensionLimit) + ', '
+              + 'SP solutions count: ' + str(self.solutionsCount))
+
+    @property
+    def extensionLimit(self):
+        return self.extensionLimitSteps[self.extensionLimitStep]
+
+    @property
+    def solutionsCount(self):
+        return self.solutionsCountSteps[self.solutionsCountStep]
+
+    def current(self):
+        '''Current extension limits (as a list, see solveSP) and SP solutions
+        count'''
+        extensionLimits = [self.extensionLimit] if self.extensionLimit != None else []
+        return extensionLimits, self.solutionsCount
+
+    def closestStep(self, steps, value):
+        '''Index of the step closest to value (None is above all values)'''
+        if value == None:
+            return len(steps) - 1
+        return min(range(len(steps)), key = lambda step:
+                   abs((steps[step] if steps[step] != None else float('inf')) - value))
+
+    def decide(self, RMPTime, SPTime, improvingColumns, relaxedSPs):
+        '''Decide the extension limits and SP solutions count of the next
+        iteration from the observations of the last one. Returns the
+        extension limits (as a list, see solveSP) and SP solutions count.'''
+
+        observations = {'RMPTime': RMPTime, 'SPTime': SPTime,
+                        'improvingColumns': improvingColumns,
+                        'relaxedSPs': relaxedSPs}
+
+        # Replay the logged decision if replaying
+        if self.replay != None and len(self.log) < len(self.replay):
+            decision = self.replay[len(self.log)]
+            self.extensionLimitStep = self.closestStep(self.extensionLimitSteps,
+                                                       decision['extensionLimit'])
+            self.solutionsCountStep = self.closestStep(self.solutionsCountSteps,
+                                                       decision['solutionsCount'])
+        else:
+            # Time per improving column
+            cost = (RMPTime + SPTime) / max(improvingColumns, 1)
+            # Reverse the last change if it made things worse
+            if (self.changed != None and self.previousCost != None
+                and cost > self.previousCost):
+                self.directions[self.changed] *= -1
+            self.previousCost = cost
+
+            # Increase the extension limit if SPs needed it relaxed, else
+            # change the setting not changed last
+            if relaxedSPs > 0:
+                self.changed = 'extensionLimit'
+                self.directions['extensionLimit'] = 1
+            elif self.changed == 'extensionLimit':
+                self.changed = 'solutionsCount'
+            else:
+                self.changed = 'extensionLimit'
+            if self.changed == 'extensionLimit':
+                self.extensionLimitStep = min(max(self.extensionLimitStep + self.directions['extensionLimit'], 0),
+                                              len(self.extensionLimitSteps) - 1)
+            else:
+                self.solutionsCountStep = min(max(self.solutionsCountStep + self.directions['solutionsCount'], 0),
+                                              len(self.solutionsCountSteps) - 1)
+
+        # Log the decision
+        self.log.append({'observations': observations,
+                         'extensionLimit': self.extensionLimit,
+                         'solutionsCount': self.solutionsCount,
+                         'seed': self.seed})
+
+        return self.current()
@@ -0,0 +1,239 @@
+import numpy as np
+
+class CSRGraph:
+    '''Compact representation of the graph of an employee (see Graph). Nodes
+    are given by arrays of day and shift type, in order of day and the
+    shift types of the employee, with the start node first (day 0) and the
+    end node last (day nDays + 1), both with shift type 0. Arcs are stored in
+    compressed sparse row (CSR) format: the arcs out of node n are
+    arcStart[n] to arcStart[n + 1] in arcDestination and arcCost, with costs
+    as in the graph before duals are added.
+
+    Arcs are found from boolean succession matrices allowed[d, i, j], telling
+    whether shift type j may follow shift type i on day d (see
+    successionMatrices). Nodes are found by day and shift type in O(1) from
+    nodeIndex (-1 if not in the graph).
+    '''
+
+    def __init__(self, data, employee):
+        # Shift types that can be assigned to the employee
+        self.shiftTypes = employeeShiftTypes(data, employee)
+        nDays = data['Days'][-1]
+
+        # Nodes: start node, shift types on each day and end node
+        self.nodeDay = np.array([0] + [day for day in data['Days'] for _ in self.shiftTypes]
+                                + [nDays + 1], dtype=np.int64)
+        self.nodeShiftType = np.array([0] + [shiftType for _ in data['Days']
+                                             for shiftType in self.shiftTypes] + [0],
+                                      dtype=np.int64)
+        self.active = np.ones(len(self.nodeDay), dtype=bool)
+
+        # Succession matrices and costs of all arcs
+        self.allowed, self.cost = successionMatrices(data, employee, self.shiftTypes)
+        self.build()
+
+    def __repr__(self):
+        return ('Nodes: ' + str(int(self.active.sum())) + ', '
+              + 'Arcs: ' + str(len(self.arcDestination)))
+
+    def build(self):
+        '''Build the node index and CSR arcs of the active nodes'''
+        # Index active nodes by day and shift type
+        self.nodeIndex = np.full((self.nodeDay.max() + 1, self.allowed.shape[2]), -1,
+                                 dtype=np.int64)
+        nodes = np.flatnonzero(self.active)
+        self.nodeIndex[self.nodeDay[nodes], self.nodeShiftType[nodes]] = nodes
+
+        # Arcs from active nodes on each day to active nodes on the next day
+        origins, destinations = [], []
+        for day in range(self.nodeDay.max()):
+            origin = nodes[self.nodeDay[nodes] == day]
+            destination = nodes[self.nodeDay[nodes] == day + 1]
+            o, d = np.nonzero(self.allowed[day + 1][np.ix_(self.nodeShiftType[origin],
+                                                           self.nodeShiftType[destination])])
+            origins.append(origin[o])
+            destinations.append(destination[d])
+        self.arcOrigin = np.concatenate(origins)
+        self.arcDestination = np.concatenate(destinations)
+        self.arcCost = self.cost[self.nodeDay[self.arcDestination],
+                                 self.nodeShiftType[self.arcOrigin],
+                                 self.nodeShiftType[self.arcDestination]]
+        self.arcStart = np.concatenate(([0], np.cumsum(np.bincount(self.arcOrigin,
+                                                                   minlength=len(self.nodeDay)))))
+
+    def node(self, day, shiftType):
+        '''Index of the node on day with shift type, or -1 if not in the graph'''
+        if 0 <= day < self.nodeIndex.shape[0] and 0 <= shiftType < self.nodeIndex.shape[1]:
+            return self.nodeIndex[day, shiftType]
+        return -1
+
+    def removeNode(self, day, shiftType, build = True):
+        '''Remove the node on day with shift type, and all its arcs. Arcs are
+        rebuilt unless build is False (when removing several nodes and arcs).'''
+        index = self.node(day, shiftType)
+        if index != -1:
+            self.active[index] = False
+            if build:
+                self.build()
+
+    def removeArc(self, day, i, j, build = True):
+        '''Remove the arc from shift type i on day - 1 to shift type j on day
+        (see removeNode)'''
+        if self.allowed[day, i, j]:
+            self.allowed[day, i, j] = False
+            if build:
+                self.build()
+
+    def reduce(self, tables):
+        '''Remove nodes and arcs not on any resource feasible path, given the
+        compiled resource tables (see feasibleArcs). Nothing is removed if the
+        graph has no resource feasible path. Returns the number of nodes and
+        arcs removed.'''
+        nodes, arcs = int(self.active.sum()), len(self.arcDestination)
+        alive, arcAlive = feasibleArcs(self.nodeDay, self.nodeShiftType,
+                                       self.arcOrigin, self.arcDestination, tables)
+        if not alive[-1]:
+            return 0, 0
+        dead = ~arcAlive
+        self.allowed[self.nodeDay[self.arcDestination[dead]],
+                     self.nodeShiftType[self.arcOrigin[dead]],
+                     self.nodeShiftType[self.arcDestination[dead]]] = False
+        self.active &= alive
+        self.build()
+        return nodes - int(self.active.sum()), arcs - len(self.arcDestination)
+
+def employeeShiftTypes(data, employee):
+    '''Shift types that can be assigned to the employee, given the skill level
+    of the employee and requirement of the shift type: working shift types
+    requiring a skill of the employee, then all off shift types.'''
+
+    shiftTypes = [shiftType for shiftType in data['ShiftTypesWorking']
+                  if any(requiredSkill in data['SkillsEmployee'][employee]
+                         for requiredSkill in data['SkillsShiftType'][shiftType])]
+    return shiftTypes + [shiftType for shiftType in data['ShiftTypesOff']]
+
+def successionMatrices(data, employee, shiftTypes):
+    '''Boolean succession matrices allowed[d, i, j], telling whether shift type
+    j on day d may follow shift type i on day d - 1, and the cost cost[d, i, j]
+    of the arc. Shift type 0 is the start node (day 0) and the end node (day
+    nDays + 1). Successions are illegal if
+
+        - j is in FollowingShiftsIllegal[i],
+        - d is a Sunday and one of i and j is working and the other off,
+        - d is a Saturday, i is working and ends later than H and j is off,
+        - i on day d - 1 and j on day d form a two day illegal pattern.
+
+    Costs are the cost of working j on d, and of reduced rest and two day
+    rewarded and penalized patterns between i and j (see patternArrays).
+    '''
+
+    nDays = data['Days'][-1]
+    size = max(data['ShiftTypes']) + 1
+    patterns = data['PatternArrays'][employee]
+    working = np.zeros(size, dtype=bool)
+    working[data['ShiftTypesWorking']] = True
+    off = np.zeros(size, dtype=bool)
+    off[data['ShiftTypesOff']] = True
+    employeeTypes = np.zeros(size, dtype=bool)
+    employeeTypes[shiftTypes] = True
+
+    # Cost of working each shift type on each day
+    C = np.zeros((nDays + 2, size))
+    for day in data['Days']:
+        for shiftType in shiftTypes:
+            C[day, shiftType] = data['C'][(employee, day, shiftType)]
+
+    # Successions of shift types, and reduced rest
+    illegal = np.zeros((size, size), dtype=bool)
+    penalty = np.zeros((size, size), dtype=bool)
+    for i in data['FollowingShiftsIllegal']:
+        illegal[i, data['FollowingShiftsIllegal'][i]] = True
+    for i in data['FollowingShiftsPenalty']:
+        penalty[i, data['FollowingShiftsPenalty'][i]] = True
+    # Working/off both days of the weekend
+    mixed = (working[:, None] & off[None, :]) | (off[:, None] & working[None, :])
+    # Working late before a day off
+    late = np.zeros(size, dtype=bool)
+    for shiftType in data['ShiftTypesWorking']:
+        late[shiftType] = data['T_E'][shiftType] > data['H']
+    lateBeforeOff = (working & late)[:, None] & off[None, :]
+
+    allowed = np.zeros((nDays + 2, size, size), dtype=bool)
+    cost = np.zeros((nDays + 2, size, size))
+    # Arcs from the start node
+    allowed[1, 0, employeeTypes] = True
+    cost[1, 0] = C[1]
+    # Arcs between days
+    for day in data['Days'][1:]:
+        allowed[day] = employeeTypes[:, None] & employeeTypes[None, :] & ~illegal
+        if day in data['DaysOnWeekday']['SUN']:
+            allowed[day] &= ~mixed
+        if day in data['DaysOnWeekday']['SAT']:
+            allowed[day] &= ~lateBeforeOff
+        cost[day] = C[day][None, :]
+        cost[day] = np.where(penalty, cost[day] + data['C_R'], cost[day])
+        # Two day patterns starting on the previous day (see patternArrays)
+        allowed[day] &= ~patterns['Illegal'][day - 1]
+        cost[day] = cost[day] - patterns['Rewarded'][day - 1]
+        cost[day] = cost[day] + patterns['Penalized'][day - 1]
+    # Arcs to the end node
+    allowed[nDays + 1, employeeTypes, 0] = True
+
+    return allowed, cost
+
+def feasibleArcs(nodeDay, nodeShiftType, arcOrigin, arcDestination, tables):
+    '''Nodes and arcs of a graph on a resource feasible path from the start
+    node (day 0) to the end node (last day). The graph is given by arrays of
+    node days and shift types and arc origins and destinations, and resources
+    by their compiled tables (see Resources.compile).
+
+    Resource values reaching each node are bounded by an interval per
+    component, propagated forward day by day through the REFs and resource
+    windows. An arc is dead if its extended interval lies outside the resource
+    window of its destination in some component, as no label can then be
+    extended feasibly along it. Nodes are dead if not reached from the start
+    node, or not reaching the end node, through arcs that are not dead. This
+    is repeated until nothing more is removed. Returns boolean arrays of nodes
+    and arcs alive.
+    '''
+
+    nNodes, K = len(nodeDay), len(tables['initial'])
+    start, end = int(np.argmin(nodeDay)), int(np.argmax(nodeDay))
+    lastDay = int(nodeDay[end])
+    arcAlive = np.ones(len(arcOrigin), dtype=bool)
+    while True:
+        # Forward: intervals of resource values reaching each node
+        lwr = np.full((nNodes, K), float('inf'))
+        upr = np.full((nNodes, K), -float('inf'))
+        reached = np.zeros(nNodes, dtype=bool)
+        lwr[start] = upr[start] = tables['initial']
+        reached[start] = True
+        for day in range(1, lastDay + 1):
+            arcs = np.flatnonzero(arcAlive & reached[arcOrigin] &
+                                  (nodeDay[arcDestination] == day))
+            origin, destination = arcOrigin[arcs], arcDestination[arcs]
+            i, j = nodeShiftType[origin], nodeShiftType[destination]
+            keep, add = tables['keep'][day, i, j], tables['add'][day, i, j]
+            # Extend intervals along arcs and intersect with resource windows
+            extendedLwr = np.maximum(keep * lwr[origin] + add, tables['lwr'][day, j])
+            extendedUpr = np.minimum(keep * upr[origin] + add, tables['upr'][day, j])
+            feasible = np.all(extendedLwr <= extendedUpr, axis=1)
+            arcAlive[arcs[~feasible]] = False
+            destination = destination[feasible]
+            np.minimum.at(lwr, destination, extendedLwr[feasible])
+            np.maximum.at(upr, destination, extendedUpr[feasible])
+            reached[destination] = True
+        arcAlive &= reached[arcOrigin]
+
+        # Backward: nodes reaching the end node
+        reaching = np.zeros(nNodes, dtype=bool)
+        reaching[end] = True
+        for day in range(lastDay - 1, -1, -1):
+            arcs = arcAlive & reaching[arcDestination] & (nodeDay[arcOrigin] == day)
+            reaching[arcOrigin[arcs]] = True
+
+        alive = reached & reaching
+        arcAliveNext = arcAlive & alive[arcOrigin] & alive[arcDestination]
+        if np.array_equal(arcAliveNext, arcAlive):
+            return alive, arcAlive
+        arcAlive = arcAliveNext
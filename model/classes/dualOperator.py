@@ -0,0 +1,143 @@
+import numpy as np
+
+class DualOperator:
+    '''Linear operator mapping the dual variables of the MP to the costs of the
+    arcs of a graph (see Graph.update_costs). The costs of the arcs are
+
+        cost = static + sum over dual families v of A_v x_v
+
+    where static is the objective function cost of the arcs (without dual
+    variables), x_v is the flattened vector of dual variables of family v
+    and A_v is a sparse matrix stored as index arrays (rows, cols) and
+    coefficients. Arcs into the end node are not included, as their costs are
+    not updated.
+
+    The matrices are found once by evaluating the update_dual_<name> functions
+    of the graph on dual variables returning symbolic terms (see DualTerm),
+    so that refreshing the costs is one sparse matrix-vector product per
+    family. Products are summed per family in the same order as the
+    update_dual_<name> functions, so costs are the same as when evaluating
+    them directly.
+    '''
+
+    def __init__(self, graph, dual_variables, data, employee):
+        endDay = data['Days'][-1] + 1
+        # Arcs with updated costs, in order of nodes and neighbors
+        self.arcs = [(origin, destination) for origin in graph.nodes
+                     for destination in origin.neighbors
+                     if destination.day != endDay]
+        # Objective function cost of each arc
+        self.static = np.array([graph.objective_cost(destination.day, origin.shiftType,
+                                                     destination.shiftType, data, employee)
+                                for origin, destination in self.arcs], dtype=float)
+
+        # Sparse matrix of each dual family
+        self.families = tuple(dual_variables)
+        self.keys, self.rows, self.cols, self.coefficients = {}, {}, {}, {}
+        for v in self.families:
+            index = {}
+            rows, cols, coefficients = [], [], []
+            probe = DualProbe()
+            for arc, (origin, destination) in enumerate(self.arcs):
+                term = getattr(graph, 'update_dual_%s' % v)(probe,
+                                                            destination.day,
+                                                            origin.shiftType,
+                                                            destination.shiftType,
+                                                            data,
+                                                            employee)
+                # Families without terms on the arc return 0
+                if not isinstance(term, DualTerm):
+                    continue
+                for key, coefficient in term.terms:
+                    rows.append(arc)
+                    cols.append(index.setdefault(key, len(index)))
+                    coefficients.append(coefficient)
+            self.keys[v] = list(index)
+            self.rows[v] = np.array(rows, dtype=np.int64)
+            self.cols[v] = np.array(cols, dtype=np.int64)
+            self.coefficients[v] = np.array(coefficients, dtype=float)
+
+    def __repr__(self):
+        return ('Arcs: ' + str(len(self.arcs)) + ', '
+              + 'Nonzeros: ' + str(sum(len(self.rows[v]) for v in self.families)))
+
+    def restricted(self, graph):
+        '''Copy of the operator restricted to the arcs still in the graph, after
+        nodes or arcs are removed. Arcs are matched by the days and shift
+        types of their nodes, as the graph may have copied its nodes (see
+        Graph.materialize).'''
+        arcs = {(origin.day, origin.shiftType, destination.day, destination.shiftType):
+                (origin, destination) for origin, destination in graph.costs}
+        arcs = [arcs.get((origin.day, origin.shiftType, destination.day, destination.shiftType))
+                for origin, destination in self.arcs]
+        kept = np.array([arc != None for arc in arcs], dtype=bool)
+        # Index of each kept arc in the restricted operator
+        index = np.cumsum(kept) - 1
+
+        operator = DualOperator.__new__(DualOperator)
+        operator.arcs = [arc for arc in arcs if arc != None]
+        operator.static = self.static[kept]
+        operator.families = self.families
+        operator.keys, operator.rows, operator.cols, operator.coefficients = {}, {}, {}, {}
+        for v in self.families:
+            entries = kept[self.rows[v]]
+            operator.keys[v] = self.keys[v]
+            operator.rows[v] = index[self.rows[v][entries]]
+            operator.cols[v] = self.cols[v][entries]
+            operator.coefficients[v] = self.coefficients[v][entries]
+        return operator
+
+    def costs(self, dual_variables, constructionHeuristic = False):
+        '''Costs of the arcs (see arcs) with the dual variables. Objective
+        function costs are disregarded in the construction heuristic.'''
+        if constructionHeuristic:
+            cost = np.zeros(len(self.arcs))
+        else:
+            cost = self.static.copy()
+        for v in self.families:
+            if len(self.rows[v]) == 0:
+                continue
+            # Flattened dual variables of the family
+            dual_variable = dual_variables[v]
+            x = np.fromiter((dual_variable[key] for key in self.keys[v]),
+                            dtype=float, count=len(self.keys[v]))
+            cost += np.bincount(self.rows[v], weights=self.coefficients[v] * x[self.cols[v]],
+                                minlength=len(self.arcs))
+        return cost
+
+class DualTerm:
+    '''Symbolic linear expression in dual variables, as a list of (key,
+    coefficient) terms in order of evaluation. Supports the arithmetic used by
+    the update_dual_<name> functions of Graph.'''
+
+    def __init__(self, terms):
+        self.terms = terms
+
+    def __neg__(self):
+        return DualTerm([(key, -coefficient) for key, coefficient in self.terms])
+
+    def __add__(self, other):
+        if isinstance(other, DualTerm):
+            return DualTerm(self.terms + other.terms)
+        if other == 0:
+            return self
+        return NotImplemented
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        return self + (-other)
+
+    def __rsub__(self, other):
+        return (-self) + other
+
+    def __mul__(self, other):
+        return DualTerm([(key, coefficient * other) for key, coefficient in self.terms])
+
+    __rmul__ = __mul__
+
+class DualProbe:
+    '''Dual variables of a family returning a DualTerm for each key'''
+
+    def __getitem__(self, key):
+        return DualTerm([(key, 1.0)])
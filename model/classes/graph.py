@@ -1,177 +1,159 @@
+import copy
+import numpy as np
 from node import Node
+from csrGraph import CSRGraph, feasibleArcs
+from dualOperator import DualOperator
 
 class Graph:
     '''Directed graph represented by nodes (dependent on Node class), arc costs
     stored in dictionary indexed by origin-destination tuple. Implementation
-    for SPPRC'''
-
-    def __init__(self, data, employee):
-        '''Start with empty graph'''
+    for SPPRC. Nodes and arcs are created from a compact array representation
+    (see CSRGraph), and nodes are found by day and shift type (see node).
+
+    Graphs with the same nodes and arcs, as for employees with the same skills
+    and illegal patterns, share their nodes through templates, and copies of a
+    graph share its nodes. Only the costs are kept per graph. Shared nodes are
+    never changed: a graph gets its own copy of the nodes before it is changed
+    (see materialize), so copying a graph in branching is copy-on-write.
+
+    Copy-on-write is per graph rather than per node: the first change to a
+    graph sharing its nodes copies all of its nodes, arcs (costs) and the
+    compact graph, i.e. O(nodes + arcs) memory for that graph, while graphs of
+    other employees stay shared. Later changes to the graph are made in place.
+
+    Nodes and arcs not on any resource feasible path are removed when the
+    graph is created with resources, and by preprocess after the graph is
+    changed.'''
+
+    def __init__(self, data, employee, templates = None, resources = None):
+        '''Start with empty graph. Templates is a dict of nodes shared by
+        graphs of the same topology (one per graph if not given). If resources
+        are given (see Resources), nodes and arcs not on any resource feasible
+        path are not created.'''
         # Represented by array of nodes...
         self.nodes = []
         # ...and dictionary of (arc) costs
         self.costs = {}
-
-        '''Find shift types that can be assigned to the employee, given the
-        skill level of the employee and requirement of the shift type.
-        '''
-        # Initialize list of shift types that may be assigned
-        EmployeeShiftTypes = []
-        # Iterate over working shift types
-        for shiftType in data['ShiftTypesWorking']:
-            # Iterate over the skill qualifications of the shift type
-            for requiredSkill in data['SkillsShiftType'][shiftType]:
-                # If the qualification is amongst the employee's
-                if requiredSkill in data['SkillsEmployee'][employee]:
-                    # Add the shift type to the list and continue to next shift
-                    EmployeeShiftTypes.append(shiftType)
-        # Add off shifts that can be worked by all employees
-        EmployeeShiftTypes += [s for s in data['ShiftTypesOff']]
-
-        '''Add start node'''
-        name = 1
-        initial_node = Node(name = name, day = 0, shiftType = 0)
-        self.add_node(initial_node)
-
-        '''Add rest of graph'''
-        # Initialize list for storing nodes of previos day
-        prevNodes = [initial_node]
-        # Create nodes other than start and end nodes, add arcs
-        for day in data['Days']:
-            curNodes = []
-            for shiftType in EmployeeShiftTypes:
-                name += 1
-                curNode = Node(name = name, day = day, shiftType = shiftType)
-                curNodes.append(curNode)
-                # Add arcs from previous day nodes if conditions satisfied
-                for prevNode in prevNodes:
-                    # Add cost of working shift to arc
-                    arc_cost = data['C'][(employee, curNode.day, curNode.shiftType)]
-                    # Disregard all but cost of working for artificial origin
-                    # or destination
-                    if prevNode.shiftType != 0 and curNode.shiftType != 0:
-                        # Required rest
-                        if (prevNode.shiftType in data['FollowingShiftsIllegal'] and
-                            curNode.shiftType in data['FollowingShiftsIllegal'][prevNode.shiftType]):
-                            continue
-                        # Add cost of reduced rest to arc
-                        if (prevNode.shiftType in data['FollowingShiftsPenalty']
-                            and curNode.shiftType in
-                            data['FollowingShiftsPenalty'][prevNode.shiftType]):
-                            arc_cost += data['C_R']
-                        # Both or none weekend days working
-                        if (curNode.day in data['DaysOnWeekday']['SUN'] and
-                              ((prevNode.shiftType in data['ShiftTypesWorking'] and
-                                curNode.shiftType in data['ShiftTypesOff']) or
-                              (prevNode.shiftType in data['ShiftTypesOff'] and
-                               curNode.shiftType in data['ShiftTypesWorking']))):
-                                continue
-                        # No Friday night shift before free weekend
-                        if (curNode.day in data['DaysOnWeekday']['SAT'] and
-                              prevNode.shiftType in data['ShiftTypesWorking'] and
-                              data['T_E'][prevNode.shiftType] > data['H'] and
-                              curNode.shiftType in data['ShiftTypesOff']):
-                              continue
-                        # Two day illegal patterns
-                        # Ensure shift types are working shifts and may be in pattern
-                        if (employee in data['PatternsIllegal'] and
-                            prevNode.shiftType in data['ShiftTypesWorking'] and
-                            curNode.shiftType in data['ShiftTypesWorking']):
-                            illegalPatternFound = False
-                            prevGroup = None # Group of previos shift type
-                            curGroup = None # Group of current shift type
-                            for pat in data['PatternsIllegal'][employee]:
-                                if (data['PatternDuration'][(employee,pat)] == 2 and
-                                    prevNode.day in data['PatternDays'][(employee, pat)]):
-                                    # If not already done, identify shift groups assigned
-                                    if prevGroup == None:
-                                        for shiftGroup in data['ShiftTypesGroup']:
-                                            if (prevNode.shiftType in
-                                                data['ShiftTypesGroup'][shiftGroup]):
-                                                prevGroup = shiftGroup
-                                            if (curNode.shiftType in
-                                                data['ShiftTypesGroup'][shiftGroup]):
-                                                curGroup = shiftGroup
-                                    # Check if illegal pattern is found
-                                    if (data['M'][(employee, pat, 1, prevGroup)] == 1 and
-                                        data['M'][(employee, pat, 2, curGroup)] == 1):
-                                        illegalPatternFound = True
-                                        break
-                            # Do not create arc if an illegal pattern was found
-                            if illegalPatternFound:
-                                continue
-                        # Two day rewarded patterns
-                        # Ensure shift types are working shifts and may be in pattern
-                        if (employee in data['PatternsRewarded'] and
-                            prevNode.shiftType in data['ShiftTypesWorking'] and
-                            curNode.shiftType in data['ShiftTypesWorking']):
-                            prevGroup = None # Group of previos shift type
-                            curGroup = None # Group of current shift type
-                            for pat in data['PatternsRewarded'][employee]:
-                                if (data['PatternDuration'][(employee,pat)] == 2 and
-                                    prevNode.day in data['PatternDays'][(employee, pat)]):
-                                    # If not already done, identify shift groups assigned
-                                    if prevGroup == None:
-                                        for shiftGroup in data['ShiftTypesGroup']:
-                                            if (prevNode.shiftType in
-                                                data['ShiftTypesGroup'][shiftGroup]):
-                                                prevGroup = shiftGroup
-                                            if (curNode.shiftType in
-                                                data['ShiftTypesGroup'][shiftGroup]):
-                                                curGroup = shiftGroup
-                                    # Check if rewarded/penalized pattern is found
-                                    if (data['M'][(employee, pat, 1, prevGroup)] == 1 and
-                                        data['M'][(employee, pat, 2, curGroup)] == 1):
-                                        # Change arc cost
-                                        arc_cost -= data['R'][(employee, pat)]
-                                        # Assume there are no identical rewarded patterns
-                                        break
-                        # Two day penalized patterns
-                        # Ensure shift types are working shifts and may be in pattern
-                        if (employee in data['PatternsPenalized'] and
-                              prevNode.shiftType in data['ShiftTypesWorking'] and
-                              curNode.shiftType in data['ShiftTypesWorking']):
-                            prevGroup = None # Group of previos shift type
-                            curGroup = None # Group of current shift type
-                            for pat in data['PatternsPenalized'][employee]:
-                                if (data['PatternDuration'][(employee,pat)] == 2 and
-                                    prevNode.day in data['PatternDays'][(employee, pat)]):
-                                    # If not already done, identify shift groups assigned
-                                    if prevGroup == None:
-                                        for shiftGroup in data['ShiftTypesGroup']:
-                                            if (prevNode.shiftType in
-                                                data['ShiftTypesGroup'][shiftGroup]):
-                                                prevGroup = shiftGroup
-                                            if (curNode.shiftType in
-                                                data['ShiftTypesGroup'][shiftGroup]):
-                                                curGroup = shiftGroup
-                                    # Check if rewarded/penalized pattern is found
-                                    if (data['M'][(employee, pat, 1, prevGroup)] == 1 and
-                                        data['M'][(employee, pat, 2, curGroup)] == 1):
-                                        # Change arc cost
-                                        arc_cost += data['P'][(employee, pat)]
-                                        # Assume there are no identical penalized patterns
-                                        break
-
-                    self.add_arc(origin=prevNode, destination=curNode, cost=arc_cost)
-            prevNodes = curNodes
-
-        # Create end node, add arcs
-        node = Node(name = name + 1, day = data['Days'][-1] + 1, shiftType = 0)
-        # Add node to graph
-        self.add_node(node)
-        # Add arcs from previous day nodes to end node
-        for prevNode in prevNodes:
-            # Add arc to graph
-            self.add_arc(origin=prevNode, destination=node)
+        # State graphs expanded from the graph (see stateSpaceDP), indexed by
+        # resources. They do not depend on costs, but on the nodes and arcs
+        self.stateSpaces = {}
+        # Dual variables (and construction heuristic flag) the costs were last
+        # updated with (see update_costs)
+        self.costDuals = None
+        # Operator mapping dual variables to arc costs (see DualOperator),
+        # built when costs are first updated, and restricted to the remaining
+        # arcs when nodes or arcs have been removed
+        self.dualOperator = None
+        self.arcsRemoved = False
+        # Resources the graph was last preprocessed with (see preprocess), and
+        # the number of nodes and arcs removed when the graph was created
+        self.preprocessed = None
+        self.reduction = (0, 0)
+
+        # Compact graph (see CSRGraph), from which nodes and arcs are created.
+        # It is kept updated when nodes and arcs are removed, and set to None
+        # if nodes or arcs are added
+        self.csr = CSRGraph(data, employee)
+        # Nodes indexed by day and shift type
+        self.lookup = {}
+        # Remove nodes and arcs not on any resource feasible path
+        if resources != None:
+            self.reduction = self.csr.reduce(resources.compile(data, employee))
+            self.preprocessed = tuple(resources.resource_list)
+
+        '''Create nodes (named in order) and arcs of the compact graph, unless
+        a graph of the same topology has already created them'''
+        if templates == None:
+            templates = {}
+        key = (tuple(self.csr.shiftTypes), self.csr.allowed.tobytes(),
+               self.csr.active.tobytes())
+        if key not in templates:
+            nodes = {}
+            for index in np.flatnonzero(self.csr.active):
+                nodes[index] = Node(name = len(nodes) + 1, day = int(self.csr.nodeDay[index]),
+                                    shiftType = int(self.csr.nodeShiftType[index]))
+            arcs = []
+            for index, origin in nodes.items():
+                for arc in range(self.csr.arcStart[index], self.csr.arcStart[index + 1]):
+                    destination = nodes[self.csr.arcDestination[arc]]
+                    origin.neighbors.append(destination)
+                    arcs.append((origin, destination))
+            nodes = list(nodes.values())
+            lookup = {(node.day, node.shiftType): node for node in nodes}
+            templates[key] = {'nodes': nodes, 'arcs': arcs, 'lookup': lookup,
+                              'share': {'graphs': 0}}
+        template = templates[key]
+        self.nodes = template['nodes']
+        self.lookup = template['lookup']
+        self.costs = dict(zip(template['arcs'], self.csr.arcCost.tolist()))
+        # Number of graphs sharing the nodes (and lookup), shared by them
+        self.nodeShare = template['share']
+        self.nodeShare['graphs'] += 1
+
+    def __deepcopy__(self, memo):
+        '''Copy of the graph. The nodes, the compact graph and the dual
+        operator are shared with the copy rather than copied, and the graph
+        and its copy each get their own copy of the nodes before they are
+        changed (see materialize). Only the costs are copied. The graph
+        itself is not changed: the count of graphs sharing the nodes, held by
+        all of them, is increased.'''
+        graph = Graph.__new__(Graph)
+        memo[id(self)] = graph
+        for attribute, value in self.__dict__.items():
+            if attribute in ['nodes', 'lookup', 'csr', 'dualOperator', 'costDuals',
+                             'nodeShare']:
+                setattr(graph, attribute, value)
+            elif attribute in ['costs', 'stateSpaces']:
+                setattr(graph, attribute, dict(value))
+            else:
+                setattr(graph, attribute, copy.deepcopy(value, memo))
+        # Nodes of the graph are now shared with the copy
+        graph.nodeShare['graphs'] += 1
+        return graph
+
+    def materialize(self):
+        '''Give the graph its own copy of shared nodes, before it is changed.
+        Returns a dict of the shared nodes and their copies (empty if nodes
+        were not shared). All nodes and arcs of the graph are copied at once
+        (see Graph). Graphs freed without being changed still count as sharing
+        the nodes, so the last graph left may copy nodes it no longer shares.'''
+        if self.nodeShare['graphs'] <= 1:
+            return {}
+        copies = {node: Node(name = node.name, day = node.day, shiftType = node.shiftType)
+                  for node in self.nodes}
+        for node in self.nodes:
+            copies[node].neighbors = [copies[neighbor] for neighbor in node.neighbors]
+        self.nodes = [copies[node] for node in self.nodes]
+        self.lookup = {(node.day, node.shiftType): node for node in self.nodes}
+        self.costs = {(copies[origin], copies[destination]): cost
+                      for (origin, destination), cost in self.costs.items()}
+        if self.csr != None:
+            self.csr = copy.deepcopy(self.csr)
+        # Expanded state graphs and the dual operator refer to shared nodes
+        self.stateSpaces = {}
+        self.arcsRemoved = True
+        # The graph no longer shares the nodes
+        self.nodeShare['graphs'] -= 1
+        self.nodeShare = {'graphs': 1}
+        return copies
 
     def __repr__(self):
         return str(self.nodes)
 
     def add_node(self, node: Node):
         '''Add node (and neighbors) to graph. Ignore if node already exists'''
+        # Copy shared nodes before changing them (see materialize)
+        node = self.materialize().get(node, node)
+        # Changing the graph invalidates expanded state graphs and the dual
+        # operator, and new arcs get default costs
+        self.stateSpaces = {}
+        self.dualOperator = None
+        self.preprocessed = None
+        self.costDuals = None
+        self.csr = None
         if node not in self.nodes:
             self.nodes.append(node)
+            self.lookup[(node.day, node.shiftType)] = node
             # Recursively add neighbors
             for neighbor in node.neighbors:
                 self.add_node(neighbor)
@@ -180,6 +162,16 @@ class Graph:
 
     def add_arc(self, origin: Node, destination: Node, cost: float = None):
         '''Add arc to graph (change neighborhoods in graph)'''
+        # Copy shared nodes before changing them (see materialize)
+        copies = self.materialize()
+        origin, destination = copies.get(origin, origin), copies.get(destination, destination)
+        # Changing the graph invalidates expanded state graphs and the dual
+        # operator, and new arcs get default costs
+        self.stateSpaces = {}
+        self.dualOperator = None
+        self.preprocessed = None
+        self.costDuals = None
+        self.csr = None
         # Add origin/destination to graph if not present
         if origin not in self.nodes:
             self.add_node(origin)
@@ -195,12 +187,23 @@ class Graph:
 
     def remove_arc(self, origin: Node, destination: Node):
         '''Remove arc from graph (change neighborhoods in graph)'''
+        # Copy shared nodes before changing them (see materialize)
+        copies = self.materialize()
+        origin, destination = copies.get(origin, origin), copies.get(destination, destination)
+        # Changing the graph invalidates expanded state graphs, and the dual
+        # operator must be restricted to the remaining arcs
+        self.stateSpaces = {}
+        self.arcsRemoved = True
+        self.preprocessed = None
         # Ensure origin is in graph (do nothing if not)
         if origin not in self.nodes:
             return
         # Ensure destination is in origin neighborhood (do nothing if not)
         if destination not in origin.neighbors:
             return
+        # Remove arc from compact graph
+        if self.csr != None:
+            self.csr.removeArc(destination.day, origin.shiftType, destination.shiftType)
         # Remove destination from origin neighborhood
         origin.neighbors.remove(destination)
         # Remove cost from graph
@@ -212,6 +215,13 @@ class Graph:
         Alternative implementation is by defining incoming neighbors for
         all nodes
         '''
+        # Copy shared nodes before changing them (see materialize)
+        node = self.materialize().get(node, node)
+        # Changing the graph invalidates expanded state graphs, and the dual
+        # operator must be restricted to the remaining arcs
+        self.stateSpaces = {}
+        self.arcsRemoved = True
+        self.preprocessed = None
         # Ensure node is in graph (do nothing if not)
         if node not in self.nodes:
             return
@@ -225,8 +235,12 @@ class Graph:
         # Remove all arc costs from node
         for neighbor in node.neighbors:
             self.costs.pop((node, neighbor))
-        # Remove node from graph
+        # Remove node from graph, lookup and compact graph
         self.nodes.remove(node)
+        if self.lookup.get((node.day, node.shiftType)) is node:
+            self.lookup.pop((node.day, node.shiftType))
+        if self.csr != None:
+            self.csr.removeNode(node.day, node.shiftType)
         # Delete object if specified in input
         if delete_object:
             del node
@@ -236,15 +250,19 @@ class Graph:
         necessary because one can input a node not in the graph, but with the
         same day and shiftType as the branching node'''
 
-        for nodeTest in self.nodes:
-            if nodeTest.day == node.day and nodeTest.shiftType == node.shiftType:
-                node_remove = nodeTest
-                break
-        self.remove_node(node = node_remove)
+        node_remove = self.node(node.day, node.shiftType)
+        if node_remove != None:
+            self.remove_node(node = node_remove)
+
+    def node(self, day, shiftType):
+        '''Node of the graph on day with shift type (None if not in graph)'''
+        return self.lookup.get((day, shiftType))
 
     def remove_nodesOnSameDay(self, node: Node, delete_object = False):
         '''Remove all nodes on the same day as node from graph
         (except the node itself))'''
+        # Copy shared nodes before changing them (see materialize)
+        self.materialize()
         nodes_remove = []
         for node_remove in self.nodes:
             if node_remove.day == node.day and node_remove.shiftType != node.shiftType:
@@ -253,6 +271,118 @@ class Graph:
             node_remove = nodes_remove.pop()
             self.remove_node(node = node_remove)
 
+    def remove_nodesAndArcs(self, nodes, arcs):
+        '''Remove nodes and arcs, given by the day and shift type of their
+        nodes, from graph. The compact graph is updated once afterwards.'''
+        if not nodes and not arcs:
+            return
+        # Copy shared nodes (and compact graph) before changing them
+        self.materialize()
+        csr, self.csr = self.csr, None
+        nodes = set(nodes)
+        for origin, destination in arcs:
+            if origin not in nodes and destination not in nodes:
+                self.remove_arc(self.node(*origin), self.node(*destination))
+        for node in nodes:
+            self.remove_node(self.node(*node))
+        # Update compact graph
+        if csr != None:
+            for origin, destination in arcs:
+                csr.removeArc(destination[0], origin[1], destination[1], build = False)
+            for node in nodes:
+                csr.removeNode(*node, build = False)
+            csr.build()
+        self.csr = csr
+
+    def preprocess(self, data, employee, resources):
+        '''Remove nodes and arcs not on any resource feasible path from the
+        start node to the end node, given the resources (see feasibleArcs).
+        Nothing is done if the graph is unchanged since it was last
+        preprocessed with the resources, or if it has no resource feasible
+        path. Returns the number of nodes and arcs removed.'''
+        if self.preprocessed == tuple(resources.resource_list):
+            return 0, 0
+        nodes, arcs = len(self.nodes), len(self.costs)
+        # Graph as arrays of nodes and arcs
+        index = {node: n for n, node in enumerate(self.nodes)}
+        origins = [origin for origin in self.nodes for _ in origin.neighbors]
+        destinations = [destination for origin in self.nodes
+                        for destination in origin.neighbors]
+        alive, arcAlive = feasibleArcs(np.array([node.day for node in self.nodes]),
+                                       np.array([node.shiftType for node in self.nodes]),
+                                       np.array([index[origin] for origin in origins], dtype=np.int64),
+                                       np.array([index[destination] for destination in destinations],
+                                                dtype=np.int64),
+                                       resources.compile(data, employee))
+        end = max(self.nodes, key = lambda node: node.day)
+        if alive[index[end]] and not (alive.all() and arcAlive.all()):
+            # Dead arcs between nodes alive, and dead nodes, by day and shift
+            # type
+            deadArcs = [((origin.day, origin.shiftType), (destination.day, destination.shiftType))
+                        for origin, destination, arcIsAlive in zip(origins, destinations, arcAlive)
+                        if not arcIsAlive and alive[index[origin]] and alive[index[destination]]]
+            deadNodes = [(node.day, node.shiftType) for node, nodeIsAlive in zip(self.nodes, alive)
+                         if not nodeIsAlive]
+            self.remove_nodesAndArcs(deadNodes, deadArcs)
+        self.preprocessed = tuple(resources.resource_list)
+        return nodes - len(self.nodes), arcs - len(self.costs)
+
+    def costToGo(self):
+        '''Lower bound on the cost from each node to the end node, disregarding
+        resources. Computed by a single backward sweep over the days of the
+        graph. Nodes from which the end node cannot be reached get an infinite
+        bound.
+        '''
+        bounds = {}
+        endDay = max(node.day for node in self.nodes)
+        # Iterate over nodes from the last day to the first
+        for node in sorted(self.nodes, key = lambda node: node.day, reverse = True):
+            if node.day == endDay:
+                bounds[node] = 0
+            else:
+                # Cheapest arc cost plus cost to go from the neighbor
+                bounds[node] = min([self.costs[(node, neighbor)]
+                                    + bounds.get(neighbor, float('inf'))
+                                    for neighbor in node.neighbors],
+                                   default = float('inf'))
+        return bounds
+
+    def costFromStart(self):
+        '''Lower bound on the cost from the start node to each node,
+        disregarding resources. Computed by a single forward sweep over the
+        days of the graph (see costToGo).
+        '''
+        bounds = {node: float('inf') for node in self.nodes}
+        # Iterate over nodes from the first day to the last
+        for node in sorted(self.nodes, key = lambda node: node.day):
+            if node.day == 0:
+                bounds[node] = 0
+            # Cheapest arc cost plus cost from start to the node
+            for neighbor in node.neighbors:
+                bounds[neighbor] = min(bounds[neighbor],
+                                       bounds[node] + self.costs[(node, neighbor)])
+        return bounds
+
+    def fixArcs(self, threshold, epsilon = 1e-6):
+        '''Remove nodes and arcs not on any path (disregarding resources) with
+        cost at most threshold with the current costs, as in reduced cost
+        fixing (see columnGeneration). Nothing is done if no path has cost at
+        most threshold. Returns the number of nodes and arcs removed.'''
+        forward, backward = self.costFromStart(), self.costToGo()
+        end = max(self.nodes, key = lambda node: node.day)
+        if forward[end] > threshold + epsilon:
+            return 0, 0
+        nodes, arcs = len(self.nodes), len(self.costs)
+        # Nodes and arcs only on paths above threshold, by day and shift type
+        deadNodes = [(node.day, node.shiftType) for node in self.nodes
+                     if forward[node] + backward[node] > threshold + epsilon]
+        deadArcs = [((origin.day, origin.shiftType), (destination.day, destination.shiftType))
+                    for origin in self.nodes for destination in origin.neighbors
+                    if (forward[origin] + self.costs[(origin, destination)]
+                        + backward[destination] > threshold + epsilon)]
+        self.remove_nodesAndArcs(deadNodes, deadArcs)
+        return nodes - len(self.nodes), arcs - len(self.costs)
+
     '''Hereunder all functions regarding costs.
 
     Costs are updated based on dual variables by the functions:
@@ -285,87 +415,47 @@ class Graph:
 
     def update_costs(self, dual_variables, data, employee,
                      constructionHeuristic = False):
-        '''Update all costs in the graph based on the input dual variables'''
-        # Iterate over all arcs in the graph
-        for origin in self.nodes:
-            for destination in origin.neighbors:
-                day = destination.day
-                # Update costs if not on arcs going into end node
-                if day != data['Days'][-1] + 1:
-                    prev_shift_type = origin.shiftType
-                    cur_shift_type = destination.shiftType
-                    cost = 0
-                    # If not constructionHeuristic: add costs from objective function
-                    if not constructionHeuristic:
-                        # Add cost of working shift type
-                        cost += data['C'][(employee, day, cur_shift_type)]
-                        # Add cost of reduced rest
-                        if ((prev_shift_type in data['FollowingShiftsPenalty']) and
-                            (cur_shift_type in
-                            data['FollowingShiftsPenalty'][prev_shift_type])):
-                            cost += data['C_R']
-                        # Add cost of two-day rewarded patterns
-                        # Ensure shift types are working shifts and may be in pattern
-                        if (employee in data['PatternsRewarded'] and
-                            prev_shift_type in data['ShiftTypesWorking'] and
-                            cur_shift_type in data['ShiftTypesWorking']):
-                            prevGroup = None # Group of previos shift type
-                            curGroup = None # Group of current shift type
-                            for pat in data['PatternsRewarded'][employee]:
-                                if (data['PatternDuration'][(employee,pat)] == 2 and
-                                    day in data['PatternDays'][(employee, pat)]):
-                                    # If not already done, identify shift groups assigned
-                                    if prevGroup == None:
-                                        for shiftGroup in data['ShiftTypesGroup']:
-                                            if (prev_shift_type in
-                                                data['ShiftTypesGroup'][shiftGroup]):
-                                                prevGroup = shiftGroup
-                                            if (cur_shift_type in
-                                                data['ShiftTypesGroup'][shiftGroup]):
-                                                curGroup = shiftGroup
-                                    # Check if rewarded/penalized pattern is found
-                                    if (data['M'][(employee, pat, 1, prevGroup)] == 1 and
-                                        data['M'][(employee, pat, 2, curGroup)] == 1):
-                                        # Change arc cost
-                                        cost -= data['R'][(employee, pat)]
-                                        # Assume there are no identical rewarded patterns
-                                        break
-                        # Add cost of two-day penalized patterns
-                        # Ensure shift types are working shifts and may be in pattern
-                        if (employee in data['PatternsPenalized'] and
-                              prev_shift_type in data['ShiftTypesWorking'] and
-                              cur_shift_type in data['ShiftTypesWorking']):
-                            prevGroup = None # Group of previos shift type
-                            curGroup = None # Group of current shift type
-                            for pat in data['PatternsPenalized'][employee]:
-                                if (data['PatternDuration'][(employee,pat)] == 2 and
-                                    day in data['PatternDays'][(employee, pat)]):
-                                    # If not already done, identify shift groups assigned
-                                    if prevGroup == None:
-                                        for shiftGroup in data['ShiftTypesGroup']:
-                                            if (prev_shift_type in
-                                                data['ShiftTypesGroup'][shiftGroup]):
-                                                prevGroup = shiftGroup
-                                            if (cur_shift_type in
-                                                data['ShiftTypesGroup'][shiftGroup]):
-                                                curGroup = shiftGroup
-                                    # Check if rewarded/penalized pattern is found
-                                    if (data['M'][(employee, pat, 1, prevGroup)] == 1 and
-                                        data['M'][(employee, pat, 2, curGroup)] == 1):
-                                        # Change arc cost
-                                        cost += data['P'][(employee, pat)]
-                                        # Assume there are no identical penalized patterns
-                                        break
-                    # Add dual varibale objective function terms
-                    for v in dual_variables:
-                        dual_variable = dual_variables[v]
-                        cost += getattr(self, 'update_dual_%s' % v)(dual_variable,
-                                                                    day,
-                                                                    prev_shift_type,
-                                                                    cur_shift_type,
-                                                                    data,
-                                                                    employee)
-                    self.update_arc_cost(origin, destination, cost)
+        '''Update all costs in the graph based on the input dual variables.
+        Nothing is done if the costs were last updated with the same dual
+        variables object, as when solving the SP after ordering SPs. Costs are
+        found by the dual operator of the graph (see DualOperator), built the
+        first time costs are updated and after nodes or arcs are added.'''
+        # Skip if already updated with the dual variables
+        if (self.costDuals != None and self.costDuals[0] is dual_variables
+            and self.costDuals[1] == constructionHeuristic):
+            return
+        # Build the dual operator if the graph or dual families have changed,
+        # or restrict it if nodes or arcs have been removed
+        if (self.dualOperator == None or
+            self.dualOperator.families != tuple(dual_variables)):
+            self.dualOperator = DualOperator(self, dual_variables, data, employee)
+        elif self.arcsRemoved:
+            self.dualOperator = self.dualOperator.restricted(self)
+        self.arcsRemoved = False
+        # Costs of all arcs not going into the end node
+        costs = self.dualOperator.costs(dual_variables, constructionHeuristic)
+        self.costs.update(zip(self.dualOperator.arcs, costs.tolist()))
+        # Store the dual variables the costs are updated with
+        self.costDuals = (dual_variables, constructionHeuristic)
+
+    def objective_cost(self, day, prev_shift_type, cur_shift_type, data,
+                       employee):
+        '''Objective function cost of the arc into cur_shift_type on day from
+        prev_shift_type (without dual variables)'''
+        cost = 0
+        # Add cost of working shift type
+        cost += data['C'][(employee, day, cur_shift_type)]
+        # Add cost of reduced rest
+        if ((prev_shift_type in data['FollowingShiftsPenalty']) and
+            (cur_shift_type in
+            data['FollowingShiftsPenalty'][prev_shift_type])):
+            cost += data['C_R']
+        # Add cost of two-day rewarded and penalized patterns (see
+        # patternArrays)
+        patterns = data['PatternArrays'][employee]
+        cost -= patterns['Rewarded'][day, prev_shift_type, cur_shift_type]
+        cost += patterns['Penalized'][day, prev_shift_type, cur_shift_type]
+        return cost
 
     def update_dual_pi(self, pi, day, prev_shift_type, cur_shift_type, data,
                        employee):
@@ -1,33 +1,45 @@
 from node import Node
 
 class Label:
-    '''Dependent on Node, Graph and resources classes'''
+    '''Dependent on Node, Graph and resources classes.
 
-    def __init__(self, name: int = None, node: Node = Node(),
-                 path: [Node] = [None], cost: float = None,
-                 resourceValues: dict = {}):
-        self.name = name
+    A label only stores its parent label, node, cost and resource values
+    (packed in a tuple). The path is rebuilt from the parent labels when needed.
+    '''
+
+    __slots__ = ['parent', 'node', 'cost', 'resourceValues']
+
+    def __init__(self, node: Node, parent = None, cost: float = None,
+                 resourceValues: tuple = ()):
+        self.parent = parent
         self.node = node
-        self.path = path
         self.cost = cost
         self.resourceValues = resourceValues
 
     def __repr__(self):
-        rep = ("Label:\t\t" + str(self.name)
+        rep = ("Label"
             + "\n-----------------"
             + "\nNode:\t\t" + str(self.node.name)
             + ",\nDay:\t\t" + str(self.node.day)
             + ",\nShift type:\t" + str(self.node.shiftType)
-            + ",\nCost:\t\t" + str(self.cost))
-        for r in self.resourceValues:
-            rep = rep + ",\n" + r + ":\t\t" + str(self.resourceValues[r]) + '\n'
+            + ",\nCost:\t\t" + str(self.cost)
+            + ",\nResources:\t" + str(self.resourceValues) + '\n')
         return rep
 
+    @property
+    def path(self):
+        '''Nodes from the start node to the node of the label'''
+        path = []
+        label = self
+        while label != None:
+            path.append(label.node)
+            label = label.parent
+        return path[::-1]
+
     def initialize(node, resources, data, employee):
         '''initialize first label in start node with initial resource values'''
         resourceValues = resources.initialize(data=data, employee=employee)
-        label = Label(name = 1, node = node, path = [node], cost = 0,
-                      resourceValues = resourceValues)
+        label = Label(node = node, cost = 0, resourceValues = resourceValues)
         return label
 
     def feasible(self, resources, data, employee):
@@ -38,30 +50,26 @@ class Label:
                                   data = data,
                                   employee = employee)
 
-    def extend(self, label_name, resources, graph, data, employee):
+    def extend(self, resources, graph, data, employee):
         '''Extend self (label) along all arcs. Return list of extended labels'''
         extended_labels = []
         # Iterate over neighbors to the current node
         for destination in self.node.neighbors:
-            # Initialize a new label with the extension and associated arc cost
-            label = Label(name = label_name, node = destination,
-                          path = self.path + [destination],
-                          cost = self.cost + graph.costs[(self.node, destination)])
             # Extend all resources
-            label.resourceValues = resources.extend(self.resourceValues, label.node.day,
-                                               self.node.shiftType,
-                                               label.node.shiftType, data,
-                                               employee)
-            # Check that the label is feasible, append if, delete object if not
-            if label.feasible(resources, data, employee):
-                extended_labels.append(label)
-            # Update label_name
-            label_name += 1
-        return extended_labels, label_name
+            resourceValues = resources.extend(self.resourceValues, destination.day,
+                                              self.node.shiftType,
+                                              destination.shiftType, data,
+                                              employee)
+            # Check that the extension is feasible, create a new label if so
+            if resources.feasible(resourceValues, destination.day,
+                                  destination.shiftType, data, employee):
+                extended_labels.append(Label(node = destination, parent = self,
+                                             cost = self.cost + graph.costs[(self.node, destination)],
+                                             resourceValues = resourceValues))
+        return extended_labels
 
-    def dominance(self, subordinate, resources, data, employee):
-        '''Check if self (label) dominates subordinate. The initial hypothesis
-        is that it does.
+    def dominanceNode(node, data):
+        '''Check if dominance is applied among labels in node.
 
         If dominanceFreeDays > -1, dominance is neglected in the last
         dominanceFreeDays of the planning period to yield more labels in the end
@@ -72,11 +80,18 @@ class Label:
         # Neglect dominance in end node
         dominanceFreeDays = 0
 
+        return node.day <= data['nDays'] - dominanceFreeDays
+
+    def dominance(self, subordinate, resources, data, employee):
+        '''Check if self (label) dominates subordinate. The initial hypothesis
+        is that it does.
+        '''
+
         # Labels in different nodes cannot dominate one another
         if self.node != subordinate.node:
             return False
-        # Consider dominanceFreeDays (as specified in above function description)
-        if self.node.day > data['nDays'] - dominanceFreeDays:
+        # Consider dominanceFreeDays (see dominanceNode)
+        if not Label.dominanceNode(self.node, data):
             return False
         # Self must have a weakly lower cost to dominate subordinate
         if self.cost > subordinate.cost:
@@ -1,4 +1,5 @@
 from columnGeneration import columnGeneration
+from resources import Resources
 from MP import *
 import time
 import copy
@@ -52,6 +53,9 @@ class Problem():
         self.startTime = None
         self.stopTime = None
         self.children = {}
+        # Nodes and arcs removed from the graphs by preprocessing (see
+        # Graph.preprocess) and reduced cost fixing (see Graph.fixArcs)
+        self.graphReduction = {'Nodes': 0, 'Arcs': 0, 'Fixed nodes': 0, 'Fixed arcs': 0}
 
     def __repr__(self):
         repr = ('\nProblem ID:\t' + str(self.ID)
@@ -65,7 +69,8 @@ class Problem():
              + '\nInteger:\t' + str(self.integer)
              + '\nLower bound:\t' + str(self.lowerBound)
              + '\nUpper bound:\t' + str(self.upperBound)
-             + '\nPruned:\t\t' + str(self.pruned)) + '\n'
+             + '\nPruned:\t\t' + str(self.pruned)
+             + '\nGraph reduction:\t' + str(self.graphReduction)) + '\n'
 
         # Print parent ID if exists
         if self.parent != None:
@@ -102,13 +107,42 @@ class Problem():
               branchOnUpperBound=False,
               treeUpperBound=None,
               resourceVec = ['TWMin', 'TWMin_g', 'TV'],
-              timeLimit=None
+              timeLimit=None,
+              SPMethod='labelling',
+              earlyExitSP=False,
+              resourceStages=None,
+              pricers=['exact'],
+              truncatedExtensionLimits=[5],
+              localSearchIterations=5,
+              localSearchTenure=2,
+              localSearchBlockLength=4,
+              pricingPool=None,
+              pricingController=None,
+              arcFixing=False
               ):
-        '''Solves the problem by column generation'''
+        '''Solves the problem by column generation. If a pricingPool is given,
+        SPs are solved in parallel by its processes (see PricingPool).'''
 
         # Start timer
         self.startTime = time.time()
 
+        # Remove nodes and arcs not on any resource feasible path from graphs
+        # changed by branching (see Graph.preprocess). Graphs may be shared
+        # with other problems in the tree (see Tree.branchGraphs), so a copy
+        # of the graph is preprocessed
+        resources = Resources(resourceVec)
+        for employee in data['Employees']:
+            if self.graphs[employee].preprocessed != tuple(resources.resource_list):
+                self.graphs[employee] = copy.deepcopy(self.graphs[employee])
+                nodes, arcs = self.graphs[employee].preprocess(data, employee, resources)
+                self.graphReduction['Nodes'] += nodes
+                self.graphReduction['Arcs'] += arcs
+        # Send the graph changes of the problem to the pricing pool
+        if pricingPool != None:
+            pricingPool.update(self.graphs)
+        start = time.time()
+        times['Node']['Graph preprocessing'] += start - self.startTime
+
         # Solve problem
         [self.feasible,
          self.objective,
@@ -133,10 +167,22 @@ class Problem():
                                              branchAndPriceUpperBound=treeUpperBound,
                                              times = times,
                                              resourceVec = resourceVec,
-                                             timeLimit=timeLimit)
+                                             timeLimit=timeLimit,
+                                             SPMethod=SPMethod,
+                                             earlyExitSP=earlyExitSP,
+                                             resourceStages=resourceStages,
+                                             pricers=pricers,
+                                             truncatedExtensionLimits=truncatedExtensionLimits,
+                                             localSearchIterations=localSearchIterations,
+                                             localSearchTenure=localSearchTenure,
+                                             localSearchBlockLength=localSearchBlockLength,
+                                             pricingPool=pricingPool,
+                                             pricingController=pricingController,
+                                             arcFixing=arcFixing,
+                                             graphReduction=self.graphReduction)
         stop = time.time()
         # Store time spent in column generation
-        times['Node']['Column generation'] += stop - self.startTime
+        times['Node']['Column generation'] += stop - start
         times['Column generation']['Other'] = (times['Node']['Column generation']
                                             -  times['Column generation']['Solve RMP']
                                             -  times['Column generation']['Update RMP']
@@ -162,6 +208,7 @@ class Problem():
         # Calulcate times
         times['Branch and price']['Solve node'] += self.stopTime - self.startTime
         times['Node']['Other'] = (times['Branch and price']['Solve node']
+                               - times['Node']['Graph preprocessing']
                                - times['Node']['Column generation'])
 
     def isInteger(self, data, epsilon=1e-9):
@@ -1,6 +1,9 @@
+import numpy as np
+
 class Resources:
     '''All resource definitions and functions to extend resourceValues and check
-    feasibility.
+    feasibility. The resource definitions below are compiled into lookup tables
+    (see compile), which are used to extend and check labels.
     Allowed resourceValues are TWMax, TWMin, TWMax_g, TWMin_g, TH, TV, TL, TI.
 
     Initial values are returned after taking data as input
@@ -20,17 +23,18 @@ class Resources:
             # ...
             return [lwr, upr]
 
-    Dominance criteria are gived with the initial hypothesis that they are
-    satisfied (i.e. superior dominates subordinate). Check if superior dominates
-    subordinate with respect to the resource "name".
+    Indexed resources have tuple values (e.g. one value per shift group), and
+    resource windows are then given as a list with one [lwr, upr] per index.
+
+    Dominance criteria are given as an order. Superior dominates subordinate
+    with respect to the resource "name" if sign * min(value, cap) of superior
+    is less than or equal to that of subordinate:
 
-        def dominance_name(self, superior_value, subordinate_value, data):
-            # if (condition):
-            #    return False
-            return True
+        def order_name(self, data, employee):
+            return [sign, cap]
 
     resource_list:  list of the resource names
-    resourceValues: dictionary with keys from resource_list and resource values
+    resourceValues: tuple of compiled resource components (see compile)
     employee:       employee id (integer)
     d:              integer day
     s:              shit type
@@ -38,6 +42,9 @@ class Resources:
     j:              shift type assigned on day d
     '''
 
+    # Compiled tables, indexed by resources and employee
+    tables = {}
+
     def __init__(self, resource_list):
         '''Define "active" resources'''
         # Default is empty list of active resources
@@ -48,74 +55,157 @@ class Resources:
             if (hasattr(self, 'initial_%s' % r)
                 and hasattr(self, 'ref_%s' % r)
                 and hasattr(self, 'window_%s' % r)
-                and hasattr(self, 'dominance_%s' % r)):
+                and hasattr(self, 'order_%s' % r)):
                 # ...add the resource to the list of active resources
                 self.resource_list.append(r)
+        # Compiled tables of the resources, indexed by employee
+        self.compiled = {}
+        # Week of each day (set when compiling, see compile)
+        self.weekOfDay = None
 
     def __repr__(self):
         return str(self.resource_list)
 
     def initialize(self, data, employee):
         '''Generate initial resources for first label'''
-        resourceValues = {}
-        # Iterate over all resources
-        for r in self.resource_list:
-            # Get the respective initial resource value
-            resourceValues[r] = getattr(self, 'initial_%s' % r)(data, employee)
-        # Return initial resources
-        return resourceValues
+        return self.compile(data, employee)['initial']
 
     def extend(self, resourceValues, d, i, j, data, employee):
         '''Extend all resources along arc from shift type i on day d - 1 to
         shift type j on day d
         '''
-        # Initialize the extended resources (different from input resources)
-        extended_resourceValues = {}
-        # Iterate over all resources
-        for r in resourceValues:
-            # Update the resource by calling the respective REF
-            extended_resourceValues[r] = getattr(self, 'ref_%s' % r)(resourceValues[r],
-                                                                     d, i, j, data)
-        # Return the updated resources
-        return extended_resourceValues
+        # Look up the REF of all resource components on the arc
+        keep, add = self.compile(data, employee)['refs'][d][i][j]
+        return tuple([k * v + a for k, v, a in zip(keep, resourceValues, add)])
 
     def feasible(self, resourceValues, d, s, data, employee):
         '''Check resource feasibility on day d, shift type s'''
-        # Resource feasibility is inevitable in start and end node
-        if (d in [0, data['Days'][-1] + 1]) and (s == 0):
-            return True
-        # Iterate over all resources
-        for r in self.resource_list:
-            # Get the lower (lwr) and upper (upr) bound for node d, s
-            window = getattr(self, 'window_%s' % r)(resourceValues[r], d, s, data,
-                                                    employee)
-            # Check if resource window is indexed
-            if type(window) == dict:
-                for i in window:
-                    lwr, upr = window[i]
-                    # Not feasible if the resource is outside the resource window
-                    if (resourceValues[r][i] < lwr) or (upr < resourceValues[r][i]):
-                        return False
-            # Not feasible if the resource is outside the resource window
-            else:
-                [lwr, upr] = window
-                if (resourceValues[r] < lwr) or (upr < resourceValues[r]):
-                    return False
+        # Look up the lower (lwr) and upper (upr) bounds for node d, s
+        lwr, upr = self.compile(data, employee)['windows'][d][s]
+        # Not feasible if any resource is outside the resource window
+        for v, l, u in zip(resourceValues, lwr, upr):
+            if (v < l) or (u < v):
+                return False
         # If all resources within resource windows, resource feasible
         return True
 
     def dominance(self, superior_resourceValues, subordinate_resourceValues, data, employee):
         '''Check if superior dominates subordinate with respect to resourceValues'''
-        # Iterate over all resources
-        for r in self.resource_list:
+        # Iterate over all resource components
+        for superior, subordinate, sign, cap in zip(superior_resourceValues,
+                                                    subordinate_resourceValues,
+                                                    *self.compile(data, employee)['order']):
             # If any resource does not allow dominance, return false
-            if not getattr(self, 'dominance_%s' % r)(superior_resourceValues[r],
-                                                     subordinate_resourceValues[r],
-                                                     data, employee):
+            if sign * min(superior, cap) > sign * min(subordinate, cap):
                 return False
         # Initial hypothesis is that superior dominates subordinate resources
         return True
 
+    def compile(self, data, employee):
+        '''Compile all resources into lookup tables. Resource values are
+        flattened to components (one per resource, or one per index of indexed
+        resources), and all REFs, resource windows and dominance criteria are
+        given as tables on the components.
+
+        All REFs are assumed to be of the form value = keep * value + add in
+        each component, with keep and add given by d, i and j only. The REFs
+        are therefore evaluated once for every d, i and j. Resource windows are
+        assumed not to depend on the resource value.
+
+        Tables are cached, as they do not change during a run. They are given
+        both as arrays (for vectorized labelling) and as nested lists and tuples
+        (for fast lookup of single labels).
+        '''
+        # Return tables if already compiled for the employee
+        if employee in self.compiled:
+            return self.compiled[employee]
+        # Return cached tables if already compiled for the data and employee
+        key = (tuple(self.resource_list), employee)
+        if key in Resources.tables and Resources.tables[key][0] is data:
+            self.compiled[employee] = Resources.tables[key][1]
+            return self.compiled[employee]
+
+        # Get initial values of all resources
+        initialValues = [getattr(self, 'initial_%s' % r)(data, employee)
+                         for r in self.resource_list]
+        # Identify components (resource and index) from the initial values
+        components = []
+        for r, value in zip(self.resource_list, initialValues):
+            if type(value) == tuple:
+                components += [(r, i) for i in range(len(value))]
+            else:
+                components.append((r, None))
+        K = len(components)
+
+        # Flatten resource values (or windows and orders) to components
+        def flatten(values):
+            flat = []
+            for initialValue, value in zip(initialValues, values):
+                if type(initialValue) == tuple:
+                    flat += list(value)
+                else:
+                    flat.append(value)
+            return flat
+
+        # Resource values with all components set to value
+        def constant(value):
+            return [(value,) * len(v) if type(v) == tuple else value
+                    for v in initialValues]
+        zeros, ones = constant(0), constant(1)
+
+        # Days (including start and end day) and shift types (0 is artificial)
+        nDays = data['Days'][-1] + 2
+        nShiftTypes = max(data['ShiftTypes']) + 1
+
+        # Week of each day, as given by data (used by REFs)
+        self.weekOfDay = np.zeros(nDays, dtype=np.int64)
+        for w in data['Weeks']:
+            self.weekOfDay[data['DaysInWeek'][w]] = w
+
+        # Evaluate REFs on all zero and all one values to find keep and add
+        keep = np.zeros((nDays, nShiftTypes, nShiftTypes, K), dtype=np.int64)
+        add = np.zeros((nDays, nShiftTypes, nShiftTypes, K), dtype=np.int64)
+        for d in range(1, nDays):
+            for i in range(nShiftTypes):
+                for j in range(nShiftTypes):
+                    add[d, i, j] = flatten([getattr(self, 'ref_%s' % r)(v, d, i, j, data)
+                                            for r, v in zip(self.resource_list, zeros)])
+                    keep[d, i, j] = flatten([getattr(self, 'ref_%s' % r)(v, d, i, j, data)
+                                             for r, v in zip(self.resource_list, ones)])
+        keep -= add
+
+        # Evaluate resource windows for all d and s (start and end node are
+        # always feasible)
+        lwr = np.full((nDays, nShiftTypes, K), -float('inf'))
+        upr = np.full((nDays, nShiftTypes, K), float('inf'))
+        for d in range(1, nDays - 1):
+            for s in range(1, nShiftTypes):
+                windows = flatten([getattr(self, 'window_%s' % r)(v, d, s, data, employee)
+                                   for r, v in zip(self.resource_list, initialValues)])
+                lwr[d, s], upr[d, s] = np.reshape(windows, (K, 2)).T
+
+        # Retrieve the dominance order of all components
+        orders = flatten([getattr(self, 'order_%s' % r)(data, employee)
+                          for r in self.resource_list])
+        sign, cap = np.reshape(orders, (K, 2)).T.astype(float)
+
+        tables = {'components': components,
+                  'initial': tuple(flatten(initialValues)),
+                  # Arrays
+                  'keep': keep, 'add': add, 'lwr': lwr, 'upr': upr,
+                  'sign': sign, 'cap': cap,
+                  # Lists and tuples
+                  'refs': [[[(tuple(keep[d, i, j].tolist()), tuple(add[d, i, j].tolist()))
+                             for j in range(nShiftTypes)]
+                            for i in range(nShiftTypes)]
+                           for d in range(nDays)],
+                  'windows': [[(tuple(lwr[d, s].tolist()), tuple(upr[d, s].tolist()))
+                               for s in range(nShiftTypes)]
+                              for d in range(nDays)],
+                  'order': (tuple(sign.tolist()), tuple(cap.tolist()))}
+        Resources.tables[key] = (data, tables)
+        self.compiled[employee] = tables
+        return tables
 
     '''Minimum consecutive days working'''
     def initial_TWMin(self, data, employee):
@@ -139,55 +229,47 @@ class Resources:
         # Sligt deviation from mathematical formulation for speed-up
         return [data['Nmin'][employee], float('inf')]
 
-    def dominance_TWMin(self, superior_TWMin, subordinate_TWMin, data, employee):
-        # See the thesis for mathematical details
-        if ((superior_TWMin < data['Nmin'][employee])
-            and (superior_TWMin < subordinate_TWMin)):
-            return False
-        return True
+    def order_TWMin(self, data, employee):
+        # Dominance if not below Nmin and subordinate. See the thesis for
+        # mathematical details
+        return [-1, data['Nmin'][employee]]
 
     '''Minimum consecutive days working shift group'''
     def initial_TWMin_g(self, data, employee):
         # See the thesis for mathematical details
-        initial_TWMin_g = {}
-        for g in data['ShiftGroups']:
-            initial_TWMin_g[g] = data['NminGroup'][(employee, g)]
-        return initial_TWMin_g
+        return tuple(data['NminGroup'][(employee, g)] for g in data['ShiftGroups'])
 
     def ref_TWMin_g(self, TWMin_g, d, i, j, data):
         # See the thesis for mathematical details
-        extended_TWMin_g = {}
+        extended_TWMin_g = []
         ShiftTypesGroup = data['ShiftTypesGroup']
-        for g in ShiftTypesGroup:
+        for g, value in zip(data['ShiftGroups'], TWMin_g):
             if ((i in ShiftTypesGroup[g]) and
                 (j in ShiftTypesGroup[g])):
-                extended_TWMin_g[g] = TWMin_g[g] + 1
+                extended_TWMin_g.append(value + 1)
             elif ((i not in ShiftTypesGroup[g]) and
                   (j in ShiftTypesGroup[g])):
-                extended_TWMin_g[g] = 1
+                extended_TWMin_g.append(1)
             else:
-                extended_TWMin_g[g] = TWMin_g[g]
-        return extended_TWMin_g
+                extended_TWMin_g.append(value)
+        return tuple(extended_TWMin_g)
 
     def window_TWMin_g(self, TWMin_g, d, s, data, employee):
         # See the thesis for mathematical details
         ShiftTypesGroup = data['ShiftTypesGroup']
-        window = {}
-        for g in ShiftTypesGroup:
+        window = []
+        for g in data['ShiftGroups']:
             if s in ShiftTypesGroup[g]:
-                window[g] = [0, float('inf')]
+                window.append([0, float('inf')])
             # Sligt deviation from mathematical formulation for speed-up
             else:
-                window[g] = [data['NminGroup'][(employee, g)], float('inf')]
+                window.append([data['NminGroup'][(employee, g)], float('inf')])
         return window
 
-    def dominance_TWMin_g(self, superior_TWMin_g, subordinate_TWMin_g, data, employee):
-        # See the thesis for mathematical details
-        for g in data['ShiftGroups']:
-            if ((superior_TWMin_g[g] < data['NminGroup'][(employee, g)])
-                and (superior_TWMin_g[g] < subordinate_TWMin_g[g])):
-                return False
-        return True
+    def order_TWMin_g(self, data, employee):
+        # Dominance if not below NminGroup and subordinate. See the thesis for
+        # mathematical details
+        return [[-1, data['NminGroup'][(employee, g)]] for g in data['ShiftGroups']]
 
     '''Maxium consecutive days working'''
     def initial_TWMax(self, data, employee):
@@ -205,54 +287,43 @@ class Resources:
         # See the thesis for mathematical details
         return [0, data['Nmax']]
 
-    def dominance_TWMax(self, superior_TWMax, subordinate_TWMax, data, employee):
-        # See the thesis for mathematical details
-        if superior_TWMax > subordinate_TWMax:
-            return False
-        return True
+    def order_TWMax(self, data, employee):
+        # Dominance if not above subordinate. See the thesis for mathematical
+        # details
+        return [1, float('inf')]
 
     '''Minimum number of weekends off'''
     def initial_TV(self, data, employee):
         # See the thesis for mathematical details
-        initial_TV = {}
-        W_W=data['W_W']
-        for t in range(1, W_W + 1):
-            initial_TV[t] = 0
-        return initial_TV
+        return (0,) * data['W_W']
 
     def ref_TV(self, TV, d, i, j, data):
         # See the thesis for mathematical details
-        extended_TV = {}
+        extended_TV = []
         W_W=data['W_W']
         for t in range(1, W_W + 1):
             if ((d in data['DaysOnWeekday']['SAT']) and
                 (i in data['ShiftTypes'] + [0]) and
                 (j in data['ShiftTypesWorking'])):
-                extended_TV[t] = TV[t] + 1
+                extended_TV.append(TV[t - 1] + 1)
             # Sligt deviation from mathematical formulation for speed-up
             elif (d in data['DaysOnWeekday']['MON']):
-                for w in data['Weeks']:
-                    if d in data['DaysOnWeekdayInWeek'][(w, 'MON')]:
-                        if t - 1 == w % W_W:
-                            extended_TV[t] = 0
-                        else:
-                            extended_TV[t] = TV[t]
-                        break
+                # Week of day d (see compile)
+                w = self.weekOfDay[d]
+                if t - 1 == w % W_W:
+                    extended_TV.append(0)
+                else:
+                    extended_TV.append(TV[t - 1])
             else:
-                extended_TV[t] = TV[t]
+                extended_TV.append(TV[t - 1])
 
-        return extended_TV
+        return tuple(extended_TV)
 
     def window_TV(self, TV, d, s, data, employee):
         # See the thesis for mathematical details
-        window = {}
-        for t in range(1, data['W_W'] + 1):
-            window[t] = [0, data['W_W'] - data['Nmin_W']]
-        return window
+        return [[0, data['W_W'] - data['Nmin_W']]] * data['W_W']
 
-    def dominance_TV(self, superior_TV, subordinate_TV, data, employee):
-        # See the thesis for mathematical details
-        for t in range(1, data['W_W'] + 1):
-            if superior_TV[t] > subordinate_TV[t]:
-                return False
-        return True
+    def order_TV(self, data, employee):
+        # Dominance if not above subordinate. See the thesis for mathematical
+        # details
+        return [[1, float('inf')]] * data['W_W']
@@ -28,17 +28,22 @@ class Tree():
                                            'Branch': 0,
                                            'Search': 0,
                                            'Other': 0},
-                      'Node': {'Column generation': 0,
+                      'Node': {'Graph preprocessing': 0,
+                               'Column generation': 0,
                                'Other': 0},
                       'Column generation': {'Solve RMP': 0,
                                             'Update RMP': 0,
                                             'Solve SP': 0,
                                             'Construction heuristic': 0,
                                             'SP order selection': 0,
-                                            'Other': 0}
+                                            'Other': 0},
+                      # Calls, hits and time of each SP pricer (see solvePricers)
+                      'Pricers': {}
                      }
         # Initialize model configuration
         self.configuration = configuration
+        # Pricing controller used in column generation, if any (see Controller)
+        self.pricingController = None
 
 
     def __repr__(self):
@@ -98,6 +103,17 @@ class Tree():
             # Add branchedProblem to tree
             self.addProblem(branchedProblem)
 
+    def branchGraphs(self, problem, employees):
+        '''Graphs of a child of problem, where the graphs of employees are to be
+        changed by branching. Only these graphs are copied, and the copies
+        share their nodes with the graphs of problem until they are changed
+        (see Graph.materialize). Graphs of other employees are shared with
+        problem and its other children, and must not be changed.'''
+        graphs = dict(problem.graphs)
+        for employee in employees:
+            graphs[employee] = copy.deepcopy(problem.graphs[employee])
+        return graphs
+
     def branchingStrategy_xVars(self, problem, data):
         '''Branches a problem using branching on x-variables'''
 
@@ -147,7 +163,7 @@ class Tree():
         branchedProblems['down'].delVariable(['lambda({},{})'.format(branching_employee, k) for k in removedColumnNumbers])
 
         # Remove node from relevant graph
-        branchedGraphs['down'] = copy.deepcopy(problem.graphs)
+        branchedGraphs['down'] = self.branchGraphs(problem, [branching_employee])
         branchedGraphs['down'][branching_employee].remove_nodeOnShift(node = branchingNode)
 
         '''Up branch'''
@@ -159,7 +175,7 @@ class Tree():
         branchedProblems['up'].delVariable(['lambda({},{})'.format(branching_employee, k) for k in removedColumnNumbers])
 
         #Remove all, but a given node on the corresponding day for a given employee
-        branchedGraphs['up'] = copy.deepcopy(problem.graphs)
+        branchedGraphs['up'] = self.branchGraphs(problem, [branching_employee])
         branchedGraphs['up'][branching_employee].remove_nodesOnSameDay(node = branchingNode)
 
         return branchedProblems, branchedColumns, branchedGraphs
@@ -237,7 +253,7 @@ class Tree():
         branchedProblems['down'].delVariable(['lambda({},{})'.format(branching_employee, k) for k in removedColumnNumbers])
 
         # Remove node from relevant graph
-        branchedGraphs['down'] = copy.deepcopy(problem.graphs)
+        branchedGraphs['down'] = self.branchGraphs(problem, [branching_employee])
         branchedGraphs['down'][branching_employee].remove_nodeOnShift(node = ordinaryBranchingNode)
 
         '''Up branch'''
@@ -249,7 +265,7 @@ class Tree():
         branchedProblems['up'].delVariable(['lambda({},{})'.format(branching_employee, k) for k in removedColumnNumbers])
 
         #Remove all, but a given node on the corresponding day for a given employee
-        branchedGraphs['up'] = copy.deepcopy(problem.graphs)
+        branchedGraphs['up'] = self.branchGraphs(problem, [branching_employee])
         branchedGraphs['up'][branching_employee].remove_nodesOnSameDay(node = ordinaryBranchingNode)
 
         '''Additional branch'''
@@ -261,7 +277,7 @@ class Tree():
             branchedProblems['additional'].delVariable(['lambda({},{})'.format(e, k) for k in removedColumnNumbers])
 
         #Remove all, but a given node on the corresponding day for a given employee
-        branchedGraphs['additional'] = copy.deepcopy(problem.graphs)
+        branchedGraphs['additional'] = self.branchGraphs(problem, additionalBranchingNodes)
         for e in additionalBranchingNodes:
             branchedGraphs['additional'][e].remove_nodesOnSameDay(node = additionalBranchingNodes[e])
 
@@ -5,7 +5,8 @@ from columns import Columns
 from graph import Graph
 from MP import *
 from solveSP import solveSP
-from selectOrderSP import selectOrderSP
+from pricers import solvePricers
+from selectOrderSP import selectOrderSP, recordSP
 from helpers import *
 import numpy as np
 import copy
@@ -26,11 +27,59 @@ def columnGeneration(masterProblem, data, graphs, columns, times,
                      branchOnUpperBound=False,
                      branchAndPriceUpperBound=None,
                      resourceVec = ['TWMin', 'TWMin_g', 'TV'],
-                     timeLimit = None
+                     timeLimit = None,
+                     SPMethod = 'labelling',
+                     earlyExitSP = False,
+                     resourceStages = None,
+                     pricers = ['exact'],
+                     truncatedExtensionLimits = [5],
+                     localSearchIterations = 5,
+                     localSearchTenure = 2,
+                     localSearchBlockLength = 4,
+                     pricingPool = None,
+                     pricingController = None,
+                     arcFixing = False,
+                     graphReduction = None
                      ):
     '''Column generation for the rostering problem. Input an Xpress master
     problem object, data, graphs, columns, initial lower bound and model
-    configuration. Return feasibility, objective, solution and lower bound.'''
+    configuration. Return feasibility, objective, solution and lower bound.
+
+    If resourceStages (a list of resource lists) is given, the SPs are first
+    solved with the resources of the first stage only. Each time the
+    improvement criterion reports tailing off, the next stage is activated,
+    ending with resourceVec. Resources left out are still enforced by the
+    master problem, and SPs with fewer resources are relaxations, so columns
+    remain valid. LBDs are only calculated from SPs solved with resourceVec.
+
+    The SP of each employee is solved by the chain of pricers (see
+    solvePricers), ending with exact pricing. LBDs are only calculated from
+    SPs solved by exact pricing, which is the only pricer used when LBD is
+    required. truncatedExtensionLimits and localSearchIterations,
+    localSearchTenure and localSearchBlockLength configure the truncated and
+    local search pricers.
+
+    If a pricingPool (see PricingPool) is given, SPs are solved in parallel by
+    solveSP instead of the chain of pricers. In partial CG, the remaining SPs
+    are cancelled once an improving column is found.
+
+    If a pricingController (see Controller) is given, the extension limits
+    and SPSolutionsCount are adapted after each iteration, except when LBD is
+    to be calculated next, starting from the current settings of the
+    controller (labelExtensionLimits and SPSolutionsCount are then ignored).
+    The random SP order is then drawn from the random numbers of the
+    controller.
+
+    If arcFixing, each time LBD is calculated from SPs solved exactly with all
+    resources and the branch-and-price upper bound is finite, nodes and arcs
+    of the graph of each employee not on any path with reduced cost at most
+    UB - LBD + rc_e (with rc_e the optimal reduced cost of the SP and LBD the
+    Lagrangian bound of the iteration) are removed (see Graph.fixArcs), as
+    they cannot be in columns improving the upper bound. Graphs are not fixed
+    if this threshold is negative, and columns using removed nodes or arcs
+    are removed from the RMP, and the fixed graphs are sent to the
+    pricingPool if given. The number removed is added to graphReduction.
+    '''
 
     '''Algorithm setup'''
     # Variables used for storing bounds
@@ -39,6 +88,23 @@ def columnGeneration(masterProblem, data, graphs, columns, times,
     lowerBounds = {0: initialLowerBound}
     calculateLBD = False # Indicates when LBD should be calculated
 
+    # Initialize stages of resources used in SPs, ending with resourceVec
+    if resourceStages == None:
+        resourceStages = []
+    resourceStages = resourceStages + [resourceVec]
+    stage = 0 # Current stage of resources
+    stageIteration = 1 # Iteration in which the current stage was activated
+
+    # Initialize pool of columns found by pricers but not added, and history
+    # of SP outcomes (used to order SPs)
+    pool = {}
+    history = {}
+
+    # Start from the current settings of the pricing controller if given, so
+    # settings adapted in earlier nodes are kept
+    if pricingController != None:
+        labelExtensionLimits, SPSolutionsCount = pricingController.current()
+
     # Initialize limits on labels extended in SP for each employee
     extensionLimits = dict.fromkeys(employee for employee in data['Employees'])
     for employee in data['Employees']:
@@ -51,6 +117,10 @@ def columnGeneration(masterProblem, data, graphs, columns, times,
     while proceed:
         # Update iteration count
         iteration += 1
+        # Time spent solving RMP and SPs before the iteration (observed by the
+        # pricing controller)
+        RMPTimeStart = times['Column generation']['Solve RMP']
+        SPTimeStart = times['Column generation']['Solve SP']
 
         # Update total time
         times['Total'] += time.time() - times['refTime']
@@ -87,24 +157,30 @@ def columnGeneration(masterProblem, data, graphs, columns, times,
         if not feasible:
             # ...attempt to generate columns to regain feasibility
             start = time.time()
-            success, newRosterlineNumbers = columns.constructionHeuristic_CGartificialVariables(data=data,
-                                                                                                graphs=graphs,
-                                                                                                trimColumns=False,
-                                                                                                printStatus=False, # Must be False. Else, solveMP must be updated to remove some columns after this
-                                                                                                epsilon=epsilon,
-                                                                                                orderStrategy = orderStrategy,
-                                                                                                partialCG_constructionHeuristic = partialCG_constructionHeuristic,
-                                                                                                coverConstraint = coverConstraint,
-                                                                                                removeIllegalColumns = removeIllegalColumns,
-                                                                                                resourceVec = resourceVec)
+            # Deadline of the construction heuristic, given the time limit
+            deadline = None
+            if timeLimit != None:
+                deadline = time.time() + timeLimit - times['Total']
+            success, newRosterlineNumbers, interrupted = columns.constructionHeuristic_CGartificialVariables(data=data,
+                                                                                                             graphs=graphs,
+                                                                                                             trimColumns=False,
+                                                                                                             printStatus=False, # Must be False. Else, solveMP must be updated to remove some columns after this
+                                                                                                             epsilon=epsilon,
+                                                                                                             orderStrategy = orderStrategy,
+                                                                                                             partialCG_constructionHeuristic = partialCG_constructionHeuristic,
+                                                                                                             coverConstraint = coverConstraint,
+                                                                                                             removeIllegalColumns = removeIllegalColumns,
+                                                                                                             resourceVec = resourceVec,
+                                                                                                             deadline = deadline)
             stop = time.time()
             times['Column generation']['Construction heuristic'] += stop - start
 
             # Update total time
             times['Total'] += time.time() - times['refTime']
             times['refTime'] = time.time()
-            # Check if time limit is reached while not already terminated
-            if timeLimit != None and times['Total'] > timeLimit:
+            # Check if time limit is reached (or the construction heuristic
+            # was interrupted by it) while not already terminated
+            if interrupted or (timeLimit != None and times['Total'] > timeLimit):
                 lowerBounds[iteration] = lowerBounds[max(lowerBounds.keys())]
                 if iteration > 1:
                     return feasible, MPObjective, MPSolution, lowerBounds[iteration]
@@ -153,16 +229,83 @@ def columnGeneration(masterProblem, data, graphs, columns, times,
         # Identify order of solving sub problems if partial CG
         if partialCG:
             start = time.time()
-            order = selectOrderSP(data, graphs, MPDuals, epsilon, orderStrategy = orderStrategy)
+            # Random choices are made by the pricing controller if given, so
+            # a replayed run makes the same choices
+            randomState = pricingController.randomState if pricingController != None else None
+            order = selectOrderSP(data, graphs, MPDuals, epsilon, orderStrategy = orderStrategy,
+                                  pool = pool, history = history, randomState = randomState)
             stop = time.time()
             times['Column generation']['SP order selection'] += stop - start
         else:
             order = copy.copy(data['Employees'])
 
+        # Resources used in SPs (all resources if we need LBD)
+        if calculateLBD:
+            SPResourceVec = resourceVec
+        else:
+            SPResourceVec = resourceStages[stage]
+
+        # Pricers used in SPs (only exact pricing if we need LBD)
+        if calculateLBD:
+            SPPricers = ['exact']
+        else:
+            SPPricers = pricers
+
         # Solve sub problems in order until a neg. red. cost solution found,
         # or all sub problems if we need LBD
         improvingColumnFound = False
         SPobjectives, SPsolutions = {}, {}
+        exactPricing = True # Indicates whether all SPs were solved exactly
+        # Number of extension limits of each employee before solving SPs
+        limitCounts = {employee: len(extensionLimits[employee]) for employee in data['Employees']}
+
+        # Solve sub problems in parallel if a pricing pool is given. Stop at
+        # the first improving column only in partial CG without LBD. Cancelled
+        # sub problems stay in order
+        if pricingPool != None and order:
+            start = time.time()
+            # Deadline of the sub problems, given the time limit
+            deadline = None
+            if timeLimit != None:
+                deadline = time.time() + timeLimit - times['Total']
+            target = 1 if partialCG and not calculateLBD else None
+            solved, order = pricingPool.price(order, MPDuals, extensionLimits,
+                                              target = target, epsilon = epsilon,
+                                              solutions_count = SPSolutionsCount,
+                                              resourceVec = SPResourceVec,
+                                              SPMethod = SPMethod,
+                                              earlyExit = earlyExitSP and not calculateLBD,
+                                              deadline = deadline)
+            stop = time.time()
+            times['Column generation']['Solve SP'] += stop - start
+
+            # Store solutions and statistics (as exact pricing)
+            statistics = times.setdefault('Pricers', {}).setdefault('exact', {'Calls': 0,
+                                                                              'Hits': 0,
+                                                                              'Hit rate': 0,
+                                                                              'Time': 0})
+            for employee in solved:
+                [SPobjectives[employee], SPsolutions[employee],
+                 extensionLimits[employee], spent] = solved[employee]
+                recordSP(history, employee, SPobjectives[employee], MPDuals, data, epsilon)
+                statistics['Calls'] += 1
+                statistics['Time'] += spent
+                # Check whether a solution with negative reduced cost was found
+                if (SPobjectives[employee] != None and
+                    SPobjectives[employee][1] < -epsilon):
+                    improvingColumnFound = True
+                    statistics['Hits'] += 1
+            if statistics['Calls']:
+                statistics['Hit rate'] = statistics['Hits'] / statistics['Calls']
+
+            # Update total time
+            times['Total'] += time.time() - times['refTime']
+            times['refTime'] = time.time()
+            # Check if time limit is reached (the sub problems are then interrupted)
+            if timeLimit != None and times['Total'] > timeLimit:
+                lowerBounds[iteration] = lowerBounds[max(lowerBounds.keys())]
+                return feasible, MPObjective, MPSolution, lowerBounds[iteration]
+
         while (not improvingColumnFound and order) or (calculateLBD and order) or (not partialCG and order):
 
             # Update total time
@@ -175,27 +318,110 @@ def columnGeneration(masterProblem, data, graphs, columns, times,
 
             employee = order.pop(0)
             start = time.time()
+            # Deadline of the sub problem, given the time limit
+            deadline = None
+            if timeLimit != None:
+                deadline = time.time() + timeLimit - times['Total']
             # Solve the subproblem for the specified employee
             [SPobjectives[employee],
-             SPsolutions[employee]] = solveSP(data=data, employee=employee,
-                                              graph=graphs[employee],
-                                              duals=MPDuals, epsilon=epsilon,
-                                              extensionLimits = extensionLimits[employee],
-                                              solutions_count = SPSolutionsCount,
-                                              resourceVec = resourceVec)
+             SPsolutions[employee],
+             pricer] = solvePricers(data=data, employee=employee,
+                                    graph=graphs[employee],
+                                    duals=MPDuals, columns=columns,
+                                    MPSolution=MPSolution, pool=pool,
+                                    times=times, pricers=SPPricers,
+                                    epsilon=epsilon,
+                                    extensionLimits = extensionLimits[employee],
+                                    solutions_count = SPSolutionsCount,
+                                    resourceVec = SPResourceVec,
+                                    SPMethod = SPMethod,
+                                    earlyExit = earlyExitSP and not calculateLBD,
+                                    deadline = deadline,
+                                    truncatedExtensionLimits = truncatedExtensionLimits,
+                                    localSearchIterations = localSearchIterations,
+                                    localSearchTenure = localSearchTenure,
+                                    localSearchBlockLength = localSearchBlockLength)
+            exactPricing = exactPricing and pricer == 'exact'
+            recordSP(history, employee, SPobjectives[employee], MPDuals, data, epsilon)
             stop = time.time()
             times['Column generation']['Solve SP'] += stop - start
-            # Check whether a solution with negative reduced cost was found...
-            if SPobjectives[employee][1] < -epsilon:
+
+            # Update total time
+            times['Total'] += time.time() - times['refTime']
+            times['refTime'] = time.time()
+            # Check if time limit is reached (the sub problem is then interrupted)
+            if timeLimit != None and times['Total'] > timeLimit:
+                lowerBounds[iteration] = lowerBounds[max(lowerBounds.keys())]
+                return feasible, MPObjective, MPSolution, lowerBounds[iteration]
+
+            # Check whether a solution with negative reduced cost was found
+            # (None if the sub problem has no solution with negative reduced
+            # cost)...
+            if (SPobjectives[employee] != None and
+                SPobjectives[employee][1] < -epsilon):
                 # ...and may be added as a column with improvement potential
                 improvingColumnFound = True
 
-        # Calculate LBD if this is required and check stop criterion
-        if calculateLBD or (not order and extensionLimits == dict.fromkeys([employee for employee in data['Employees']], [])):
+        # Calculate LBD if this is required and check stop criterion (sub
+        # problems stopped early only give a valid LBD if no improving column
+        # was found, and only sub problems with all resources and exact
+        # pricing are used)
+        if calculateLBD or (not order and extensionLimits == dict.fromkeys([employee for employee in data['Employees']], [])
+                            and not (earlyExitSP and improvingColumnFound)
+                            and SPResourceVec == resourceVec and exactPricing):
             lowerBounds[iteration] = calculateLowerBound(MPObjective,
                                                          SPobjectives,
                                                          lowerBounds,
                                                          data)
+            # Reduced cost fixing of the graphs with the Lagrangian bound,
+            # only when it is proven by all SPs solved exactly with all
+            # resources and without extension limits
+            provenBound = (all(employee in SPobjectives for employee in data['Employees'])
+                           and exactPricing and SPResourceVec == resourceVec
+                           and not any(extensionLimits.values())
+                           and not (earlyExitSP and not calculateLBD and improvingColumnFound))
+            if (arcFixing and provenBound and branchAndPriceUpperBound != None and
+                branchAndPriceUpperBound < float('inf')):
+                # Optimal reduced cost of each SP (0 is a lower bound if the
+                # SP has no solution with negative reduced cost)
+                reducedCosts = {employee: SPobjectives[employee][1]
+                                if SPobjectives[employee] != None else 0
+                                for employee in data['Employees']}
+                lagrangianBound = MPObjective + sum(reducedCosts.values())
+                for employee in data['Employees']:
+                    threshold = (branchAndPriceUpperBound - lagrangianBound
+                                 + reducedCosts[employee])
+                    # Columns in the RMP basis have zero reduced cost, and
+                    # must keep their arcs
+                    if threshold < 0:
+                        continue
+                    # Costs are updated in the main process (SPs may be
+                    # solved by a pricing pool)
+                    graphs[employee].update_costs(MPDuals, data, employee)
+                    # The graph may be shared with other problems in the tree
+                    # (see Tree.branchGraphs), so a copy of it is fixed
+                    graph = copy.deepcopy(graphs[employee])
+                    nodes, arcs = graph.fixArcs(threshold)
+                    if nodes or arcs:
+                        graphs[employee] = graph
+                        # Remove the columns using fixed nodes or arcs from
+                        # the RMP (they have reduced cost above threshold, so
+                        # they are not in the basis)
+                        removedColumnNumbers = columns.removeColumnsNotInGraph(graph, employee, data)
+                        masterProblem.delVariable(['lambda({},{})'.format(employee, k)
+                                                   for k in removedColumnNumbers])
+                        # Only keep the SP solutions that remain in the graph
+                        if SPsolutions.get(employee) != None:
+                            SPsolutions[employee] = {k: SPsolutions[employee][k]
+                                                     for k in SPsolutions[employee]
+                                                     if SPobjectives[employee][k] <= threshold}
+                    if graphReduction != None:
+                        graphReduction['Fixed nodes'] += nodes
+                        graphReduction['Fixed arcs'] += arcs
+                # Send the fixed graphs to the pricing pool, so its workers
+                # do not price columns using removed nodes or arcs
+                if pricingPool != None:
+                    pricingPool.update(graphs)
             # Reset parameters on LBD calculations
             calculateLBD = False
             # Reset extension limit if needed
@@ -209,7 +435,8 @@ def columnGeneration(masterProblem, data, graphs, columns, times,
                                             lowerBounds[iteration],
                                             optimalityGapLimit))
 
-        # Check if optimal...
+        # Check if optimal (also with fewer resources, as the SPs are then
+        # relaxed)...
         if not improvingColumnFound:
             proceed = False
             lowerBounds[iteration] = MPObjective
@@ -219,6 +446,9 @@ def columnGeneration(masterProblem, data, graphs, columns, times,
             # Initialize dict of new rosterlines
             newRosterlineNumbers = {}
             for employee in SPsolutions:
+                # Skip sub problems without solutions
+                if SPsolutions[employee] == None:
+                    continue
                 # Initialize list of new rosterlines for employee
                 newRosterlineNumbers[employee] = []
                 # Generate columns for employee
@@ -234,11 +464,34 @@ def columnGeneration(masterProblem, data, graphs, columns, times,
             if not improvementCriterion(upperBounds, iteration,
                                         improvementStepSize,
                                         improvementThreshold):
-                # Make sure LBD is calculated in next iteration and set
-                # extensionLimit to None to prove optimal SPs
-                calculateLBD = True
-                curExtensionLimits = copy.deepcopy(extensionLimits)
-                extensionLimits = dict.fromkeys([employee for employee in data['Employees']], [])
+                # Activate the next stage of resources if any, when the
+                # current stage has been used for improvementStepSize iterations
+                if stage < len(resourceStages) - 1:
+                    if iteration - stageIteration >= improvementStepSize:
+                        stage += 1
+                        stageIteration = iteration
+                else:
+                    # Make sure LBD is calculated in next iteration and set
+                    # extensionLimit to None to prove optimal SPs
+                    calculateLBD = True
+                    curExtensionLimits = copy.deepcopy(extensionLimits)
+                    extensionLimits = dict.fromkeys([employee for employee in data['Employees']], [])
+
+            # Adapt extension limits and SP solutions count for the next
+            # iteration, unless LBD is calculated next
+            if pricingController != None and not calculateLBD:
+                # Improving columns found, and SPs that relaxed extension limits
+                improvingColumns = sum(1 for employee in SPobjectives
+                                       if SPobjectives[employee] != None
+                                       for reducedCost in SPobjectives[employee].values()
+                                       if reducedCost < -epsilon)
+                relaxedSPs = sum(1 for employee in SPobjectives
+                                 if len(extensionLimits[employee]) < limitCounts[employee])
+                limits, SPSolutionsCount = pricingController.decide(RMPTime = times['Column generation']['Solve RMP'] - RMPTimeStart,
+                                                                    SPTime = times['Column generation']['Solve SP'] - SPTimeStart,
+                                                                    improvingColumns = improvingColumns,
+                                                                    relaxedSPs = relaxedSPs)
+                extensionLimits = {employee: copy.copy(limits) for employee in data['Employees']}
 
     # Update total time
     times['Total'] += time.time() - times['refTime']
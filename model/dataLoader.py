@@ -1,4 +1,5 @@
 import xlrd
+import numpy as np
 
 
 def dataLoader(filename = 'testInstances/roster_data_input.xlsx'):
@@ -304,5 +305,60 @@ def dataLoader(filename = 'testInstances/roster_data_input.xlsx'):
         data['NormPeriodStartDays'].append(d)
         d += data['N_N']
     #===========================================================================
+    # Compile two day patterns of each employee into arrays
+    data['PatternArrays'] = {}
+    for e in data['Employees']:
+        data['PatternArrays'][e] = patternArrays(data, e)
+    #===========================================================================
 
     return data
+
+def patternArrays(data, employee):
+    '''Two day patterns of an employee as arrays indexed by (d, s1, s2), for
+    the patterns starting on day d with working shift type s1 and continuing
+    with working shift type s2 on day d + 1:
+
+        - 'Illegal': whether an illegal pattern is worked (boolean),
+        - 'Rewarded': the reward R of the rewarded pattern worked,
+        - 'Penalized': the penalty P of the penalized pattern worked.
+
+    Only the first pattern worked of each kind counts (identical patterns are
+    assumed not to exist). Days are 0 to nDays + 1, so that arrays may be
+    indexed by the days of the start and end nodes of a graph.'''
+
+    size = max(data['ShiftTypes']) + 1
+    arrays = {'Illegal': np.zeros((data['nDays'] + 2, size, size), dtype=bool),
+              'Rewarded': np.zeros((data['nDays'] + 2, size, size)),
+              'Penalized': np.zeros((data['nDays'] + 2, size, size))}
+
+    # Shift group of each working shift type
+    group = {}
+    for shiftGroup in data['ShiftTypesGroup']:
+        for shiftType in data['ShiftTypesGroup'][shiftGroup]:
+            group[shiftType] = shiftGroup
+
+    for kind in arrays:
+        if employee not in data['Patterns' + kind]:
+            continue
+        # Shift type successions already in a pattern, per day
+        found = np.zeros((data['nDays'] + 2, size, size), dtype=bool)
+        for pat in data['Patterns' + kind][employee]:
+            if data['PatternDuration'][(employee, pat)] != 2:
+                continue
+            # Working shift type successions in the pattern
+            worked = np.zeros((size, size), dtype=bool)
+            for s1 in data['ShiftTypesWorking']:
+                for s2 in data['ShiftTypesWorking']:
+                    worked[s1, s2] = (data['M'][(employee, pat, 1, group[s1])] == 1 and
+                                      data['M'][(employee, pat, 2, group[s2])] == 1)
+            for d in data['PatternDays'][(employee, pat)]:
+                first = worked & ~found[d]
+                found[d] |= first
+                if kind == 'Illegal':
+                    arrays[kind][d] |= first
+                elif kind == 'Rewarded':
+                    arrays[kind][d][first] = data['R'][(employee, pat)]
+                else:
+                    arrays[kind][d][first] = data['P'][(employee, pat)]
+
+    return arrays
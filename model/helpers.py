@@ -36,10 +36,13 @@ def printColumnReducedCosts(MPSolution, MPDuals, columns, graphs, data):
         print(MPSolution[(employee, rosterlineNumber)], column.reducedCost(graphs[employee], data))
 
 def calculateLowerBound(MPObjective, SPobjectives, lowerBounds, data):
-    '''Calculates LBD based on an MPObjective and SPobjectives for each sub problem'''
+    '''Calculates LBD based on an MPObjective and SPobjectives for each sub
+    problem. Sub problems without solutions (None) have no solution with
+    negative reduced cost, and add nothing.'''
     LBD = MPObjective
     for employee in data['Employees']:
-        LBD += SPobjectives[employee][1]
+        if SPobjectives[employee] != None:
+            LBD += SPobjectives[employee][1]
 
     return max(LBD, lowerBounds[max(lowerBounds.keys(), key=(lambda k: lowerBounds[k]))])
 
@@ -69,32 +72,24 @@ def stopCriterion(UBD, LBD, optimalityGapLimit):
     else:
         return False
 
-def labelsInNode(labels, label, size=None):
-    '''Moves all labels that are in the same node as the specified label to a
-    list of labels in node. If size is specified, the list of labels in the node
-    is shortened to contain only the size best (lowest cost) labels.
+def labelsInNode(buckets, label, size=None):
+    '''Moves all labels that are in the same node as the specified label out
+    of the buckets of labels (indexed by node) to a list of labels in node. If
+    size is specified, the list of labels in the node is shortened to contain
+    only the size best (lowest cost) labels.
     '''
 
-    # Initialize list of labels in node
-    labels_in_node = [label]
-    # Iterate over all given labels
-    length = len(labels)
-    for i in range(length):
-        # Remove a the first label from the list of labels
-        candidate = labels.pop(0)
-        # If the label is in the node, add it to labelsInNode
-        if candidate.node == label.node:
-            labels_in_node.append(candidate)
-        # Otherwise, add it back to labels (at end of list)
-        else:
-            labels.append(candidate)
+    # Take the bucket of the label's node, with the label itself first
+    labels_in_node = buckets.pop(label.node)
+    labels_in_node.remove(label)
+    labels_in_node.insert(0, label)
 
     # If size is specified, sort and reduce the size of labels_in_node
     if size != None:
         labels_in_node = sorted(labels_in_node, key = lambda label: label.cost)
         labels_in_node = labels_in_node[:size]
 
-    return labels, labels_in_node
+    return labels_in_node
 
 def printMessage(nProcessedProblems, UBD, LBD, gap, time):
     '''Prints message based on branch and price progress.'''
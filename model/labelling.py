@@ -5,58 +5,138 @@ from graph import Graph
 from resources import Resources
 from label import Label
 from helpers import *
+from collections import deque
+import heapq
+import time
 
-def labelling(resources, graph, data, employee, extensionLimit):
-	'''SPPRC labelling algorithm. See thesis for algorithmic details'''
+def forgetState(states, label):
+	'''Remove label from the index of labels by node and resource values'''
+	node_states = states.get(label.node)
+	if node_states != None and node_states.get(label.resourceValues) is label:
+		del node_states[label.resourceValues]
+
+def labelling(resources, graph, data, employee, extensionLimit,
+			  costThreshold=None, solutionsCount=None, targetCount=None,
+			  targetThreshold=None, deadline=None):
+	'''SPPRC labelling algorithm. See thesis for algorithmic details.
+
+	Labels are kept in buckets indexed by node, so that dominance is only
+	checked among labels in the same node. The order in which labels are
+	processed (first in, first out) is kept in a separate queue.
+
+	The labels in each bucket are also indexed by their resource values, so a
+	label reaching a node with the same resource values as an existing label is
+	resolved by a lookup that keeps the cheapest of the two. Pairwise dominance
+	is only checked against the remaining labels.
+
+	If costThreshold is given, only labels in the end node with a cost below
+	costThreshold are of interest. Labels are then discarded if their cost plus
+	a lower bound on the cost to the end node (see Graph.costToGo) cannot get
+	below costThreshold, or cannot beat the solutionsCount best labels already
+	found in the end node.
+
+	If targetCount is given, labelling stops as soon as targetCount labels with
+	a cost below targetThreshold are found in the end node (labels in the end
+	node are never dominated). The labels not yet processed are then returned
+	as well, and extension_limited is set to indicate that the result may not
+	be exact.
+
+	If a deadline is given (in seconds since the epoch, see time.time),
+	labelling is interrupted once it has passed. It is checked for every 256
+	labels taken from the queue. The processed labels are then returned, with
+	extension_limited set.
+	'''
 
 	# Initialize start label
 	initial_label = Label.initialize(node = graph.nodes[0], resources = resources,
 									 data=data, employee=employee)
 
-	# Increment label name
-	label_name = initial_label.name + 1
-
-	# Initialize unprocessed_labels and processed_labels
-	unprocessed_labels = [initial_label]
+	# Initialize queue of unprocessed labels and processed_labels
+	unprocessed_queue = deque([initial_label])
 	processed_labels = []
+	# Processed labels found to be dominated (filtered from processed_labels
+	# once labelling is done, rather than removed from the list one by one)
+	dominated_labels = set()
+	# Initialize buckets of unprocessed and processed labels indexed by node
+	unprocessed_buckets = {initial_label.node: [initial_label]}
+	processed_buckets = {}
+	# Index labels in the buckets by node and resource values
+	unprocessed_states = {}
+	processed_states = {}
 
 	# Assume extension is not limited by extensionLimit
 	extension_limited = False
 
-	# While there are unprocessed labels
-	while unprocessed_labels:
+	# Initialize bounds used for discarding labels
+	if costThreshold != None:
+		cost_to_go = graph.costToGo()
+		threshold = costThreshold
+		# Costs of the best labels in the end node (negated, as a heap)
+		end_costs = []
+
+	# Initialize count of labels in the end node below targetThreshold
+	target_labels = 0
+	# Initialize count of labels taken from the queue (to check the deadline)
+	label_count = 0
+
+	# While there are unprocessed labels, and the target is not reached
+	while unprocessed_queue and (targetCount == None or target_labels < targetCount):
 		# Get an unprocessed label
-		cur_label = unprocessed_labels.pop(0)
+		cur_label = unprocessed_queue.popleft()
+		# Interrupt labelling if the deadline has passed
+		label_count += 1
+		if deadline != None and label_count % 256 == 0 and time.time() > deadline:
+			extension_limited = True
+			break
+		# Skip labels that are dominated or already extended with their node
+		if cur_label not in unprocessed_buckets.get(cur_label.node, []):
+			continue
 
 		# If a limit on the number of labels extended is set, limit extension
 		if extensionLimit != None:
-			# Set reference lenght of unprocessed labels and cur_label
-			referenceLength = 1 + len(unprocessed_labels)
-			# Find all labels in unprocessed_labels that are in the node
-			unprocessed_labels, labels_in_node = labelsInNode(labels=unprocessed_labels,
-										 			  		  label=cur_label,
-													  		  size=extensionLimit)
+			# Set reference lenght of labels in the node
+			referenceLength = len(unprocessed_buckets[cur_label.node])
+			# Move all labels in the node out of the bucket of unprocessed labels
+			labels_in_node = labelsInNode(buckets=unprocessed_buckets,
+										  label=cur_label,
+										  size=extensionLimit)
+			unprocessed_states.pop(cur_label.node, None)
 			# Check if no labels are discarded by extensionLimit
 			if (not extension_limited and
-				len(unprocessed_labels) + len(labels_in_node) < referenceLength):
+				len(labels_in_node) < referenceLength):
 					extension_limited = True
 			# Extend all labels_in_node
 			extended_labels = []
 			for label in labels_in_node:
-				labels, label_name = label.extend(label_name, resources, graph,
-												  data, employee)
-				extended_labels += labels
+				extended_labels += label.extend(resources, graph, data, employee)
 		else:
-			# Otherwise, extend the label as if there was no limit
-			extended_labels, label_name = cur_label.extend(label_name, resources,
-														   graph, data, employee)
+			# Otherwise, remove the label from its bucket and extend it
+			unprocessed_buckets[cur_label.node].remove(cur_label)
+			forgetState(unprocessed_states, cur_label)
+			extended_labels = cur_label.extend(resources, graph, data, employee)
 
-		# Check dominance among all labels
+		# Check dominance among labels in the node of each extended label
 		for extended_label in extended_labels:
+			node = extended_label.node
+			state = extended_label.resourceValues
+			# Discard the label if it cannot get below the threshold
+			if (costThreshold != None and
+				extended_label.cost + cost_to_go[node] >= threshold):
+				continue
+			# Look up a label with identical resource values in the node
+			dominance_node = Label.dominanceNode(node, data)
+			if dominance_node:
+				identical_label = (processed_states.get(node, {}).get(state) or
+								   unprocessed_states.get(node, {}).get(state))
+				# The extended label is dominated if it is not cheaper
+				if (identical_label != None and
+					identical_label.cost <= extended_label.cost):
+					continue
 			# The initial hypothesis is that the extended label is not dominated
 			extended_label_dominated = False
-			# Iterate over processed labels
-			for processed_label in processed_labels:
+			# Iterate over processed labels in the node
+			processed_bucket = processed_buckets.get(extended_label.node, [])
+			for processed_label in processed_bucket[:]:
 				# Check if extended_label is dominated by processed_label
 				if processed_label.dominance(extended_label, resources,
 											 data, employee):
@@ -65,9 +145,12 @@ def labelling(resources, graph, data, employee, extensionLimit):
 				elif extended_label.dominance(processed_label, resources,
 											  data, employee):
 					# If so, remove the dominated processed_label
-					processed_labels.remove(processed_label)
-			# Iterate over unprocessed labels
-			for unprocessed_label in unprocessed_labels:
+					processed_bucket.remove(processed_label)
+					dominated_labels.add(processed_label)
+					forgetState(processed_states, processed_label)
+			# Iterate over unprocessed labels in the node
+			unprocessed_bucket = unprocessed_buckets.setdefault(extended_label.node, [])
+			for unprocessed_label in unprocessed_bucket[:]:
 				# Check if extended_label is dominated by unprocessed_label
 				if unprocessed_label.dominance(extended_label, resources,
 											   data, employee):
@@ -75,14 +158,50 @@ def labelling(resources, graph, data, employee, extensionLimit):
 				# Check if unprocessed_label is dominated by extended_label
 				elif extended_label.dominance(unprocessed_label, resources,
 											  data, employee):
-					unprocessed_labels.remove(unprocessed_label)
-			# If extended_label is not dominated, add it to unprocessed_labels
+					unprocessed_bucket.remove(unprocessed_label)
+					forgetState(unprocessed_states, unprocessed_label)
+			# If extended_label is not dominated, add it to unprocessed labels
 			if not extended_label_dominated:
-				unprocessed_labels.append(extended_label)
+				unprocessed_bucket.append(extended_label)
+				unprocessed_queue.append(extended_label)
+				if dominance_node:
+					unprocessed_states.setdefault(node, {})[state] = extended_label
+				# Tighten threshold to the cost of the solutionsCount best
+				# labels in the end node
+				if (costThreshold != None and solutionsCount != None and
+					node.day == data['Days'][-1] + 1):
+					heapq.heappush(end_costs, -extended_label.cost)
+					if len(end_costs) > solutionsCount:
+						heapq.heappop(end_costs)
+					if len(end_costs) == solutionsCount:
+						threshold = min(costThreshold, -end_costs[0])
+				# Stop extending labels once targetCount labels in the end node
+				# are below targetThreshold
+				if (targetCount != None and
+					node.day == data['Days'][-1] + 1 and
+					extended_label.cost < targetThreshold):
+					target_labels += 1
+					if target_labels >= targetCount:
+						break
 		# Add unprocessed_label to the set of processed_labels
 		if extensionLimit == None:
-			processed_labels.append(cur_label)
-		else:
-			processed_labels += labels_in_node
+			labels_in_node = [cur_label]
+		processed_labels += labels_in_node
+		processed_buckets.setdefault(cur_label.node, []).extend(labels_in_node)
+		if Label.dominanceNode(cur_label.node, data):
+			node_states = processed_states.setdefault(cur_label.node, {})
+			for label in labels_in_node:
+				node_states[label.resourceValues] = label
+
+	# Filter out the processed labels marked as dominated
+	if dominated_labels:
+		processed_labels = [label for label in processed_labels
+							if label not in dominated_labels]
+
+	# If stopped at the target, add unprocessed labels and mark as not exact
+	if unprocessed_queue and targetCount != None and target_labels >= targetCount:
+		for bucket in unprocessed_buckets.values():
+			processed_labels += bucket
+		extension_limited = True
 
 	return processed_labels, extension_limited
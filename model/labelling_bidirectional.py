@@ -0,0 +1,196 @@
+import sys
+sys.path.append('./classes')
+import numpy as np
+import time
+from resources import Resources
+from label import Label
+from labelling_vectorized import (LabelArena, graphArrays, arcsOut, selectLabels,
+                                  labellingForward)
+
+def labellingBackward(tables, arrays, firstDay, extensionLimit, costFromStart=None,
+                      costThreshold=None, deadline=None):
+    '''Extend backward labels day by day from the end node down to the nodes
+    on firstDay. A backward label represents a path from its node to the end
+    node. Its state is, for each resource component, the interval [lo, hi] of
+    values in its node for which the path is resource feasible.
+
+    The backward REFs follow from the compiled REFs value = keep * value + add,
+    with keep being 0 (reset) or 1 (count) in all resources. Along an arc with
+    keep = 1, the interval is shifted by -add. Along an arc with keep = 0, the
+    value after the arc is add, which must be in the interval, and the interval
+    before the arc is unbounded. The interval is then intersected with the
+    resource window of the node. A backward label dominates another if it is
+    not more costly and its intervals contain those of the other.
+
+    Returns the label arena, the indices of the labels on firstDay and whether
+    extensionLimit discarded any labels. If the deadline passes, no labels are
+    returned (as if limited).
+    '''
+    keep, add = tables['keep'], tables['add']
+    lwr, upr = tables['lwr'], tables['upr']
+    K = len(tables['components'])
+    nodeDay, nodeShiftType = arrays['nodeDay'], arrays['nodeShiftType']
+    arcOrigin, arcCost = arrays['arcOrigin'], arrays['arcCost']
+    endDay = nodeDay.max()
+    # Dominance is applied in all nodes
+    dominance = np.ones(len(nodeDay), dtype=bool)
+
+    # Index arcs by destination node
+    arcsIn = np.argsort(arrays['arcDestination'], kind='stable')
+    arcCountIn = np.bincount(arrays['arcDestination'], minlength=len(nodeDay))
+    arcStartIn = np.concatenate(([0], np.cumsum(arcCountIn)))
+
+    # Initialize label arena with the end label (unbounded intervals)
+    arena = LabelArena(2 * K, dtype=float)
+    labels = arena.add(parent=[-1], node=[int(np.flatnonzero(nodeDay == endDay)[0])],
+                       cost=[0], state=[[-np.inf] * K + [np.inf] * K])
+
+    # Assume extension is not limited by extensionLimit
+    extension_limited = False
+
+    # Process the graph day by day, from the end node
+    for day in range(endDay, firstDay, -1):
+        # Interrupt labelling if the deadline has passed
+        if deadline != None and time.time() > deadline:
+            return arena, labels[:0], True
+
+        # Find all arcs into the labels' nodes
+        parents, arcs = arcsOut(arena.node[labels], arcStartIn, arcCountIn)
+        parents = labels[parents]
+        arcs = arcsIn[arcs]
+
+        # Extend all labels backward along all arcs
+        nodes = arcOrigin[arcs]
+        i = nodeShiftType[nodes]
+        j = nodeShiftType[arena.node[parents]]
+        costs = arena.cost[parents] + arcCost[arcs]
+        lo, hi = arena.state[parents, :K], arena.state[parents, K:]
+        reset = keep[day, i, j] == 0
+        value = add[day, i, j]
+        # Value after a reset must be within the interval
+        feasible = ~np.any(reset & ((value < lo) | (hi < value)), axis=1)
+        # Shift intervals where counting, and intersect with resource windows
+        lo = np.maximum(np.where(reset, -np.inf, lo - value), lwr[day - 1, i])
+        hi = np.minimum(np.where(reset, np.inf, hi - value), upr[day - 1, i])
+        feasible &= np.all(lo <= hi, axis=1)
+        # Keep only labels that may get below the threshold
+        if costThreshold != None:
+            feasible &= costs + costFromStart[nodes] < costThreshold
+        nodes, parents, costs = nodes[feasible], parents[feasible], costs[feasible]
+        states = np.hstack((lo[feasible], hi[feasible]))
+
+        # Sort labels by node and cost (stable, to keep order of extension)
+        order = np.lexsort((costs, nodes))
+        nodes, parents, costs, states = (nodes[order], parents[order],
+                                         costs[order], states[order])
+
+        # Remove dominated labels (wider intervals are better) and limit
+        # extension node by node
+        keys = np.hstack((states[:, :K], -states[:, K:]))
+        keepLabel, limited = selectLabels(nodes, costs, keys, dominance,
+                                          extensionLimit)
+        extension_limited = extension_limited or limited
+
+        # Add remaining labels to the arena
+        labels = arena.add(parent=parents[keepLabel], node=nodes[keepLabel],
+                           cost=costs[keepLabel], state=states[keepLabel])
+
+    return arena, labels, extension_limited
+
+def labelling_bidirectional(resources, graph, data, employee, extensionLimit,
+                            costThreshold=None, solutionsCount=None, midDay=None,
+                            deadline=None):
+    '''Bidirectional SPPRC labelling algorithm. Labels are extended forward
+    from the start node up to midDay (see labelling_vectorized), and backward
+    from the end node down to midDay (see labellingBackward). Forward and
+    backward labels in the same node on midDay are then merged if the resource
+    values of the forward label are within the intervals of the backward label.
+    midDay defaults to the middle of the planning period.
+
+    Returns the merged labels in the end node and whether extensionLimit
+    discarded any labels. Only merged labels with a cost below costThreshold
+    are returned if costThreshold is given, and only the solutionsCount best
+    if solutionsCount is given. If a deadline is given (in seconds since the
+    epoch, see time.time), labelling is interrupted once it has passed.
+    '''
+
+    # Compile resources to lookup tables and index the graph
+    tables = resources.compile(data=data, employee=employee)
+    arrays = graphArrays(graph)
+    K = len(tables['components'])
+    nodeDay, arcCost = arrays['nodeDay'], arrays['arcCost']
+    arcOrigin, arcDestination = arrays['arcOrigin'], arrays['arcDestination']
+    endDay = data['Days'][-1] + 1
+    if midDay == None:
+        midDay = endDay // 2
+
+    # Lower bounds on the cost to go from and to each node, if labels are
+    # discarded
+    costToGo, costFromStart = None, None
+    if costThreshold != None:
+        bounds = graph.costToGo()
+        costToGo = np.array([bounds[node] for node in graph.nodes])
+        costFromStart = np.full(len(nodeDay), np.inf)
+        costFromStart[0] = 0
+        for day in range(1, endDay + 1):
+            arcs = np.flatnonzero(nodeDay[arcDestination] == day)
+            np.minimum.at(costFromStart, arcDestination[arcs],
+                          costFromStart[arcOrigin[arcs]] + arcCost[arcs])
+
+    # Extend labels forward and backward to midDay
+    forward, forwardLabels, forwardLimited = labellingForward(tables, arrays, midDay,
+                                                              extensionLimit,
+                                                              costToGo, costThreshold,
+                                                              deadline)
+    backward, backwardLabels, backwardLimited = labellingBackward(tables, arrays, midDay,
+                                                                  extensionLimit,
+                                                                  costFromStart,
+                                                                  costThreshold,
+                                                                  deadline)
+    extension_limited = forwardLimited or backwardLimited
+
+    # Merge forward and backward labels node by node
+    merged, mergedCosts = [], []
+    for node in np.unique(forward.node[forwardLabels]):
+        f = forwardLabels[forward.node[forwardLabels] == node]
+        b = backwardLabels[backward.node[backwardLabels] == node]
+        if len(b) == 0:
+            continue
+        states = forward.state[f].astype(float)
+        lo, hi = backward.state[b, :K], backward.state[b, K:]
+        # Merge blocks of forward labels to limit memory use
+        for block in range(0, len(f), 256):
+            rows = slice(block, block + 256)
+            compatible = np.all((lo[None, :, :] <= states[rows, None, :]) &
+                                (states[rows, None, :] <= hi[None, :, :]), axis=2)
+            costs = forward.cost[f[rows], None] + backward.cost[b][None, :]
+            if costThreshold != None:
+                compatible &= costs < costThreshold
+            fi, bi = np.nonzero(compatible)
+            merged += zip(f[rows][fi].tolist(), b[bi].tolist())
+            mergedCosts += costs[fi, bi].tolist()
+
+    # Keep only the solutionsCount best merged labels if specified
+    if solutionsCount != None:
+        best = np.argsort(mergedCosts, kind='stable')[:solutionsCount]
+        merged = [merged[m] for m in sorted(best)]
+
+    # Create labels in end node: the forward label followed by the nodes of
+    # the backward label
+    created = {}
+    refs = tables['refs']
+    end_labels = []
+    for f, b in merged:
+        label = forward.label(f, graph, tables, created)
+        b = backward.parent[b]
+        while b != -1:
+            node = graph.nodes[backward.node[b]]
+            keep, add = refs[node.day][label.node.shiftType][node.shiftType]
+            label = Label(node=node, parent=label,
+                          cost=label.cost + graph.costs[(label.node, node)],
+                          resourceValues=tuple([k * v + a for k, v, a in
+                                                zip(keep, label.resourceValues, add)]))
+            b = backward.parent[b]
+        end_labels.append(label)
+
+    return end_labels, extension_limited
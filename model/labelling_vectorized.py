@@ -0,0 +1,259 @@
+import sys
+sys.path.append('./classes')
+import numpy as np
+import time
+from resources import Resources
+from label import Label
+
+class LabelArena:
+    '''Preallocated structure-of-arrays storage of labels. Each label is
+    represented by its parent label, node, cost and resource state (one column
+    per compiled resource component).
+    '''
+
+    def __init__(self, K, capacity=1024, dtype=np.int64):
+        self.n = 0
+        self.parent = np.zeros(capacity, dtype=np.int64)
+        self.node = np.zeros(capacity, dtype=np.int64)
+        self.cost = np.zeros(capacity)
+        self.state = np.zeros((capacity, K), dtype=dtype)
+
+    def add(self, parent, node, cost, state):
+        '''Add labels to the arena and return their indices'''
+        first, last = self.n, self.n + len(cost)
+        # Double the capacity until all labels fit
+        if last > len(self.cost):
+            capacity = len(self.cost)
+            while capacity < last:
+                capacity *= 2
+            for attribute in ['parent', 'node', 'cost', 'state']:
+                old = getattr(self, attribute)
+                new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+                new[:first] = old[:first]
+                setattr(self, attribute, new)
+        self.parent[first:last] = parent
+        self.node[first:last] = node
+        self.cost[first:last] = cost
+        self.state[first:last] = state
+        self.n = last
+        return np.arange(first, last)
+
+    def label(self, index, graph, tables, labels=None):
+        '''Create the Label object of the label with the given index, along
+        with Label objects of its parent labels (shared through labels)'''
+        if labels == None:
+            labels = {}
+        if index not in labels:
+            parent = None
+            if self.parent[index] != -1:
+                parent = self.label(self.parent[index], graph, tables, labels)
+            labels[index] = Label(node=graph.nodes[self.node[index]], parent=parent,
+                                  cost=float(self.cost[index]),
+                                  resourceValues=tuple(self.state[index].tolist()))
+        return labels[index]
+
+def paretoFilter(cost, key, blockSize=64):
+    '''Return a boolean mask of labels not dominated by any other label, given
+    costs and dominance keys (lower is better in all components). Of several
+    identical labels, only the first is kept.
+
+    Labels are swept in order of cost (then sum of keys), so a label can only
+    be dominated by labels before it. Each block of blockSize labels is
+    compared with the labels kept before it (the current front) and with the
+    labels before it in the block, so memory is linear in the number of labels
+    for a given front.
+    '''
+    n = len(cost)
+    if n < 2:
+        return np.ones(n, dtype=bool)
+    # Order of the sweep (stable, so identical labels keep their order)
+    order = np.lexsort((key.sum(axis=1), cost))
+    sortedKey = key[order]
+    keep = np.zeros(n, dtype=bool)
+    front = sortedKey[:0]
+    # Labels before each label in a block
+    before = np.tri(blockSize, k=-1, dtype=bool)
+    for start in range(0, n, blockSize):
+        block = sortedKey[start:start + blockSize]
+        size = len(block)
+        # Labels dominated by the front
+        dominated = np.zeros(size, dtype=bool)
+        if len(front):
+            dominated = np.all(front[:, None, :] <= block[None, :, :], axis=2).any(axis=0)
+        # Labels dominated by labels before them in the block (dominance is
+        # transitive, so dominated labels need not be left out)
+        dominated |= (np.all(block[None, :, :] <= block[:, None, :], axis=2)
+                      & before[:size, :size]).any(axis=1)
+        keep[start:start + size] = ~dominated
+        if start + size < n:
+            front = np.concatenate((front, block[~dominated]))
+    # Mask in the order of the labels given
+    mask = np.zeros(n, dtype=bool)
+    mask[order] = keep
+    return mask
+
+def graphArrays(graph):
+    '''Index nodes and arcs of graph in arrays. Arcs are sorted by origin
+    node, with the arcs out of node n being arcStart[n] to arcStart[n + 1].
+    '''
+    nodeIndex = {node: n for n, node in enumerate(graph.nodes)}
+    arcStart = np.zeros(len(graph.nodes) + 1, dtype=np.int64)
+    arcOrigin, arcDestination, arcCost = [], [], []
+    for node in graph.nodes:
+        for destination in node.neighbors:
+            arcOrigin.append(nodeIndex[node])
+            arcDestination.append(nodeIndex[destination])
+            arcCost.append(graph.costs[(node, destination)])
+        arcStart[nodeIndex[node] + 1] = len(arcDestination)
+    return {'nodeIndex': nodeIndex,
+            'nodeDay': np.array([node.day for node in graph.nodes], dtype=np.int64),
+            'nodeShiftType': np.array([node.shiftType for node in graph.nodes],
+                                      dtype=np.int64),
+            'arcStart': arcStart,
+            'arcCount': np.diff(arcStart),
+            'arcOrigin': np.array(arcOrigin, dtype=np.int64),
+            'arcDestination': np.array(arcDestination, dtype=np.int64),
+            'arcCost': np.array(arcCost)}
+
+def arcsOut(labelNodes, arcStart, arcCount):
+    '''Return, for labels in the nodes labelNodes, the label and arc of all
+    arcs out of the nodes (as given by arcStart and arcCount)'''
+    counts = arcCount[labelNodes]
+    labels = np.repeat(np.arange(len(labelNodes)), counts)
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    arcs = np.repeat(arcStart[labelNodes], counts) + offsets
+    return labels, arcs
+
+def selectLabels(nodes, costs, keys, dominance, extensionLimit):
+    '''Select labels to keep among labels sorted by node and cost. Dominated
+    labels (given dominance keys, see paretoFilter) are removed in the nodes
+    where dominance[node] is True, and at most extensionLimit labels are kept
+    in each node. Returns a boolean mask of kept labels and whether
+    extensionLimit discarded any labels.
+    '''
+    keepLabel = np.ones(len(costs), dtype=bool)
+    extension_limited = False
+    destinations, starts, sizes = np.unique(nodes, return_index=True,
+                                            return_counts=True)
+    for start, size in zip(starts, sizes):
+        inNode = slice(start, start + size)
+        if dominance[nodes[start]]:
+            keepLabel[inNode] = paretoFilter(costs[inNode], keys[inNode])
+        # If a limit on the number of labels extended is set, limit extension
+        if extensionLimit != None:
+            kept = np.flatnonzero(keepLabel[inNode])
+            if len(kept) > extensionLimit:
+                keepLabel[start + kept[extensionLimit:]] = False
+                extension_limited = True
+    return keepLabel, extension_limited
+
+def labellingForward(tables, arrays, lastDay, extensionLimit, costToGo=None,
+                     costThreshold=None, deadline=None):
+    '''Extend labels day by day from the start node up to the nodes on
+    lastDay (see labelling_vectorized). Returns the label arena, the indices of
+    the labels on lastDay and whether extensionLimit discarded any labels. If
+    the deadline passes, no labels are returned (as if limited).
+    '''
+    keep, add = tables['keep'], tables['add']
+    lwr, upr = tables['lwr'], tables['upr']
+    sign, cap = tables['sign'], tables['cap']
+    nodeShiftType = arrays['nodeShiftType']
+    arcDestination, arcCost = arrays['arcDestination'], arrays['arcCost']
+    # Dominance is applied in all but the end node
+    dominance = arrays['nodeDay'] != arrays['nodeDay'].max()
+
+    # Initialize label arena with the start label (first node of the graph)
+    arena = LabelArena(len(tables['components']))
+    labels = arena.add(parent=[-1], node=[0], cost=[0],
+                       state=[list(tables['initial'])])
+
+    # Assume extension is not limited by extensionLimit
+    extension_limited = False
+
+    # Process the graph day by day
+    for day in range(1, lastDay + 1):
+        # Interrupt labelling if the deadline has passed
+        if deadline != None and time.time() > deadline:
+            return arena, labels[:0], True
+
+        # Find all arcs out of the labels' nodes
+        parents, arcs = arcsOut(arena.node[labels], arrays['arcStart'],
+                                arrays['arcCount'])
+        parents = labels[parents]
+
+        # Extend all labels along all arcs
+        nodes = arcDestination[arcs]
+        i = nodeShiftType[arena.node[parents]]
+        j = nodeShiftType[nodes]
+        costs = arena.cost[parents] + arcCost[arcs]
+        states = keep[day, i, j] * arena.state[parents] + add[day, i, j]
+
+        # Keep only labels within the resource windows
+        feasible = np.all((lwr[day, j] <= states) & (states <= upr[day, j]), axis=1)
+        # Keep only labels that may get below the threshold
+        if costThreshold != None:
+            feasible &= costs + costToGo[nodes] < costThreshold
+        nodes, parents, costs, states = (nodes[feasible], parents[feasible],
+                                         costs[feasible], states[feasible])
+
+        # Sort labels by node and cost (stable, to keep order of extension)
+        order = np.lexsort((costs, nodes))
+        nodes, parents, costs, states = (nodes[order], parents[order],
+                                         costs[order], states[order])
+
+        # Remove dominated labels and limit extension node by node
+        keepLabel, limited = selectLabels(nodes, costs,
+                                          sign * np.minimum(states, cap),
+                                          dominance, extensionLimit)
+        extension_limited = extension_limited or limited
+
+        # Add remaining labels to the arena
+        labels = arena.add(parent=parents[keepLabel], node=nodes[keepLabel],
+                           cost=costs[keepLabel], state=states[keepLabel])
+
+    return arena, labels, extension_limited
+
+def labelling_vectorized(resources, graph, data, employee, extensionLimit,
+                         costThreshold=None, solutionsCount=None, deadline=None):
+    '''SPPRC labelling algorithm processing one day of the graph at a time.
+    All labels of a day are extended along all arcs at once, and dominated
+    labels are removed by Pareto filtering of the labels in each node.
+
+    Returns the labels in the end node (the only ones used by the sub problem)
+    and whether extensionLimit discarded any labels.
+
+    If costThreshold is given, labels whose cost plus the cost to go from their
+    node (see Graph.costToGo) cannot get below costThreshold are discarded.
+    Labels only reach the end node on the last day, so if solutionsCount is
+    given, only the solutionsCount best labels in the end node are returned.
+
+    If a deadline is given (in seconds since the epoch, see time.time),
+    labelling is interrupted once it has passed (checked once per day).
+    '''
+
+    # Compile resources to lookup tables and index the graph
+    tables = resources.compile(data=data, employee=employee)
+    arrays = graphArrays(graph)
+
+    # Lower bounds on the cost to go from each node, if labels are discarded
+    costToGo = None
+    if costThreshold != None:
+        bounds = graph.costToGo()
+        costToGo = np.array([bounds[node] for node in graph.nodes])
+
+    # Extend labels from the start node to the end node
+    arena, labels, extension_limited = labellingForward(tables, arrays,
+                                                        data['Days'][-1] + 1,
+                                                        extensionLimit,
+                                                        costToGo, costThreshold,
+                                                        deadline)
+
+    # Keep only the solutionsCount best labels in the end node if specified
+    if solutionsCount != None:
+        labels = labels[np.argsort(arena.cost[labels], kind='stable')[:solutionsCount]]
+
+    # Create labels in end node and their parent labels
+    created = {}
+    end_labels = [arena.label(label, graph, tables, created) for label in labels]
+
+    return end_labels, extension_limited
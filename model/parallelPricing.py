@@ -0,0 +1,196 @@
+import sys
+sys.path.append('./classes')
+import multiprocessing
+import multiprocessing.connection
+import time
+import copy
+import traceback
+from solveSP import solveSP
+
+class PricingPool:
+    '''Pool of worker processes solving sub problems in parallel. Each worker
+    holds long-lived copies of data and the graphs of all employees, given
+    when the pool is started, and only receives duals and settings for each
+    round of pricing. The pool is started once for the branch-and-price tree,
+    and graphs changed since (by branching, preprocessing or reduced cost
+    fixing) are sent to the workers as the nodes and arcs removed from the
+    graphs given when started (see update). Employees to price are sent to
+    each worker over its own pipe, one at a time, so workers get the next
+    employee in order as soon as they are done. Messages are tagged with the
+    round of pricing, so results of an interrupted round are never taken for
+    results of a later round.
+    '''
+
+    def __init__(self, data, graphs, processes, pollInterval=1):
+        self.processes = processes
+        # Seconds to wait for results before checking that workers are alive
+        self.pollInterval = pollInterval
+        # Round of pricing (see price)
+        self.round = 0
+        # Nodes and arcs of the graphs the workers started with, by day and
+        # shift type, and the graphs last sent to the workers (with their
+        # numbers of nodes and arcs, as graphs are changed by removing them)
+        self.startNodes, self.startArcs = {}, {}
+        self.sent = {}
+        for employee, graph in graphs.items():
+            self.startNodes[employee], self.startArcs[employee] = graphKeys(graph)
+            self.sent[employee] = (graph, len(graph.nodes), len(graph.costs))
+        self.connections = []
+        self.workers = []
+        # Start workers with copies of data and graphs
+        for _ in range(processes):
+            connection, workerConnection = multiprocessing.Pipe()
+            worker = multiprocessing.Process(target=pricingWorker,
+                                             args=(workerConnection, data, graphs),
+                                             daemon=True)
+            worker.start()
+            self.connections.append(connection)
+            self.workers.append(worker)
+
+    def update(self, graphs):
+        '''Send the graphs changed since they were last sent to the workers, as
+        the nodes and arcs removed from the graphs the workers started with.
+        Called for the graphs of each problem before it is solved.'''
+        changes = {}
+        for employee, graph in graphs.items():
+            sent, nodes, arcs = self.sent[employee]
+            if sent is graph and nodes == len(graph.nodes) and arcs == len(graph.costs):
+                continue
+            self.sent[employee] = (graph, len(graph.nodes), len(graph.costs))
+            # Nodes removed, and arcs removed between remaining nodes
+            nodes, arcs = graphKeys(graph)
+            changes[employee] = (sorted(self.startNodes[employee] - nodes),
+                                 sorted(arc for arc in self.startArcs[employee] - arcs
+                                        if arc[0] in nodes and arc[1] in nodes))
+        if changes:
+            for connection in self.connections:
+                self.send(connection, ('graphs', changes))
+
+    def price(self, order, duals, extensionLimits, target=None, epsilon=1e-9,
+              solutions_count=1, resourceVec=['TWMin', 'TWMin_g', 'TV'],
+              SPMethod='labelling', earlyExit=False, deadline=None):
+        '''Solve the sub problems of the employees in order with duals (see
+        solveSP), on the graphs last sent to the workers (see update). Once target solutions with negative reduced cost are found,
+        the remaining sub problems are cancelled (sub problems being solved
+        are completed). Returns a dict of employee: (reduced costs, solutions,
+        remaining extension limits, time spent) for the sub problems solved,
+        and the employees whose sub problems were cancelled (in order).
+        Exceptions in workers, and workers stopping, raise a RuntimeError.
+        '''
+
+        # Send duals and settings of the round to all workers
+        self.round += 1
+        settings = {'extensionLimits': {employee: extensionLimits[employee]
+                                        for employee in order},
+                    'epsilon': epsilon, 'solutions_count': solutions_count,
+                    'resourceVec': resourceVec, 'SPMethod': SPMethod,
+                    'earlyExit': earlyExit, 'deadline': deadline}
+        for connection in self.connections:
+            self.send(connection, ('price', self.round, duals, settings))
+
+        # Give each worker an employee, and the next employee once it is done,
+        # until target is reached
+        pending = list(order)
+        busy = {} # Employee being priced by each worker (by connection)
+        for connection in self.connections:
+            if pending:
+                busy[connection] = pending.pop(0)
+                self.send(connection, ('solve', self.round, busy[connection]))
+        solved = {}
+        improving = 0
+        while busy:
+            ready = multiprocessing.connection.wait(list(busy), timeout=self.pollInterval)
+            # Check that workers are alive if no results came in time
+            if not ready:
+                for connection, employee in busy.items():
+                    if not self.workers[self.connections.index(connection)].is_alive():
+                        raise RuntimeError('Pricing worker stopped while solving the sub '
+                                           'problem of employee {}'.format(employee))
+                continue
+            for connection in ready:
+                message = connection.recv()
+                # Drop results of earlier (interrupted) rounds
+                if message[1] != self.round:
+                    continue
+                employee = busy.pop(connection)
+                if message[0] == 'error':
+                    raise RuntimeError('Pricing worker failed on the sub problem of '
+                                       'employee {}:\n{}'.format(employee, message[3]))
+                _, _, _, objectives, solutions, limits, spent = message
+                solved[employee] = (objectives, solutions, limits, spent)
+                if objectives != None and min(objectives.values()) < -epsilon:
+                    improving += 1
+                # Give the worker the next employee unless target is reached
+                if pending and (target == None or improving < target):
+                    busy[connection] = pending.pop(0)
+                    self.send(connection, ('solve', self.round, busy[connection]))
+
+        # Employees not priced are cancelled (in order)
+        return solved, pending
+
+    def send(self, connection, message):
+        '''Send message to the worker of connection'''
+        try:
+            connection.send(message)
+        except (BrokenPipeError, OSError):
+            raise RuntimeError('Pricing worker stopped')
+
+    def close(self):
+        '''Stop all workers (workers not stopping in time are terminated)'''
+        for connection in self.connections:
+            try:
+                connection.send(('close',))
+            except (BrokenPipeError, OSError):
+                pass
+        for worker in self.workers:
+            worker.join(timeout=self.pollInterval)
+            if worker.is_alive():
+                worker.terminate()
+                worker.join()
+
+def pricingWorker(connection, data, graphs):
+    '''Worker process of PricingPool. Changes of the graphs, given as nodes
+    and arcs removed from graphs, and duals and settings of each round of
+    pricing are received, then employees to price. One result per employee is
+    sent back, tagged with the round, and exceptions are sent back as
+    errors.'''
+
+    duals, settings = None, None
+    # Graphs priced, changed from copies of the graphs given
+    current = dict(graphs)
+    while True:
+        message = connection.recv()
+        if message[0] == 'close':
+            return
+        if message[0] == 'graphs':
+            for employee, (nodes, arcs) in message[1].items():
+                current[employee] = copy.deepcopy(graphs[employee])
+                current[employee].remove_nodesAndArcs(nodes, arcs)
+            continue
+        if message[0] == 'price':
+            _, _, duals, settings = message
+            continue
+        _, round, employee = message
+        try:
+            start = time.time()
+            extensionLimits = settings['extensionLimits'][employee]
+            objectives, solutions = solveSP(data=data, employee=employee,
+                                            graph=current[employee], duals=duals,
+                                            epsilon=settings['epsilon'],
+                                            extensionLimits=extensionLimits,
+                                            solutions_count=settings['solutions_count'],
+                                            resourceVec=settings['resourceVec'],
+                                            SPMethod=settings['SPMethod'],
+                                            earlyExit=settings['earlyExit'],
+                                            deadline=settings['deadline'])
+            connection.send(('solved', round, employee, objectives, solutions,
+                             extensionLimits, time.time() - start))
+        except Exception:
+            connection.send(('error', round, employee, traceback.format_exc()))
+
+def graphKeys(graph):
+    '''Nodes and arcs of graph, by day and shift type of their nodes'''
+    nodes = {(node.day, node.shiftType) for node in graph.nodes}
+    arcs = {((origin.day, origin.shiftType), (destination.day, destination.shiftType))
+            for origin, destination in graph.costs}
+    return nodes, arcs
@@ -0,0 +1,295 @@
+'''Functions used to price columns by a chain of pricers'''
+import sys
+sys.path.append('./classes')
+import numpy as np
+import copy as copy
+import time
+from resources import Resources
+from solveSP import solveSP
+
+def solvePricers(data, employee, graph, duals, columns, MPSolution, pool,
+                 times, pricers = ['exact'], epsilon = 1e-9,
+                 solutions_count = 1, extensionLimits = [],
+                 resourceVec = ['TWMin', 'TWMin_g', 'TV'],
+                 SPMethod = 'labelling', earlyExit = False, deadline = None,
+                 poolSize = 100, truncatedExtensionLimits = [5],
+                 localSearchIterations = 5, localSearchTenure = 2,
+                 localSearchBlockLength = 4):
+    '''Price columns for employee by trying the pricers in order, until one
+    finds a solution with negative reduced cost. Allowed pricers are 'pool'
+    (repricing of the column pool), 'localSearch' (tabu search from the
+    current rosterline of the employee), 'truncated' (labelling with label
+    extension limits only) and 'exact' (solveSP as configured). Cheaper
+    pricers should come first. 'exact' is always tried last (it is moved or
+    appended to the end of the chain), so that a failing chain proves that no
+    improving column exists.
+
+    pool is a dict of employee: dict of rosterlines (as tuples) found by the
+    pricers but not added as columns, bounded by poolSize per employee.
+    The number of calls, hits (calls finding a negative reduced cost
+    solution) and time spent are stored per pricer in times['Pricers'].
+
+    truncatedExtensionLimits are the label extension limits of the truncated
+    pricer. localSearchIterations, localSearchTenure and
+    localSearchBlockLength are the iterations, tabu tenure and block length of
+    the local search pricer (see pricer_localSearch).
+
+    Returns reduced costs and solutions as solveSP, along with the name of the
+    last pricer run.
+    '''
+
+    # Update graph according to duals (once for all pricers)
+    graph.update_costs(duals, data, employee)
+
+    # End the chain with exact pricing
+    if not pricers or pricers[-1] != 'exact':
+        pricers = [pricer for pricer in pricers if pricer != 'exact'] + ['exact']
+
+    # Initialize resources and the column pool of the employee
+    resources = Resources(resourceVec)
+    employeePool = pool.setdefault(employee, {})
+    # Settings of specific pricers
+    settings = {'truncated': {'truncatedExtensionLimits': truncatedExtensionLimits},
+                'localSearch': {'iterations': localSearchIterations,
+                                'tenure': localSearchTenure,
+                                'blockLength': localSearchBlockLength}}
+
+    # Try pricers in order until a neg. red. cost solution is found
+    for pricer in pricers:
+        statistics = times.setdefault('Pricers', {}).setdefault(pricer, {'Calls': 0,
+                                                                         'Hits': 0,
+                                                                         'Hit rate': 0,
+                                                                         'Time': 0})
+        start = time.time()
+        surplus = []
+        reduced_costs, solutions = globals()['pricer_%s' % pricer](data = data,
+                                      employee = employee, graph = graph,
+                                      resources = resources, columns = columns,
+                                      MPSolution = MPSolution,
+                                      pool = employeePool, surplus = surplus,
+                                      epsilon = epsilon,
+                                      solutions_count = solutions_count,
+                                      extensionLimits = extensionLimits,
+                                      resourceVec = resourceVec,
+                                      SPMethod = SPMethod, earlyExit = earlyExit,
+                                      deadline = deadline, poolSize = poolSize,
+                                      **settings.get(pricer, {}))
+        stop = time.time()
+
+        # Add surplus solutions to the pool
+        for rosterline in surplus:
+            addToPool(pool, employee, rosterline, poolSize)
+
+        # Update statistics
+        statistics['Calls'] += 1
+        statistics['Time'] += stop - start
+        found = reduced_costs != None and min(reduced_costs.values()) < -epsilon
+        if found:
+            statistics['Hits'] += 1
+        statistics['Hit rate'] = statistics['Hits'] / statistics['Calls']
+
+        # Stop if a neg. red. cost solution is found, or the deadline passed
+        if found or (deadline != None and time.time() > deadline):
+            break
+
+    # Solutions returned are added as columns, and are removed from the pool
+    if solutions != None:
+        for solution_id in solutions:
+            employeePool.pop(tuple(solutions[solution_id]), None)
+
+    return reduced_costs, solutions, pricer
+
+def addToPool(pool, employee, rosterline, poolSize = 100):
+    '''Adds the rosterline to the column pool of the employee, dropping the
+    oldest rosterline if the pool has more than poolSize rosterlines'''
+
+    employeePool = pool.setdefault(employee, {})
+    employeePool[tuple(rosterline)] = None
+    if len(employeePool) > poolSize:
+        employeePool.pop(next(iter(employeePool)))
+
+def rosterlinePath(rosterline, graph, data, nodes = None):
+    '''Nodes of graph from the start node to the end node assigning the
+    rosterline. Returns None if a node is not in the graph. nodes may be given
+    as the nodes of graph indexed by day and shift type.'''
+
+    # Index nodes by day and shift type
+    if nodes == None:
+        nodes = {(node.day, node.shiftType): node for node in graph.nodes}
+    path = [graph.nodes[0]]
+    for day in data['Days']:
+        if (day, rosterline[day - 1]) not in nodes:
+            return None
+        path.append(nodes[(day, rosterline[day - 1])])
+    path.append(nodes[(data['Days'][-1] + 1, 0)])
+    return path
+
+def evaluatePath(path, graph, resources, data, employee, start = 1,
+                 cost = 0, resourceValues = None, states = None):
+    '''Cost of path in graph from path[start - 1], given its cost and
+    resourceValues there (the start node by default). Returns None if an arc
+    of the path is not in the graph or the path is resource infeasible. If a
+    states list is given, the cost and resource values in each node from
+    path[start] are appended to it.'''
+
+    if resourceValues == None:
+        resourceValues = resources.initialize(data = data, employee = employee)
+    # Extend cost and resources along all arcs of the path
+    for origin, destination in zip(path[start - 1:-1], path[start:]):
+        if (origin, destination) not in graph.costs:
+            return None
+        cost += graph.costs[(origin, destination)]
+        resourceValues = resources.extend(resourceValues, destination.day,
+                                          origin.shiftType, destination.shiftType,
+                                          data, employee)
+        if not resources.feasible(resourceValues, destination.day,
+                                  destination.shiftType, data, employee):
+            return None
+        if states != None:
+            states.append((cost, resourceValues))
+    return cost
+
+def formatSolutions(found, solutions_count, data):
+    '''Format the solutions_count best of the found solutions (dict of
+    rosterline tuple: reduced cost) as solveSP. Returns None, None if none
+    were found.'''
+
+    solutions, reduced_costs = {}, {}
+    solution_id = 0
+    for rosterline in sorted(found, key = lambda rosterline: found[rosterline])[:solutions_count]:
+        solution_id += 1
+        solutions[solution_id] = np.array(rosterline, dtype = int)
+        reduced_costs[solution_id] = found[rosterline]
+    if len(solutions) == 0:
+        return None, None
+    return reduced_costs, solutions
+
+def pricer_pool(data, employee, graph, resources, columns, MPSolution, pool,
+                surplus, epsilon, solutions_count, extensionLimits, resourceVec,
+                SPMethod, earlyExit, deadline, poolSize):
+    '''Reprices the rosterlines in the column pool of the employee on the
+    current graph'''
+
+    nodes = {(node.day, node.shiftType): node for node in graph.nodes}
+    found = {}
+    for rosterline in pool:
+        path = rosterlinePath(rosterline, graph, data, nodes)
+        if path != None:
+            cost = evaluatePath(path, graph, resources, data, employee)
+            if cost != None and cost < -epsilon:
+                found[rosterline] = cost
+    return formatSolutions(found, solutions_count, data)
+
+def pricer_localSearch(data, employee, graph, resources, columns, MPSolution,
+                       pool, surplus, epsilon, solutions_count, extensionLimits,
+                       resourceVec, SPMethod, earlyExit, deadline, poolSize,
+                       iterations = 5, tenure = 2, blockLength = 4):
+    '''Tabu search from the current rosterline of the employee (the column of
+    the employee with the largest weight in the RMP solution). A change
+    assigns one shift type to a block of up to blockLength consecutive days
+    (single days are often resource infeasible to change alone). In each
+    iteration, the best non-tabu change is made, even if it is not improving.
+    Changing back the shift types of the block is then tabu for tenure
+    iterations, unless it gives the best rosterline so far. Changes are
+    feasible in graph and with respect to resources. The search stops after
+    iterations, or once solutions_count rosterlines with negative reduced cost
+    are found. Returns the best rosterlines with negative reduced cost found,
+    and adds the others to surplus.'''
+
+    # Find the current rosterline of the employee
+    employeeColumns = [column for column in columns.columns
+                       if column.employee == employee]
+    if not employeeColumns or not MPSolution:
+        return None, None
+    current = max(employeeColumns, key = lambda column:
+                  MPSolution.get((employee, column.rosterlineNumber), 0))
+    nodes = {(node.day, node.shiftType): node for node in graph.nodes}
+    path = rosterlinePath(current.rosterline, graph, data, nodes)
+    if path == None:
+        return None, None
+
+    shiftTypes = set(node.shiftType for node in graph.nodes
+                     if node.day in data['Days'])
+
+    tabu = {} # (day, shift type): last iteration the shift type is tabu
+    found = {}
+    bestCost = float('inf')
+    for iteration in range(iterations):
+        # Cost and resource values of the current path in all nodes
+        states = [(0, resources.initialize(data = data, employee = employee))]
+        if evaluatePath(path, graph, resources, data, employee, states = states) == None:
+            break
+
+        # Evaluate all changes of a block of days to one shift type
+        move = None
+        for day in data['Days']:
+            for shiftType in shiftTypes:
+                block = []
+                for blockDay in range(day, min(day + blockLength, data['Days'][-1] + 1)):
+                    if (blockDay, shiftType) not in nodes:
+                        break
+                    block.append(nodes[(blockDay, shiftType)])
+                    if all(node is path[node.day] for node in block):
+                        continue
+                    neighbor = path[:day] + block + path[blockDay + 1:]
+                    cost = evaluatePath(neighbor, graph, resources, data, employee,
+                                        start = day, cost = states[day - 1][0],
+                                        resourceValues = states[day - 1][1])
+                    if cost == None:
+                        continue
+                    if cost < -epsilon:
+                        found[tuple(node.shiftType for node in neighbor[1:-1])] = cost
+                    # Tabu changes are only allowed if giving the best so far
+                    if (cost >= bestCost and
+                        any(tabu.get((node.day, shiftType), -1) >= iteration
+                            for node in block)):
+                        continue
+                    if move == None or cost < move[0]:
+                        move = (cost, list(block))
+
+        # Make the best change, and make changing back tabu
+        if move == None:
+            break
+        cost, block = move
+        for node in block:
+            tabu[(node.day, path[node.day].shiftType)] = iteration + tenure
+            path[node.day] = node
+        bestCost = min(bestCost, cost)
+
+        # Stop once enough neg. red. cost rosterlines are found
+        if solutions_count != None and len(found) >= solutions_count:
+            break
+
+    reduced_costs, solutions = formatSolutions(found, solutions_count, data)
+    # Add the others found to surplus
+    if solutions != None:
+        returned = set(tuple(solutions[solution_id]) for solution_id in solutions)
+        surplus += [np.array(rosterline, dtype = int) for rosterline in found
+                    if rosterline not in returned]
+    return reduced_costs, solutions
+
+def pricer_truncated(data, employee, graph, resources, columns, MPSolution,
+                     pool, surplus, epsilon, solutions_count, extensionLimits,
+                     resourceVec, SPMethod, earlyExit, deadline, poolSize,
+                     truncatedExtensionLimits = [5]):
+    '''Labelling with label extension limits only (see solveSP)'''
+
+    return solveSP(data = data, employee = employee, graph = graph,
+                   epsilon = epsilon,
+                   extensionLimits = copy.copy(truncatedExtensionLimits),
+                   solutions_count = solutions_count, resourceVec = resourceVec,
+                   SPMethod = SPMethod, earlyExit = earlyExit,
+                   deadline = deadline, truncate = True,
+                   surplus = surplus, surplusCount = poolSize)
+
+def pricer_exact(data, employee, graph, resources, columns, MPSolution, pool,
+                 surplus, epsilon, solutions_count, extensionLimits,
+                 resourceVec, SPMethod, earlyExit, deadline, poolSize):
+    '''Sub problem as configured in column generation (see solveSP)'''
+
+    return solveSP(data = data, employee = employee, graph = graph,
+                   epsilon = epsilon, extensionLimits = extensionLimits,
+                   solutions_count = solutions_count, resourceVec = resourceVec,
+                   SPMethod = SPMethod, earlyExit = earlyExit,
+                   deadline = deadline, surplus = surplus,
+                   surplusCount = poolSize)
@@ -0,0 +1,112 @@
+import sys
+sys.path.append('./classes')
+import heapq
+import time
+from collections import deque
+from resources import Resources
+from label import Label
+
+def pulse(resources, graph, data, employee, extensionLimit, costThreshold=None,
+          solutionsCount=None, memoSize=None, deadline=None):
+    '''Exact SPPRC algorithm by depth-first search ("pulse") from the start
+    node. Only the current path is kept: its resource values are extended when
+    moving to a neighbor and rolled back when returning. Neighbors are visited
+    in order of arc cost plus cost to go (see Graph.costToGo), so good paths
+    are found early. A path is discarded if
+
+        - it is resource infeasible,
+        - its cost plus the cost to go cannot get below costThreshold, or below
+          the solutionsCount best paths to the end node found so far,
+        - it is dominated by one of the last memoSize (default 16) paths that
+          visited its node (see Label.dominance).
+
+    The memory use is therefore proportional to the length of the planning
+    period times memoSize. Returns labels of the paths to the end node found
+    (with a cost below costThreshold and only the solutionsCount best, if
+    given). The algorithm is exact, so extensionLimit has no effect. If a
+    deadline is given (in seconds since the epoch, see time.time), the search
+    is interrupted once it has passed, and extension_limited is set.
+    '''
+
+    if memoSize == None:
+        memoSize = 16
+    threshold = costThreshold if costThreshold != None else float('inf')
+    endDay = data['Days'][-1] + 1
+    cost_to_go = graph.costToGo()
+
+    # Paths visiting each node, as (cost, resourceValues), bounded by memoSize
+    memo = {}
+    # Solutions found in the end node, as (-cost, count, path) (as a heap)
+    solutions = []
+    # Current path and count of nodes visited (to check the deadline)
+    path = [graph.nodes[0]]
+    counts = {'visited': 0, 'interrupted': False}
+
+    def explore(node, cost, resourceValues):
+        '''Explore all paths extending the current path from node'''
+        nonlocal threshold
+        # Interrupt the search if the deadline has passed
+        counts['visited'] += 1
+        if (deadline != None and counts['visited'] % 256 == 0 and
+            time.time() > deadline):
+            counts['interrupted'] = True
+        if counts['interrupted']:
+            return
+
+        # Store the path if in the end node, and tighten the threshold
+        if node.day == endDay:
+            heapq.heappush(solutions, (-cost, counts['visited'], list(path)))
+            if solutionsCount != None:
+                if len(solutions) > solutionsCount:
+                    heapq.heappop(solutions)
+                if len(solutions) == solutionsCount:
+                    threshold = min(threshold, -solutions[0][0])
+            return
+
+        # Discard the path if dominated by a path in the memo of the node
+        if Label.dominanceNode(node, data):
+            node_memo = memo.setdefault(node, deque(maxlen=memoSize))
+            for memo_cost, memo_resourceValues in node_memo:
+                if (memo_cost <= cost and
+                    resources.dominance(memo_resourceValues, resourceValues,
+                                        data, employee)):
+                    return
+            node_memo.append((cost, resourceValues))
+
+        # Extend the path to neighbors, most promising first
+        neighbors = sorted(node.neighbors, key = lambda neighbor:
+                           graph.costs[(node, neighbor)] + cost_to_go[neighbor])
+        for neighbor in neighbors:
+            neighbor_cost = cost + graph.costs[(node, neighbor)]
+            # Bound by the cost to go
+            if neighbor_cost + cost_to_go[neighbor] >= threshold:
+                continue
+            neighbor_resourceValues = resources.extend(resourceValues, neighbor.day,
+                                                       node.shiftType,
+                                                       neighbor.shiftType,
+                                                       data, employee)
+            if not resources.feasible(neighbor_resourceValues, neighbor.day,
+                                      neighbor.shiftType, data, employee):
+                continue
+            path.append(neighbor)
+            explore(neighbor, neighbor_cost, neighbor_resourceValues)
+            path.pop()
+
+    explore(path[0], 0, resources.initialize(data=data, employee=employee))
+
+    # Create labels along the paths found
+    end_labels = []
+    for _, _, solution in sorted(solutions, reverse = True):
+        label = Label.initialize(node=solution[0], resources=resources, data=data,
+                                 employee=employee)
+        for node in solution[1:]:
+            label = Label(node=node, parent=label,
+                          cost=label.cost + graph.costs[(label.node, node)],
+                          resourceValues=resources.extend(label.resourceValues,
+                                                          node.day,
+                                                          label.node.shiftType,
+                                                          node.shiftType,
+                                                          data, employee))
+        end_labels.append(label)
+
+    return end_labels, counts['interrupted']
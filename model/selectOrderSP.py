@@ -2,10 +2,15 @@
 import numpy as np
 import copy as copy
 import time
-from solveSP import solveSP
+from pricers import addToPool
 
-def selectOrderSP(data, graphs, MPDuals, epsilon=1e-9, orderStrategy = 'random', constructionHeuristic = False):
-    '''Selects order of solving sub problems based on a given strategy'''
+def selectOrderSP(data, graphs, MPDuals, epsilon=1e-9, orderStrategy = 'random', constructionHeuristic = False,
+                  pool = None, history = None, randomState = None):
+    '''Selects order of solving sub problems based on a given strategy. If a
+    column pool is given (see solvePricers), strategies may add candidate
+    rosterlines found while ordering to it. history holds the outcomes of SPs
+    solved so far (see recordSP). Random choices are made with randomState if
+    given (see numpy.random.RandomState), else with numpy.random.'''
 
     # Create order list
     order = copy.copy(data['Employees'])
@@ -13,41 +18,158 @@ def selectOrderSP(data, graphs, MPDuals, epsilon=1e-9, orderStrategy = 'random',
     order = globals()['orderStrategy_%s' % orderStrategy](order = order, data = data,
                                                          graphs = graphs, MPDuals = MPDuals,
                                                          epsilon = epsilon,
-                                                         constructionHeuristic = constructionHeuristic)
+                                                         constructionHeuristic = constructionHeuristic,
+                                                         pool = pool, history = history,
+                                                         randomState = randomState)
     return order
 
-def orderStrategy_random(order, data, graphs, MPDuals, epsilon, constructionHeuristic):
+def orderStrategy_random(order, data, graphs, MPDuals, epsilon, constructionHeuristic, pool,
+                         history, randomState):
     '''Shuffling order of SPs randomly'''
 
-    np.random.shuffle(order)
+    if randomState != None:
+        randomState.shuffle(order)
+    else:
+        np.random.shuffle(order)
     return order
 
-def orderStrategy_noResourcesSP(order, data, graphs, MPDuals, epsilon, constructionHeuristic):
-    '''Solves all SPs without resources, and selects order based on ascending
-    objective value.'''
-    
-    timeStart = time.time()
-    # Preallocate space for solutions
-    SPobjectives = dict.fromkeys(e for e in data['Employees'])
-    SPsolutions = dict.fromkeys(e for e in data['Employees'])
-    objectives = np.zeros(data['nEmployees']) # List of objectives to sort later
-    # Solve SP without resources for each employee
-    for employee in data['Employees']:
-        [SPobjectives[employee],
-         SPsolutions[employee]] = solveSP(data=data, employee=employee,
-                                          graph=graphs[employee],
-                                          duals=MPDuals, epsilon=epsilon,
-                                          resourceVec = [],
-                                          constructionHeuristic = constructionHeuristic)
-
-        # Add employee to order if solutions were found
-        if SPobjectives[employee] != None:
-            objectives[employee - 1] = SPobjectives[employee][1]
-        # If no solution was found, return None as one of the SPs is infeasible
-        else:
-            return None
+def orderStrategy_noResourcesSP(order, data, graphs, MPDuals, epsilon, constructionHeuristic, pool,
+                                history, randomState):
+    '''Solves all SPs without resources (see noResourcesPaths), and selects
+    order based on ascending objective value. Paths with negative reduced cost
+    are added to the column pool if given, as candidate columns (the pool
+    pricer checks their resource feasibility).'''
+
+    # Solve SP without resources for all employees
+    objectives, rosterlines = noResourcesPaths(data, graphs, MPDuals,
+                                               constructionHeuristic = constructionHeuristic)
+
+    # If an SP has no path to the end node, return None as it is infeasible
+    if np.any(np.isinf(objectives)):
+        return None
+
+    # Add paths with negative reduced cost to the column pool
+    if pool != None:
+        for employee in data['Employees']:
+            if objectives[employee - 1] < -epsilon:
+                addToPool(pool, employee, rosterlines[employee - 1])
 
     # Sort order after ascending SP objective value
     order = [x for _,x in sorted(zip(objectives,order))]
 
     return order
+
+def orderStrategy_history(order, data, graphs, MPDuals, epsilon, constructionHeuristic, pool,
+                          history, randomState):
+    '''Selects order based on the outcomes of the SPs when last solved (see
+    recordSP), without solving any SP. The reduced cost of the last column of
+    an employee is adjusted for the changes in duals since: the convexity dual
+    (omega), and on each day the largest increase in the coverage duals (pi)
+    of the shift types in the employee's graph. This estimates how much the
+    reduced cost may have decreased. The estimate is lowered further by the
+    share of SPs of the employee giving improving columns times the last
+    reduced cost. SPs are ordered by ascending estimate, with SPs never solved
+    first.'''
+
+    # Keep the order if there is no history
+    if not history:
+        return order
+
+    # Current coverage duals
+    pi = coverageDuals(MPDuals, data)
+
+    # Estimate the reduced cost of each SP
+    estimates = {}
+    for employee in order:
+        if employee not in history:
+            estimates[employee] = -float('inf')
+            continue
+        record = history[employee]
+        # Mask of days and shift types in the graph of the employee
+        mask = np.zeros(pi.shape, dtype = bool)
+        for node in graphs[employee].nodes:
+            if node.day in data['Days']:
+                mask[node.day, node.shiftType] = True
+        # Change in duals since last solved
+        drift = MPDuals['omega'][employee] - record['omega']
+        drift += np.sum(np.max(np.where(mask, np.maximum(pi - record['pi'], 0), 0), axis = 1))
+        # Adjust for the change in duals and the share of improving SPs. The
+        # share estimates how likely the SP is to give an improving column
+        # again, and is scaled by the last reduced cost to be in its unit: an
+        # SP that always gave improving columns is ranked as if its reduced
+        # cost were twice the last one, and one that never did keeps the dual
+        # adjusted estimate. The adjustment is at most the last reduced cost,
+        # so large dual changes (drift) still dominate the order
+        estimates[employee] = (record['reducedCost'] - drift
+                               - record['improving'] / record['solves'] * abs(record['reducedCost']))
+
+    # Sort order after ascending estimate
+    order = sorted(order, key = lambda employee: (estimates[employee], employee))
+
+    return order
+
+def recordSP(history, employee, SPobjective, MPDuals, data, epsilon=1e-9):
+    '''Records the outcome of the SP of employee, solved with the duals
+    MPDuals, in history (used by orderStrategy_history)'''
+
+    record = history.setdefault(employee, {'solves': 0, 'improving': 0})
+    # Best reduced cost found (no solutions means no improving column)
+    reducedCost = min(SPobjective.values()) if SPobjective != None else 0
+    record['solves'] += 1
+    if reducedCost < -epsilon:
+        record['improving'] += 1
+    record['reducedCost'] = reducedCost
+    # Duals the SP was solved with
+    record['omega'] = MPDuals['omega'][employee]
+    record['pi'] = coverageDuals(MPDuals, data)
+
+def coverageDuals(MPDuals, data):
+    '''Coverage duals (pi) as an array indexed by day and shift type'''
+
+    pi = np.zeros((data['Days'][-1] + 1, max(data['ShiftTypes']) + 1))
+    for (day, shiftType), dual in MPDuals['pi'].items():
+        pi[day, shiftType] = dual
+    return pi
+
+def noResourcesPaths(data, graphs, MPDuals, constructionHeuristic = False):
+    '''Solves the SPs without resources of all employees at once. The graphs
+    are updated according to MPDuals, and their arc costs are stored in one
+    array indexed by employee, day, shift type on the previous day (i) and
+    shift type on the day (j), with infinite costs where there are no arcs.
+    Shortest paths are then found day by day by the min-plus product
+
+        cost[e, j] = min over i of cost[e, i] + arcCost[e, day, i, j]
+
+    for all employees e at once. Returns the costs of the shortest paths
+    (infinite if the end node cannot be reached), and their rosterlines, in
+    order of data['Employees'].'''
+
+    nDays = data['Days'][-1]
+    nShiftTypes = max(data['ShiftTypes']) + 1 # Shift type 0 in start/end nodes
+    employees = data['Employees']
+
+    # Store arc costs of all graphs in one array
+    arcCost = np.full((len(employees), nDays + 2, nShiftTypes, nShiftTypes), np.inf)
+    for e, employee in enumerate(employees):
+        graph = graphs[employee]
+        graph.update_costs(MPDuals, data, employee, constructionHeuristic = constructionHeuristic)
+        for (origin, destination), cost in graph.costs.items():
+            arcCost[e, destination.day, origin.shiftType, destination.shiftType] = cost
+
+    # Sweep days by min-plus products, storing the best previous shift type
+    cost = np.full((len(employees), nShiftTypes), np.inf)
+    cost[:, 0] = 0 # Start node
+    predecessor = np.zeros((len(employees), nDays + 2, nShiftTypes), dtype = int)
+    for day in range(1, nDays + 2):
+        extended = cost[:, :, None] + arcCost[:, day]
+        predecessor[:, day] = np.argmin(extended, axis = 1)
+        cost = np.min(extended, axis = 1)
+
+    # Trace rosterlines back from the end node (shift type 0)
+    rosterlines = np.zeros((len(employees), nDays), dtype = int)
+    shiftType = np.zeros(len(employees), dtype = int)
+    for day in range(nDays + 1, 1, -1):
+        shiftType = predecessor[np.arange(len(employees)), day, shiftType]
+        rosterlines[:, day - 2] = shiftType
+
+    return cost[:, 0], rosterlines
@@ -1,18 +1,54 @@
 import sys
 sys.path.append('./classes')
 import numpy as np
+import time
 from graph import Graph
 from resources import Resources
 from labelling import labelling
+from labelling_vectorized import labelling_vectorized
+from labelling_bidirectional import labelling_bidirectional
+from stateSpaceDP import stateSpaceDP
+from pulse import pulse
 
 def solveSP(data, employee, graph, duals = None, solutions_count: int = 1,
             epsilon = 1e-9, extensionLimits = [],
             constructionHeuristic = False,
-            resourceVec = ['TWMin', 'TWMin_g', 'TV']):
+            resourceVec = ['TWMin', 'TWMin_g', 'TV'],
+            SPMethod = 'labelling', midDay = None, earlyExit = False,
+            deadline = None, memoSize = None, truncate = False, surplus = None,
+            surplusCount = None):
     '''Solve SPPRC sub problem for employee on graph considering data and
-    duals.
+    duals. SPMethod is either 'labelling' (label by label),
+    'labelling_vectorized' (day by day on arrays of labels) or
+    'labelling_bidirectional' (forward and backward to midDay, then merged),
+    'stateSpaceDP' (shortest paths on a state graph cached in graph) or 'pulse'
+    (depth-first search, with a memo of memoSize paths per node).
+
+    If earlyExit, labelling stops as soon as solutions_count negative reduced
+    cost solutions are found (only with SPMethod 'labelling'). The solutions
+    are then not guaranteed to be the best ones.
+
+    If a deadline is given (in seconds since the epoch, see time.time), the sub
+    problem is interrupted once it has passed, returning None, None as when no
+    solution is found. Callers tell the two apart by checking the deadline.
+
+    If truncate, the sub problem is not solved without extension limit once
+    extensionLimits are used up, so it is a heuristic. If a surplus list is
+    given, solutions found beyond the solutions_count best are appended to it
+    (as rosterlines, with reduced costs below costThreshold), at most the
+    surplusCount best if given. Labels are then only discarded if they cannot
+    beat the solutions_count + surplusCount best found.
     '''
 
+    # Only solutions with reduced cost below costThreshold are of interest
+    costThreshold = 1e-2
+
+    # Number of best solutions searched for by the SP method (including
+    # surplus solutions if requested)
+    searchCount = solutions_count
+    if surplus != None and solutions_count != None:
+        searchCount = None if surplusCount == None else solutions_count + surplusCount
+
     # Initialize resources, define included
     resources = Resources(resourceVec)
 
@@ -31,16 +67,29 @@ def solveSP(data, employee, graph, duals = None, solutions_count: int = 1,
     proceed = True
     while proceed:
         # Solve by labelling algorithm
-        processed_labels, extension_limited = labelling(resources=resources,
-                                                        graph=graph, data=data,
-                                                        employee=employee,
-                                                        extensionLimit=extensionLimit)
+        arguments = {'resources': resources, 'graph': graph, 'data': data,
+                     'employee': employee, 'extensionLimit': extensionLimit,
+                     'costThreshold': costThreshold,
+                     'solutionsCount': searchCount,
+                     'deadline': deadline}
+        if SPMethod == 'labelling_bidirectional':
+            arguments['midDay'] = midDay
+        if SPMethod == 'pulse':
+            arguments['memoSize'] = memoSize
+        if earlyExit and SPMethod == 'labelling':
+            arguments['targetCount'] = solutions_count
+            arguments['targetThreshold'] = -epsilon
+        processed_labels, extension_limited = globals()[SPMethod](**arguments)
+
+        # If interrupted by the deadline, return no solutions
+        if deadline != None and time.time() > deadline:
+            return None, None
 
         # Filter away labels that are not in the end node or have positive cost
         candidate_labels = []
         while processed_labels:
             label = processed_labels.pop()
-            if (label.node.day == data['Days'][-1] + 1) and (label.cost < 1e-2):
+            if (label.node.day == data['Days'][-1] + 1) and (label.cost < costThreshold):
                 candidate_labels.append(label)
                 # If a negative reduced cost solution is found, stop
                 if label.cost < -epsilon:
@@ -53,6 +102,9 @@ def solveSP(data, employee, graph, duals = None, solutions_count: int = 1,
                 extensionLimits.pop(0)
                 if extensionLimits:
                     extensionLimit = extensionLimits[0]
+                # Unless truncated, continue without extension limit
+                elif truncate:
+                    proceed = False
                 else:
                     extensionLimit = None
             else:
@@ -66,9 +118,19 @@ def solveSP(data, employee, graph, duals = None, solutions_count: int = 1,
 	# Select solutions_count best solutions (based on lowest cost)
     if solutions_count != None:
         solution_labels = candidate_labels[:solutions_count]
+        surplus_labels = candidate_labels[solutions_count:searchCount]
     # Should solutions_count be None, keep all solutions
     else:
         solution_labels = candidate_labels
+        surplus_labels = []
+
+    # Store surplus solutions if requested
+    if surplus != None:
+        for label in surplus_labels:
+            rosterline = np.zeros(data['Days'][-1], dtype = int)
+            for node in label.path[1:-1]:
+                rosterline[node.day - 1] = node.shiftType
+            surplus.append(rosterline)
 
 	# Format solutions
     solutions, reduced_costs = {}, {}
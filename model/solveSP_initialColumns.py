@@ -1,14 +1,17 @@
 import sys
 sys.path.append('./classes')
 import numpy as np
+import time
 from resources import Resources
 from labelling import labelling
 
 
 def solveSP_initialColumns(data, employee, graph, extensionLimits = [1],
-                           resourceVec = ['TWMin', 'TWMin_g', 'TV']):
+                           resourceVec = ['TWMin', 'TWMin_g', 'TV'],
+                           deadline = None):
     '''Solves SP with only one label extension and no requirement of negative
-    solution. Used to generate initial columns for construction heuristic.'''
+    solution. Used to generate initial columns for construction heuristic.
+    Returns None, None if interrupted by the deadline (see solveSP).'''
 
     # Initialize resources, define included
     resources = Resources(resourceVec)
@@ -20,7 +23,12 @@ def solveSP_initialColumns(data, employee, graph, extensionLimits = [1],
     processed_labels, extension_limited = labelling(resources=resources,
                                                     graph=graph, data=data,
                                                     employee=employee,
-                                                    extensionLimit=extensionLimit)
+                                                    extensionLimit=extensionLimit,
+                                                    deadline=deadline)
+
+    # If interrupted by the deadline, return no solution
+    if deadline != None and time.time() > deadline:
+        return None, None
 
     # Filter away labels that are not in the end node
     candidate_labels = []
@@ -0,0 +1,161 @@
+import sys
+sys.path.append('./classes')
+import numpy as np
+import time
+from resources import Resources
+from label import Label
+from labelling_vectorized import graphArrays, arcsOut
+
+def expandStateSpace(tables, arrays, deadline=None):
+    '''Expand the graph (indexed by arrays, see graphArrays) to a graph of
+    states, one for each node and reachable resource state. States are created
+    day by day by extending all states along all arcs with the compiled REFs
+    (see Resources.compile), keeping only the resource feasible ones.
+
+    Components where higher is better with a cap (sign -1, see order_ in
+    Resources) are clamped to the cap, provided that all resource windows of
+    the component have no upper bound and a lower bound not above the cap, and
+    that the component never decreases unless it is reset. Values above the cap
+    are then equivalent, which keeps the number of states small.
+
+    Returns the day-by-day arcs of the state graph, sorted by destination
+    state, along with the node and resource state of each state. Returns None
+    if the deadline passes.
+    '''
+    keep, add = tables['keep'], tables['add']
+    lwr, upr = tables['lwr'], tables['upr']
+    sign, cap = tables['sign'], tables['cap']
+    nodeShiftType = arrays['nodeShiftType']
+    arcDestination = arrays['arcDestination']
+
+    # Identify components that may be clamped to their cap
+    clamp = ((sign < 0) & np.all(np.isinf(upr), axis=(0, 1)) &
+             np.all(np.where(np.isinf(lwr), -np.inf, lwr) <= cap, axis=(0, 1)) &
+             np.all((keep == 0) | (add >= 0), axis=(0, 1, 2)))
+    cap = np.where(clamp, cap, np.inf)
+
+    # Start state in the start node (first node of the graph)
+    stateNode = [np.array([0], dtype=np.int64)]
+    stateValues = [np.minimum(np.array([tables['initial']], dtype=np.int64), cap)
+                   .astype(np.int64)]
+    first = 0
+    days = []
+
+    # Create states day by day
+    for day in range(1, arrays['nodeDay'].max() + 1):
+        # Interrupt expansion if the deadline has passed
+        if deadline != None and time.time() > deadline:
+            return None
+        nodes, values = stateNode[-1], stateValues[-1]
+        # Extend all states of the previous day along all arcs
+        origins, arcs = arcsOut(nodes, arrays['arcStart'], arrays['arcCount'])
+        destinations = arcDestination[arcs]
+        i = nodeShiftType[nodes[origins]]
+        j = nodeShiftType[destinations]
+        extended = keep[day, i, j] * values[origins] + add[day, i, j]
+        # Keep only extensions within the resource windows
+        feasible = np.all((lwr[day, j] <= extended) & (extended <= upr[day, j]), axis=1)
+        origins, arcs, destinations = origins[feasible], arcs[feasible], destinations[feasible]
+        extended = np.minimum(extended[feasible], cap).astype(np.int64)
+
+        # Identify unique states (node and resource state) of the day
+        unique, inverse = np.unique(np.column_stack((destinations, extended)),
+                                    axis=0, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        stateNode.append(unique[:, 0])
+        stateValues.append(unique[:, 1:])
+
+        # Store arcs of the day sorted by destination state
+        order = np.argsort(inverse, kind='stable')
+        destination = inverse[order]
+        starts = np.flatnonzero(np.r_[True, destination[1:] != destination[:-1]])
+        days.append({'origin': first + origins[order],
+                     'destination': first + len(nodes) + destination,
+                     'arc': arcs[order],
+                     'starts': starts,
+                     'sizes': np.diff(np.r_[starts, len(destination)]),
+                     'first': first + len(nodes),
+                     'size': len(unique)})
+        first += len(nodes)
+
+    return {'days': days,
+            'node': np.concatenate(stateNode),
+            'size': first + len(stateNode[-1])}
+
+def stateSpaceDP(resources, graph, data, employee, extensionLimit,
+                 costThreshold=None, solutionsCount=None, deadline=None):
+    '''Solve the SPPRC by dynamic programming on the state graph of the graph
+    (see expandStateSpace). The state graph does not depend on the arc costs,
+    and is cached in the graph until the graph is changed. Each call then only
+    finds the cheapest path to every state, day by day.
+
+    Returns labels of the cheapest paths to the states in the end node (with
+    a cost below costThreshold and only the solutionsCount best, if given).
+    The algorithm is exact, so extensionLimit has no effect. If a deadline is
+    given (in seconds since the epoch, see time.time), the expansion of the
+    state graph is interrupted once it has passed.
+    '''
+
+    # Compile resources to lookup tables
+    tables = resources.compile(data=data, employee=employee)
+
+    # Expand the state graph if not cached in the graph
+    key = tuple(resources.resource_list)
+    if key not in graph.stateSpaces:
+        arrays = graphArrays(graph)
+        stateSpace = expandStateSpace(tables, arrays, deadline)
+        if stateSpace == None:
+            return [], True
+        stateSpace['arcs'] = [(graph.nodes[o], graph.nodes[d]) for o, d in
+                              zip(arrays['arcOrigin'], arrays['arcDestination'])]
+        graph.stateSpaces[key] = stateSpace
+    stateSpace = graph.stateSpaces[key]
+
+    # Current arc costs
+    arcCost = np.array([graph.costs[arc] for arc in stateSpace['arcs']])
+
+    # Find the cheapest path to every state, day by day
+    cost = np.full(stateSpace['size'], np.inf)
+    cost[0] = 0
+    predecessor = np.full(stateSpace['size'], -1, dtype=np.int64)
+    for day in stateSpace['days']:
+        if len(day['arc']) == 0:
+            continue
+        costs = cost[day['origin']] + arcCost[day['arc']]
+        cheapest = np.minimum.reduceat(costs, day['starts'])
+        # First arc with the cheapest cost into each state
+        best = np.flatnonzero(costs == np.repeat(cheapest, day['sizes']))
+        best = best[np.r_[True, day['destination'][best[1:]] != day['destination'][best[:-1]]]]
+        cost[day['destination'][best]] = cheapest
+        predecessor[day['destination'][best]] = day['origin'][best]
+
+    # States in the end node
+    last = stateSpace['days'][-1]
+    end = np.arange(last['first'], last['first'] + last['size'])
+    end = end[np.isfinite(cost[end])]
+    if costThreshold != None:
+        end = end[cost[end] < costThreshold]
+    end = end[np.argsort(cost[end], kind='stable')]
+    if solutionsCount != None:
+        end = end[:solutionsCount]
+
+    # Create labels along the cheapest path to the end states
+    refs = tables['refs']
+    end_labels = []
+    for state in end:
+        path = []
+        while state != -1:
+            path.append(graph.nodes[stateSpace['node'][state]])
+            state = predecessor[state]
+        path.reverse()
+        label = Label.initialize(node=path[0], resources=resources, data=data,
+                                 employee=employee)
+        for node in path[1:]:
+            keep, add = refs[node.day][label.node.shiftType][node.shiftType]
+            label = Label(node=node, parent=label,
+                          cost=label.cost + graph.costs[(label.node, node)],
+                          resourceValues=tuple([k * v + a for k, v, a in
+                                                zip(keep, label.resourceValues, add)]))
+        end_labels.append(label)
+
+    return end_labels, False
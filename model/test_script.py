@@ -2,10 +2,6 @@ from dataLoader import dataLoader
 from branchAndPrice import branchAndPrice
 from solveMIP import solveMIP
 from datetime import datetime
-import sys
-
-# Extend default recursion limit to allow deeper copying (for larger instances)
-sys.setrecursionlimit(10000)
 
 for instance in []:
     data = dataLoader(filename='../instances/'+instance+'.xlsx')
@@ -25,7 +21,7 @@ for instance in []:
                    # removeIllegalColumns = False, # Remove all illegal columns before solving a problem
                    # coverConstraint = '=', # Cover constraint. = or >=.
                    # partialCG = False, # Only solve SPs until one with neg red cost is found
-                   # orderStrategy = 'random', # Strategy for choosing order of solving SP's
+                   # orderStrategy = 'random', # Strategy for choosing order of solving SP's. random, noResourcesSP or history
                    # partialCG_constructionHeuristic = False, # Only solve SPs until one with neg red cost is found in construction heuristic
                    # constructionHeuristic = 'CGartificialVariables', # Specify what construction heuristic to use
                    # labelExtensionLimits = [], # Increments in SP label extension limit
@@ -35,5 +31,18 @@ for instance in []:
                    # CGImprovementStepSize=1, # CG improvement criterion step size
                    # CGImprovementThreshold=1e-9, # CG improvement criterion threshold
                    # branchOnUpperBound=False, # Branch once CG finds objective value below tree upper bound
-                   # branchingStrategy = 'xVars'
+                   # branchingStrategy = 'xVars',
+                   # SPMethod = 'labelling', # Algorithm solving the sub problem. labelling, labelling_vectorized, labelling_bidirectional, stateSpaceDP or pulse
+                   # earlyExitSP = False, # Stop labelling once SPSolutionsCount neg red cost solutions are found, unless LBD is calculated
+                   # resourceStages = None, # Resource lists used in SPs before resourceVec, activated in stages as CG tails off (e.g. [[], ['TWMin']])
+                   # pricers = ['exact'], # Chain of SP pricers tried in order: pool, localSearch, truncated or exact (exact is always tried last)
+                   # truncatedExtensionLimits = [5], # Label extension limits of the truncated pricer
+                   # localSearchIterations = 5, # Iterations of the local search pricer (tabu search)
+                   # localSearchTenure = 2, # Iterations changes are tabu in the local search pricer
+                   # localSearchBlockLength = 4, # Maximum number of consecutive days changed at once in the local search pricer
+                   # SPProcesses = 1, # Number of processes solving SPs in parallel. 1 solves SPs one at a time by the pricers
+                   # adaptivePricing = False, # Adapt label extension limits and SPSolutionsCount during CG by a pricing controller
+                   # pricingReplay = None, # Decisions of a pricing controller to replay (e.g. tree.pricingController.log of an earlier run)
+                   # pricingSeed = None, # Seed of random numbers with a pricing controller (default seed of pricingReplay, else random)
+                   # arcFixing = False # Remove arcs that cannot be in columns improving the tree upper bound (reduced cost fixing)
                    )